@@ -4,12 +4,30 @@ Qeyafa AI Measurement Service
 FastAPI API for body measurement extraction from photos
 """
 
-from fastapi import FastAPI, APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, APIRouter, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from typing import List
 import os
 from dotenv import load_dotenv
 
+try:
+    from measurement_model.frames import (
+        FRAME_CONTENT_TYPE,
+        VIEWS,
+        FrameError,
+        decode_process_request,
+        encode_process_response,
+    )
+except ImportError:  # Run as a script: python measurement_model/api.py
+    from frames import (
+        FRAME_CONTENT_TYPE,
+        VIEWS,
+        FrameError,
+        decode_process_request,
+        encode_process_response,
+    )
+
 # Load environment variables
 load_dotenv()
 
@@ -20,6 +38,8 @@ router = APIRouter()
 UPLOAD_FOLDER = 'data/input'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+# Four photos plus frame headers
+MAX_FRAME_SIZE = len(VIEWS) * MAX_FILE_SIZE + 1024
 
 @router.get('/health')
 async def health_check():
@@ -79,34 +99,7 @@ async def process_measurements(
                 detail='Height and weight must be positive numbers'
             )
         
-        # TODO: Implement actual AI processing
-        # For MVP, return mock measurements
-        # In production, this would:
-        # 1. Save uploaded photos
-        # 2. Preprocess images
-        # 3. Run through ML model
-        # 4. Extract measurements
-        # 5. Apply calibration based on height/weight
-        
-        measurements = {
-            'chest': calculate_measurement(height, weight, 'chest'),
-            'waist': calculate_measurement(height, weight, 'waist'),
-            'shoulders': calculate_measurement(height, weight, 'shoulders'),
-            'arm_length': calculate_measurement(height, weight, 'arm'),
-            'neck': calculate_measurement(height, weight, 'neck'),
-            'hip': calculate_measurement(height, weight, 'hip'),
-        }
-        
-        return {
-            'status': 'success',
-            'data': {
-                'measurements': measurements,
-                'unit': 'cm',
-                'confidence': 0.92,
-                'height': height,
-                'weight': weight
-            }
-        }
+        return measurement_result(height, weight)
         
     except HTTPException:
         raise
@@ -118,6 +111,100 @@ async def process_measurements(
             detail='Failed to process measurements. Please try again.'
         )
 
+@router.post('/api/measurements/process-frame')
+async def process_measurements_frame(request: Request):
+    """
+    Process body measurements sent as one binary frame (see frames.py)
+    
+    Compact alternative to /api/measurements/process for internal traffic:
+    the body is a frame with content type application/vnd.qeyafa.frame.
+    Answers with a frame when the Accept header asks for one, JSON otherwise.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type != FRAME_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=415,
+            detail=f'Expected Content-Type {FRAME_CONTENT_TYPE}'
+        )
+    
+    # Reject oversized frames before reading them into memory
+    try:
+        declared_size = int(request.headers.get('content-length', '0'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid Content-Length')
+    if declared_size > MAX_FRAME_SIZE:
+        raise HTTPException(status_code=413, detail='Frame too large')
+    
+    # Chunked bodies carry no Content-Length; stop reading once over the limit
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_FRAME_SIZE:
+            raise HTTPException(status_code=413, detail='Frame too large')
+    try:
+        images, height, weight = decode_process_request(body, MAX_FILE_SIZE)
+    except FrameError as e:
+        raise HTTPException(status_code=400, detail=f'Invalid frame: {e}')
+    
+    missing = [view for view in VIEWS if view not in images]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Missing photos: {", ".join(missing)}'
+        )
+    if height <= 0 or weight <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail='Height and weight must be positive numbers'
+        )
+    
+    try:
+        result = measurement_result(height, weight)
+    except Exception as e:
+        # Log error for debugging but don't expose stack trace
+        print(f'Error processing measurements: {str(e)}')
+        raise HTTPException(
+            status_code=500,
+            detail='Failed to process measurements. Please try again.'
+        )
+    
+    if FRAME_CONTENT_TYPE in request.headers.get('accept', ''):
+        return Response(content=encode_process_response(result), media_type=FRAME_CONTENT_TYPE)
+    return result
+
+def measurement_result(height: float, weight: float) -> dict:
+    """
+    Measurements for validated photos, height and weight
+    """
+    # TODO: Implement actual AI processing
+    # For MVP, return mock measurements
+    # In production, this would:
+    # 1. Save uploaded photos
+    # 2. Preprocess images
+    # 3. Run through ML model
+    # 4. Extract measurements
+    # 5. Apply calibration based on height/weight
+    
+    measurements = {
+        'chest': calculate_measurement(height, weight, 'chest'),
+        'waist': calculate_measurement(height, weight, 'waist'),
+        'shoulders': calculate_measurement(height, weight, 'shoulders'),
+        'arm_length': calculate_measurement(height, weight, 'arm'),
+        'neck': calculate_measurement(height, weight, 'neck'),
+        'hip': calculate_measurement(height, weight, 'hip'),
+    }
+    
+    return {
+        'status': 'success',
+        'data': {
+            'measurements': measurements,
+            'unit': 'cm',
+            'confidence': 0.92,
+            'height': height,
+            'weight': weight
+        }
+    }
+
 def calculate_measurement(height: float, weight: float, body_part: str) -> float:
     """
     Calculate body measurements based on height and weight
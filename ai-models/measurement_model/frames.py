@@ -0,0 +1,98 @@
+"""
+Compact binary frames for measurement processing requests
+
+Decodes the request frames the backend sends to /api/measurements/process-frame
+and encodes the response frames it reads back. The format is defined in
+backend/services/ai_frames.py; both copies must change together (bump
+FRAME_VERSION). All integers and floats are big-endian:
+
+    request   "QF" version:u8 type:u8=1 height:f64 weight:f64 count:u8
+              count x (view:u8 content_type:u8 length:u32 bytes[length])
+    response  "QF" version:u8 type:u8=2 status:u8 confidence:f64 count:u8
+              count x (field:u8 value:f64)
+"""
+
+import struct
+
+FRAME_CONTENT_TYPE = 'application/vnd.qeyafa.frame'
+FRAME_VERSION = 1
+
+VIEWS = ('front', 'back', 'left', 'right')
+IMAGE_TYPES = ('image/jpeg', 'image/png')
+STATUSES = ('success', 'error')
+MEASUREMENT_FIELDS = ('chest', 'waist', 'shoulders', 'arm_length', 'neck', 'hip')
+
+_MAGIC = b'QF'
+_PROCESS_REQUEST = 1
+_PROCESS_RESPONSE = 2
+
+_PREAMBLE = struct.Struct('>2sBB')
+_REQUEST_HEADER = struct.Struct('>ddB')
+_IMAGE_HEADER = struct.Struct('>BBI')
+_RESPONSE_HEADER = struct.Struct('>BdB')
+_MEASUREMENT = struct.Struct('>Bd')
+
+
+class FrameError(ValueError):
+    """Raised for frames that do not follow the format"""
+    pass
+
+
+def decode_process_request(data, max_image_size):
+    """
+    Decode a processing request frame
+
+    Args:
+        data: Request body
+        max_image_size: Largest accepted image, in bytes
+
+    Returns:
+        ({view: (content, content_type)}, height, weight)
+    """
+    view_data = memoryview(data)
+    offset = 0
+
+    def unpack(layout):
+        nonlocal offset
+        if offset + layout.size > len(view_data):
+            raise FrameError('Truncated frame')
+        values = layout.unpack_from(view_data, offset)
+        offset += layout.size
+        return values
+
+    magic, version, message_type = unpack(_PREAMBLE)
+    if magic != _MAGIC:
+        raise FrameError('Not a frame')
+    if version != FRAME_VERSION:
+        raise FrameError(f'Unsupported frame version {version}')
+    if message_type != _PROCESS_REQUEST:
+        raise FrameError(f'Unexpected message type {message_type}')
+
+    height, weight, count = unpack(_REQUEST_HEADER)
+    images = {}
+    for _ in range(count):
+        view, content_type, length = unpack(_IMAGE_HEADER)
+        if view >= len(VIEWS) or content_type >= len(IMAGE_TYPES):
+            raise FrameError('Unknown view or content type')
+        if length > max_image_size:
+            raise FrameError(f'Image for {VIEWS[view]} is too large')
+        if offset + length > len(view_data):
+            raise FrameError('Truncated frame')
+        images[VIEWS[view]] = (view_data[offset:offset + length].tobytes(), IMAGE_TYPES[content_type])
+        offset += length
+    if offset != len(view_data):
+        raise FrameError('Trailing bytes after frame')
+    return images, height, weight
+
+
+def encode_process_response(result):
+    """Encode a processing result shaped like the JSON response (status, data)"""
+    data = result.get('data') or {}
+    measurements = data.get('measurements') or {}
+    parts = [
+        _PREAMBLE.pack(_MAGIC, FRAME_VERSION, _PROCESS_RESPONSE),
+        _RESPONSE_HEADER.pack(STATUSES.index(result['status']), data.get('confidence', 0.0), len(measurements)),
+    ]
+    for field, value in measurements.items():
+        parts.append(_MEASUREMENT.pack(MEASUREMENT_FIELDS.index(field), value))
+    return b''.join(parts)
@@ -0,0 +1,40 @@
+"""Add typed columns for the core body measurements
+
+Revision ID: 2f7b3d9e5c61
+Revises: 9d2e4a6c8b13
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7b3d9e5c61"
+down_revision: Union[str, Sequence[str], None] = "9d2e4a6c8b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIELDS = ["chest", "waist", "shoulders", "arm_length", "neck", "hip"]
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Columns are added empty; existing rows are filled in by
+    ``backfill_measurement_columns.py``.
+    """
+    for field in FIELDS:
+        op.add_column("measurements", sa.Column(field, sa.Float(), nullable=True))
+        op.create_index(
+            op.f(f"ix_measurements_{field}"), "measurements", [field], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for field in reversed(FIELDS):
+        op.drop_index(op.f(f"ix_measurements_{field}"), table_name="measurements")
+        op.drop_column("measurements", field)
@@ -0,0 +1,81 @@
+"""Add full-text and trigram search support for designs
+
+Revision ID: 3e7a9c1b5d20
+Revises: 575410277ca3
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3e7a9c1b5d20"
+down_revision: Union[str, Sequence[str], None] = "575410277ca3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Arabic-aware normalization: lower-case, drop harakat and tatweel, and
+    # fold alef/yeh/teh-marbuta variants so spelling differences still match.
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION qeyafa_search_normalize(value text)
+        RETURNS text
+        LANGUAGE sql
+        IMMUTABLE
+        PARALLEL SAFE
+        AS $$
+            SELECT translate(
+                regexp_replace(lower(coalesce(value, '')), '[\u064B-\u0652\u0640]', '', 'g'),
+                E'\u0623\u0625\u0622\u0671\u0649\u0629',
+                E'\u0627\u0627\u0627\u0627\u064A\u0647'
+            )
+        $$
+        """)
+
+    # "simple" does not stem, which suits mixed Arabic/English catalog text.
+    op.execute("CREATE TEXT SEARCH CONFIGURATION qeyafa_search (COPY = simple)")
+
+    op.add_column(
+        "designs",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('qeyafa_search'::regconfig, qeyafa_search_normalize(name)), 'A') || "
+                "setweight(to_tsvector('qeyafa_search'::regconfig, qeyafa_search_normalize(description)), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_designs_search_vector",
+        "designs",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_designs_name_trgm",
+        "designs",
+        [sa.text("qeyafa_search_normalize(name) gin_trgm_ops")],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_designs_name_trgm", table_name="designs")
+    op.drop_index("ix_designs_search_vector", table_name="designs")
+    op.drop_column("designs", "search_vector")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS qeyafa_search")
+    op.execute("DROP FUNCTION IF EXISTS qeyafa_search_normalize(text)")
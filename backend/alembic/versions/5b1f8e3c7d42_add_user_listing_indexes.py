@@ -0,0 +1,38 @@
+"""Add indexes backing the admin user listing filters
+
+Revision ID: 5b1f8e3c7d42
+Revises: 8c4d2f6e1a97
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1f8e3c7d42"
+down_revision: Union[str, Sequence[str], None] = "8c4d2f6e1a97"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f("ix_users_created_at"), "users", ["created_at"], unique=False)
+    op.create_index(op.f("ix_users_role"), "users", ["role"], unique=False)
+    # Case-insensitive email prefix search (LIKE 'prefix%')
+    op.create_index(
+        "ix_users_email_lower_pattern",
+        "users",
+        [sa.text("lower(email) text_pattern_ops")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_email_lower_pattern", table_name="users")
+    op.drop_index(op.f("ix_users_role"), table_name="users")
+    op.drop_index(op.f("ix_users_created_at"), table_name="users")
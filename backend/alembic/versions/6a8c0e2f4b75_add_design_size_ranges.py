@@ -0,0 +1,47 @@
+"""Add compiled design size ranges for the fitting engine
+
+Revision ID: 6a8c0e2f4b75
+Revises: 2f7b3d9e5c61
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "6a8c0e2f4b75"
+down_revision: Union[str, Sequence[str], None] = "2f7b3d9e5c61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIELDS = ["chest", "waist", "shoulders", "arm_length", "neck", "hip"]
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing designs are compiled by ``compile_design_sizes.py``.
+    """
+    bounds = []
+    for field in FIELDS:
+        bounds.append(sa.Column(f"{field}_min", sa.Float(), nullable=True))
+        bounds.append(sa.Column(f"{field}_max", sa.Float(), nullable=True))
+
+    op.create_table(
+        "design_size_ranges",
+        sa.Column("design_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("size", sa.String(length=32), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        *bounds,
+        sa.ForeignKeyConstraint(["design_id"], ["designs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("design_id", "size"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("design_size_ranges")
@@ -0,0 +1,59 @@
+"""Add indexes backing the design listing filters
+
+Revision ID: 8c4d2f6e1a97
+Revises: 3e7a9c1b5d20
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4d2f6e1a97"
+down_revision: Union[str, Sequence[str], None] = "3e7a9c1b5d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Default listing: active designs, newest first
+    op.create_index(
+        "ix_designs_is_active_created_at",
+        "designs",
+        ["is_active", sa.text("created_at DESC")],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_designs_category_id"), "designs", ["category_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_designs_base_price"), "designs", ["base_price"], unique=False
+    )
+
+    # The association primary keys lead with design_id; these serve lookups
+    # that start from a fabric or color.
+    op.create_index(
+        "ix_design_fabric_fabric_id_design_id",
+        "design_fabric",
+        ["fabric_id", "design_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_design_color_color_id_design_id",
+        "design_color",
+        ["color_id", "design_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_design_color_color_id_design_id", table_name="design_color")
+    op.drop_index("ix_design_fabric_fabric_id_design_id", table_name="design_fabric")
+    op.drop_index(op.f("ix_designs_base_price"), table_name="designs")
+    op.drop_index(op.f("ix_designs_category_id"), table_name="designs")
+    op.drop_index("ix_designs_is_active_created_at", table_name="designs")
@@ -0,0 +1,43 @@
+"""Add indexes backing measurement analytics
+
+Revision ID: 9d2e4a6c8b13
+Revises: 5b1f8e3c7d42
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9d2e4a6c8b13"
+down_revision: Union[str, Sequence[str], None] = "5b1f8e3c7d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-user history scans and DISTINCT ON (user_id) ... processed_at DESC
+    op.create_index(
+        "ix_measurements_user_id_processed_at",
+        "measurements",
+        ["user_id", sa.text("processed_at DESC")],
+        unique=False,
+    )
+    # Key-existence filters (?|) on the measurements document
+    op.create_index(
+        "ix_measurements_measurements",
+        "measurements",
+        ["measurements"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_measurements_measurements", table_name="measurements")
+    op.drop_index("ix_measurements_user_id_processed_at", table_name="measurements")
@@ -0,0 +1,42 @@
+"""Add updated_at to measurements
+
+Revision ID: a7c9e1b3d5f8
+Revises: b8d0f2a4c6e9
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c9e1b3d5f8"
+down_revision: Union[str, Sequence[str], None] = "b8d0f2a4c6e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() is stable, so existing rows get the default without a table rewrite
+    op.add_column(
+        "measurements",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    # Incremental refreshes of the similarity index read rows changed since the last one
+    op.create_index(
+        "ix_measurements_updated_at", "measurements", ["updated_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_measurements_updated_at", table_name="measurements")
+    op.drop_column("measurements", "updated_at")
@@ -0,0 +1,54 @@
+"""Add normalized design name for trigram search
+
+Revision ID: b8d0f2a4c6e9
+Revises: f6a8c0e2b4d5
+Create Date: 2026-10-20 08:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d0f2a4c6e9"
+down_revision: Union[str, Sequence[str], None] = "f6a8c0e2b4d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored, so ranking and index rechecks read the normalized name instead
+    # of running qeyafa_search_normalize() (regexp_replace) per row
+    op.add_column(
+        "designs",
+        sa.Column(
+            "search_name",
+            sa.Text(),
+            sa.Computed("qeyafa_search_normalize(name)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_designs_search_name_trgm",
+        "designs",
+        [sa.text("search_name gin_trgm_ops")],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.drop_index("ix_designs_name_trgm", table_name="designs")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_designs_name_trgm",
+        "designs",
+        [sa.text("qeyafa_search_normalize(name) gin_trgm_ops")],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.drop_index("ix_designs_search_name_trgm", table_name="designs")
+    op.drop_column("designs", "search_name")
@@ -0,0 +1,31 @@
+"""Add rules_version to designs
+
+Revision ID: c3e5a7b9d1f2
+Revises: 6a8c0e2f4b75
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e5a7b9d1f2"
+down_revision: Union[str, Sequence[str], None] = "6a8c0e2f4b75"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "designs",
+        sa.Column("rules_version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("designs", "rules_version")
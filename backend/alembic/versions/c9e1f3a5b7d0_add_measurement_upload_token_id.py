@@ -0,0 +1,39 @@
+"""Add upload_token_id to measurements
+
+Revision ID: c9e1f3a5b7d0
+Revises: a7c9e1b3d5f8
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c9e1f3a5b7d0"
+down_revision: Union[str, Sequence[str], None] = "a7c9e1b3d5f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "measurements",
+        sa.Column("upload_token_id", sa.String(length=32), nullable=True),
+    )
+    # One measurement per /finalize upload token
+    op.create_index(
+        "ix_measurements_upload_token_id",
+        "measurements",
+        ["upload_token_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_measurements_upload_token_id", table_name="measurements")
+    op.drop_column("measurements", "upload_token_id")
@@ -0,0 +1,42 @@
+"""Add image derivative columns
+
+Revision ID: e4b6d8f0a2c3
+Revises: c3e5a7b9d1f2
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b6d8f0a2c3"
+down_revision: Union[str, Sequence[str], None] = "c3e5a7b9d1f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "measurements",
+        sa.Column(
+            "image_derivatives", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+    op.add_column(
+        "designs", sa.Column("base_image_derivatives", sa.JSON(), nullable=True)
+    )
+    op.add_column(
+        "categories", sa.Column("image_derivatives", sa.JSON(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("categories", "image_derivatives")
+    op.drop_column("designs", "base_image_derivatives")
+    op.drop_column("measurements", "image_derivatives")
@@ -0,0 +1,35 @@
+"""Add index on measurement image paths
+
+Revision ID: f6a8c0e2b4d5
+Revises: e4b6d8f0a2c3
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f6a8c0e2b4d5"
+down_revision: Union[str, Sequence[str], None] = "e4b6d8f0a2c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Reference checks of the photo garbage collector (image_paths @@ '$.* == "<key>" || ...');
+    # jsonb_ops rather than jsonb_path_ops, which cannot index the .* accessor
+    op.create_index(
+        "ix_measurements_image_paths",
+        "measurements",
+        ["image_paths"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_measurements_image_paths", table_name="measurements")
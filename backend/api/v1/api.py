@@ -4,7 +4,7 @@ API v1 router.
 
 from fastapi import APIRouter
 
-from api.v1.endpoints import auth, users, login, measurements, categories, designs, admin
+from api.v1.endpoints import auth, users, login, measurements, categories, designs, admin, storage
 
 api_router = APIRouter()
 
@@ -17,3 +17,4 @@ api_router.include_router(
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
 api_router.include_router(designs.router, prefix="/designs", tags=["designs"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(storage.router, prefix="/storage", tags=["storage"])
@@ -1,14 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.user import User
-from schemas.user import UserUpdate, UserOut, UserRegisterWithRole
-from core.database import get_db
+from schemas.user import (
+    BulkUserAction,
+    UserBulkRequest,
+    UserBulkResult,
+    UserUpdate,
+    UserOut,
+    UserRegisterWithRole,
+)
+from core.database import SessionLocal, get_db
 from api.v1.endpoints.auth import get_current_admin_user
 from models.roles import UserRole
 from core.security import hash_password
+from crud.user import (
+    EXPORT_COLUMNS,
+    bulk_delete_users,
+    bulk_update_users,
+    count_users_for_bulk,
+    get_users,
+    iter_users_for_export,
+)
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE = 1000
+
+
+def user_filters(
+    role: Optional[UserRole] = Query(None, description="Filter by role"),
+    is_active: Optional[bool] = Query(None, description="Filter by active flag"),
+    created_after: Optional[datetime] = Query(None, description="Created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Created before this time"),
+    email_prefix: Optional[str] = Query(None, min_length=1, max_length=254, description="Case-insensitive email prefix"),
+) -> Dict[str, Any]:
+    """Collect the admin user listing filters as keyword arguments for crud.user."""
+    return {
+        "role": role,
+        "is_active": is_active,
+        "created_after": created_after,
+        "created_before": created_before,
+        "email_prefix": email_prefix,
+    }
+
 @router.post("/admin-create-user", response_model=dict, status_code=status.HTTP_201_CREATED)
 def admin_create_user(user_data: UserRegisterWithRole, db: Session = Depends(get_db), current_admin: User = Depends(get_current_admin_user)):
     # Only allow designer or admin roles
@@ -38,8 +81,124 @@ def admin_create_user(user_data: UserRegisterWithRole, db: Session = Depends(get
     return {"message": f"{user_data.role.value.capitalize()} user created successfully", "email": new_user.email}
 
 @router.get("/users", response_model=list[UserOut])
-def list_users(db: Session = Depends(get_db), current_admin: User = Depends(get_current_admin_user)):
-    return db.query(User).all()
+def list_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    filters: Dict[str, Any] = Depends(user_filters),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """List users page by page, newest first, with optional filters."""
+    return get_users(db, skip=skip, limit=limit, **filters)
+
+
+def _export_chunks(export_format: str, filters: Dict[str, Any]):
+    """
+    Yield the export body in chunks of ``EXPORT_BATCH_SIZE`` rows.
+
+    Uses its own session: the request-scoped one is closed before a
+    streaming response finishes.
+    """
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+
+        pending = 0
+        for row in iter_users_for_export(db, batch_size=EXPORT_BATCH_SIZE, **filters):
+            if export_format == "csv":
+                writer.writerow(jsonable_encoder(row))
+            else:
+                buffer.write(json.dumps(jsonable_encoder(dict(zip(EXPORT_COLUMNS, row)))))
+                buffer.write("\n")
+            pending += 1
+            if pending == EXPORT_BATCH_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/users/export")
+def export_users(
+    format: str = Query("csv", regex="^(csv|ndjson)$", description="csv or ndjson"),
+    filters: Dict[str, Any] = Depends(user_filters),
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """
+    Stream every matching user as CSV or NDJSON.
+
+    Rows are read through a server-side cursor and written out in batches, so
+    worker memory stays flat regardless of the number of users.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"users-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        _export_chunks(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/users/bulk", response_model=UserBulkResult)
+def bulk_users(
+    request: UserBulkRequest,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """
+    Activate, deactivate, change the role of, or delete many users at once.
+
+    Users are selected by id or by filter and changed with a single
+    ``UPDATE``/``DELETE ... RETURNING`` in one transaction. The calling admin
+    is never included. With ``dry_run`` only the number of matching users is
+    returned.
+    """
+    target = {
+        "user_ids": request.user_ids,
+        "exclude_id": current_admin.id,
+        **(request.filter.dict() if request.filter else {}),
+    }
+
+    if request.dry_run:
+        return UserBulkResult(
+            action=request.action,
+            dry_run=True,
+            matched=count_users_for_bulk(db, **target),
+        )
+
+    try:
+        if request.action == BulkUserAction.DELETE:
+            user_ids = bulk_delete_users(db, **target)
+        else:
+            if request.action == BulkUserAction.SET_ROLE:
+                values = {
+                    "role": request.role,
+                    "is_superuser": request.role == UserRole.ADMIN,
+                }
+            else:
+                values = {"is_active": request.action == BulkUserAction.ACTIVATE}
+            user_ids = bulk_update_users(db, values, **target)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some users still own designs or measurements; no users were deleted.",
+        )
+
+    return UserBulkResult(
+        action=request.action,
+        dry_run=False,
+        matched=len(user_ids),
+        user_ids=user_ids,
+    )
 
 @router.put("/users/{user_id}", response_model=UserOut)
 def update_user(user_id: str, user_update: UserUpdate, db: Session = Depends(get_db), current_admin: User = Depends(get_current_admin_user)):
@@ -2,21 +2,30 @@
 Category endpoints.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
+from core.cache import catalog_cache
 from core.database import get_db
 from core.deps import is_designer_or_admin
+from core.etag import CATALOG_CACHE_CONTROL, conditional_response
 from models.category import Category
 from models.user import User
 from schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from services.derivatives import (
+    FORMAT_PATTERN,
+    SIZE_PATTERN,
+    derivative_worker,
+    image_response,
+)
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[CategoryResponse])
 def list_categories(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
@@ -29,29 +38,73 @@ def list_categories(
     - **limit**: Maximum number of categories to return
     - **active_only**: If True, only return active categories
     """
-    query = db.query(Category)
 
-    if active_only:
-        query = query.filter(Category.is_active == True)
+    def load():
+        query = db.query(Category)
 
-    categories = query.offset(skip).limit(limit).all()
-    return categories
+        if active_only:
+            query = query.filter(Category.is_active == True)
+
+        categories = query.offset(skip).limit(limit).all()
+        return [CategoryResponse.from_orm(category) for category in categories]
+
+    params = {"skip": skip, "limit": limit, "active_only": active_only}
+    return conditional_response(
+        request,
+        "categories",
+        catalog_cache.version("categories"),
+        params,
+        lambda: catalog_cache.json_response("categories", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: str, db: Session = Depends(get_db)):
+def get_category(category_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Get a specific category by ID.
     """
-    category = db.query(Category).filter(Category.id == category_id).first()
 
-    if not category:
+    def load():
+        category = db.query(Category).filter(Category.id == category_id).first()
+
+        if not category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found",
+            )
+
+        return CategoryResponse.from_orm(category)
+
+    params = {"id": category_id}
+    return conditional_response(
+        request,
+        "categories",
+        catalog_cache.version("categories"),
+        params,
+        lambda: catalog_cache.json_response("categories", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
+
+
+@router.get("/{category_id}/image")
+def get_category_image(
+    category_id: str,
+    size: Optional[str] = Query(
+        None, regex=SIZE_PATTERN, description="Thumbnail size (default: the original)"
+    ),
+    format: str = Query("webp", regex=FORMAT_PATTERN),
+    db: Session = Depends(get_db),
+):
+    """Redirect to a category's image, or to one of its thumbnails (404 until generated)."""
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if category is None or not category.image_url:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found",
+            status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
         )
-
-    return category
+    return image_response(
+        category.image_url, category.image_derivatives, size, format, allow_urls=True
+    )
 
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
@@ -87,6 +140,9 @@ def create_category(
     db.add(new_category)
     db.commit()
     db.refresh(new_category)
+    catalog_cache.invalidate("categories")
+    if new_category.image_url:
+        derivative_worker.submit("category", new_category.id)
 
     return new_category
 
@@ -130,6 +186,9 @@ def update_category(
 
     db.commit()
     db.refresh(category)
+    catalog_cache.invalidate("categories")
+    if "image_url" in update_data:
+        derivative_worker.submit("category", category.id)
 
     return category
 
@@ -155,5 +214,6 @@ def delete_category(
 
     db.delete(category)
     db.commit()
+    catalog_cache.invalidate("categories")
 
     return None
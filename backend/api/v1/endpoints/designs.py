@@ -2,19 +2,44 @@
 Design endpoints.
 """
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 
+from core.cache import catalog_cache
+from core.config import settings
 from core.database import get_db
 from core.deps import get_current_user, get_current_designer_user
+from crud.measurement import get_measurement, typed_measurement_values
+from services.customization import compiled_rules_cache
+from services.derivatives import (
+    FORMAT_PATTERN,
+    SIZE_PATTERN,
+    derivative_worker,
+    image_response,
+)
+from core.etag import CATALOG_CACHE_CONTROL, conditional_response
 from models.design import Design
 from models.category import Category
+from models.roles import UserRole
 from models.user import User
-from schemas.design import DesignCreate, DesignUpdate, DesignResponse
+from schemas.design import (
+    DesignCreate,
+    DesignUpdate,
+    DesignResponse,
+    DesignFacets,
+    DesignFit,
+    DesignOptionsRequest,
+    DesignOptionsResult,
+)
 from crud.design import (
     get_designs,
     get_design,
+    get_design_facets,
+    get_fitting_designs,
+    normalize_search_query,
+    search_designs,
     create_design,
     update_design,
     delete_design,
@@ -23,13 +48,40 @@ from crud.design import (
 router = APIRouter()
 
 
+def design_filters(
+    style_type: Optional[List[str]] = Query(
+        None, description="Filter by style type (repeat for several)"
+    ),
+    category_id: Optional[List[UUID]] = Query(
+        None, description="Filter by category ID (repeat for several)"
+    ),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum base price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum base price"),
+    fabric_id: Optional[List[UUID]] = Query(
+        None, description="Only designs available in any of these fabrics"
+    ),
+    color_id: Optional[List[UUID]] = Query(
+        None, description="Only designs available in any of these colors"
+    ),
+) -> Dict[str, Any]:
+    """Collect the design listing filters as keyword arguments for crud.design."""
+    return {
+        "style_types": style_type,
+        "category_ids": category_id,
+        "min_price": min_price,
+        "max_price": max_price,
+        "fabric_ids": fabric_id,
+        "color_ids": color_id,
+    }
+
+
 @router.get("/", response_model=List[DesignResponse])
 def list_designs(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    style_type: Optional[str] = Query(None, description="Filter by style type"),
-    category_id: Optional[str] = Query(None, description="Filter by category ID"),
     active_only: bool = True,
+    filters: Dict[str, Any] = Depends(design_filters),
     db: Session = Depends(get_db),
 ):
     """
@@ -37,23 +89,134 @@ def list_designs(
 
     - **skip**: Number of designs to skip (for pagination)
     - **limit**: Maximum number of designs to return
-    - **style_type**: Filter designs by style type
-    - **category_id**: Filter designs by category ID
+    - **style_type**: Filter designs by style type (any of the given values)
+    - **category_id**: Filter designs by category ID (any of the given values)
+    - **min_price** / **max_price**: Filter designs by base price range
+    - **fabric_id** / **color_id**: Only designs offered in any of the given fabrics/colors
     - **active_only**: If True, only return active designs
     """
-    query = db.query(Design)
 
-    if active_only:
-        query = query.filter(Design.is_active == True)
+    def load():
+        designs = get_designs(
+            db=db, skip=skip, limit=limit, active_only=active_only, **filters
+        )
+        return [DesignResponse.from_orm(design) for design in designs]
+
+    params = {"skip": skip, "limit": limit, "active_only": active_only, **filters}
+    return conditional_response(
+        request,
+        "designs",
+        catalog_cache.version("designs"),
+        params,
+        lambda: catalog_cache.json_response("designs", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
+
+
+@router.get("/facets", response_model=DesignFacets)
+def get_design_facets_endpoint(
+    request: Request,
+    active_only: bool = True,
+    filters: Dict[str, Any] = Depends(design_filters),
+    db: Session = Depends(get_db),
+):
+    """
+    Count designs per style type, category and price band.
+
+    Accepts the same filters as the design listing; counts are computed over
+    the designs matching all of them.
+    """
+
+    def load():
+        return get_design_facets(db, active_only=active_only, **filters)
+
+    params = {"facets": True, "active_only": active_only, **filters}
+    return conditional_response(
+        request,
+        "designs",
+        catalog_cache.version("designs"),
+        params,
+        lambda: catalog_cache.json_response("designs", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
+
+
+@router.get("/search", response_model=List[DesignResponse])
+def search_designs_endpoint(
+    request: Request,
+    q: str = Query(
+        ..., min_length=1, max_length=200, description="Search text (Arabic or English)"
+    ),
+    skip: int = Query(0, ge=0, le=settings.DESIGN_SEARCH_MAX_OFFSET),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """
+    Search active designs by name and description.
+
+    Results are ranked by relevance (full-text match plus name similarity).
 
-    if style_type:
-        query = query.filter(Design.style_type == style_type)
+    - **q**: Search text; supports quoted phrases and `-word` exclusions
+    - **skip**: Number of results to skip (for pagination), at most `DESIGN_SEARCH_MAX_OFFSET`
+    - **limit**: Maximum number of results to return
+    """
+    q = normalize_search_query(q)
+    if not q:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Search text must not be blank",
+        )
 
-    if category_id:
-        query = query.filter(Design.category_id == category_id)
+    def load():
+        designs = search_designs(db, q=q, skip=skip, limit=limit)
+        return [DesignResponse.from_orm(design) for design in designs]
+
+    params = {"search": q, "skip": skip, "limit": limit}
+    return conditional_response(
+        request,
+        "designs",
+        catalog_cache.version("designs"),
+        params,
+        lambda: catalog_cache.json_response("designs", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
+
+
+@router.get("/fit", response_model=List[DesignFit])
+def fit_designs(
+    measurement_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Active designs with at least one size that fits a measurement.
 
-    designs = query.order_by(Design.created_at.desc()).offset(skip).limit(limit).all()
-    return designs
+    Sizes come from each design's compiled size chart
+    (``customization_rules["sizes"]``). Customers can fit their own
+    measurements; tailors and admins can fit anyone's.
+    """
+    measurement = get_measurement(db, measurement_id)
+    if measurement is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Measurement not found",
+        )
+    if (
+        measurement.user_id != current_user.id
+        and not current_user.is_superuser
+        and current_user.role not in (UserRole.TAILOR, UserRole.ADMIN)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this measurement",
+        )
+
+    fits = get_fitting_designs(
+        db, typed_measurement_values(measurement.measurements), skip, limit
+    )
+    return [DesignFit(design=design, sizes=sizes) for design, sizes in fits]
 
 
 @router.get("/me", response_model=List[DesignResponse])
@@ -74,19 +237,101 @@ def get_my_designs(
 
 
 @router.get("/{design_id}", response_model=DesignResponse)
-def get_design_by_id(design_id: str, db: Session = Depends(get_db)):
+def get_design_by_id(design_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Get a specific design by ID.
     """
+
+    def load():
+        design = get_design(db, design_id)
+
+        if not design:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Design not found",
+            )
+
+        return DesignResponse.from_orm(design)
+
+    params = {"id": design_id}
+    return conditional_response(
+        request,
+        "designs",
+        catalog_cache.version("designs"),
+        params,
+        lambda: catalog_cache.json_response("designs", params, load),
+        CATALOG_CACHE_CONTROL,
+    )
+
+
+@router.get("/{design_id}/image")
+def get_design_image(
+    design_id: str,
+    size: Optional[str] = Query(
+        None, regex=SIZE_PATTERN, description="Thumbnail size (default: the original)"
+    ),
+    format: str = Query("webp", regex=FORMAT_PATTERN),
+    db: Session = Depends(get_db),
+):
+    """Redirect to a design's base image, or to one of its thumbnails (404 until generated)."""
     design = get_design(db, design_id)
+    if design is None or not design.base_image_url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
+        )
+    return image_response(
+        design.base_image_url,
+        design.base_image_derivatives,
+        size,
+        format,
+        allow_urls=True,
+    )
+
+
+@router.post("/{design_id}/options/validate", response_model=DesignOptionsResult)
+def validate_design_options(
+    design_id: UUID,
+    payload: DesignOptionsRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Check a customer's selected options against a design's customization rules.
 
-    if not design:
+    Returns the options with defaults applied and the resulting price. The
+    rules are compiled once per design version and cached.
+    """
+    design = (
+        db.query(Design.id, Design.rules_version, Design.base_price)
+        .filter(Design.id == design_id, Design.is_active == True)
+        .first()
+    )
+    if design is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Design not found",
         )
 
-    return design
+    try:
+        rules = compiled_rules_cache.get(
+            design.id,
+            design.rules_version,
+            lambda: db.query(Design.customization_rules)
+            .filter(Design.id == design_id)
+            .scalar(),
+        )
+    except ValueError:
+        # Rules stored before validation existed (see revalidate_design_rules.py)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This design's customization rules are invalid",
+        )
+    evaluation = rules.evaluate(payload.options)
+    return DesignOptionsResult(
+        valid=evaluation.valid,
+        errors=evaluation.errors,
+        options=evaluation.options,
+        price=design.base_price + evaluation.surcharge,
+    )
 
 
 @router.post("/", response_model=DesignResponse, status_code=status.HTTP_201_CREATED)
@@ -113,6 +358,9 @@ def create_new_design(
 
     # Create new design using CRUD
     new_design = create_design(db=db, design=design_data, owner_id=current_user.id)
+    catalog_cache.invalidate("designs")
+    if new_design.base_image_url:
+        derivative_worker.submit("design", new_design.id)
     return new_design
 
 
@@ -156,6 +404,9 @@ def update_existing_design(
 
     # Update design using CRUD
     updated_design = update_design(db=db, design_id=design_id, design=design_data)
+    catalog_cache.invalidate("designs")
+    if "base_image_url" in design_data.dict(exclude_unset=True):
+        derivative_worker.submit("design", design_id)
     return updated_design
 
 
@@ -187,4 +438,5 @@ def delete_existing_design(
 
     # Delete design using CRUD
     delete_design(db=db, design_id=design_id)
+    catalog_cache.invalidate("designs")
     return None
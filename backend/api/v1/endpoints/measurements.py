@@ -2,33 +2,68 @@
 Measurements endpoints for photo upload and processing.
 """
 
-import os
+import math
+import mimetypes
 import uuid
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import aiofiles
+from starlette.requests import ClientDisconnect
 
+from core.cache import catalog_cache, serialize
+from core.config import settings
 from core.database import get_db
-from core.deps import get_current_user
+from core.deps import get_current_user, is_tailor_or_admin
+from core.etag import PRIVATE_CACHE_CONTROL, conditional_response
+from core.security import create_access_token, verify_access_token
+from models.roles import UserRole
 from models.user import User
 from models.measurement import Measurement
 from schemas.measurement import (
     MeasurementProcessResponse,
     MeasurementUploadResponse,
+    PhotoFinalizeRequest,
+    PhotoUploadRequest,
+    PhotoUploadTarget,
+    PhotoUploadTicket,
     MeasurementCreate,
     MeasurementUpdate,
     MeasurementResponse,
+    MeasurementSummary,
+    SimilarMeasurement,
 )
 from crud import measurement as measurement_crud
-from services.ai_client import ai_client, AIServiceError
+from services.ai_client import ai_client, AIRequestInvalid, AIServiceError, AIServiceUnavailable
+from services.measurement_index import measurement_index
+from services.derivatives import FORMAT_PATTERN, SIZE_PATTERN, derivative_worker, image_response
+from services.photo_store import (
+    PhotoChecksumMismatch,
+    PhotoMissing,
+    PhotoTooLarge,
+    UPLOAD_TOKEN_GRACE,
+    is_user_photo_path,
+    photo_store,
+)
+from services.resumable_uploads import (
+    UploadBusy,
+    UploadLengthExceeded,
+    UploadNotFound,
+    UploadOffsetMismatch,
+    UploadSession,
+    resumable_uploads,
+)
 
 router = APIRouter()
 
 # Configuration
-# Use workspace-local uploads directory by default so tests can write files.
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/workspaces/Qeyafa/backend/uploads")
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png"}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_TOKEN_PURPOSE = "photo_upload"
+VIEWS = ("front", "back", "left", "right")
+RESUMABLE_CONTENT_TYPE = "application/offset+octet-stream"
 
 
 def allowed_file(filename: str) -> bool:
@@ -51,40 +86,120 @@ def validate_file(file: UploadFile) -> None:
         )
 
 
-async def save_upload_file(file: UploadFile, user_id: uuid.UUID) -> str:
+async def save_upload_file(file: UploadFile) -> str:
     """
-    Save uploaded file to disk.
+    Save an uploaded photo to the content-addressed photo store.
 
     Args:
         file: The uploaded file
-        user_id: ID of the user uploading the file
 
     Returns:
-        Relative path to the saved file
+        Path of the stored photo, relative to UPLOAD_DIR
     """
-    # Create user-specific directory
-    user_dir = os.path.join(UPLOAD_DIR, str(user_id))
-    os.makedirs(user_dir, exist_ok=True)
+    try:
+        return await photo_store.save(file)
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+
+async def run_processing(
+    files: Dict[str, Tuple[str, bytes, Optional[str]]],
+    image_paths: Dict[str, str],
+    height: float,
+    weight: float,
+    current_user: User,
+    db: Session,
+    upload_token_id: Optional[str] = None,
+) -> MeasurementProcessResponse:
+    """
+    Send the four views to the AI service and record the resulting measurement.
 
-    # Generate unique filename
-    file_ext = file.filename.rsplit(".", 1)[1].lower()
-    unique_filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(user_dir, unique_filename)
+    ``upload_token_id`` binds the measurement to the ``/finalize`` token it
+    came from; a second measurement for the same token is rejected with 409.
+    """
+    # Call AI service
+    try:
+        ai_result = await ai_client.process_measurement_files(files, height, weight)
+    except AIServiceUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service error: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except AIRequestInvalid as e:
+        # The photos are at fault, not the service; retrying will not help
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    except AIServiceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service error: {str(e)}",
+        )
 
-    # Save file using aiofiles to prevent blocking
-    contents = await file.read()
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(contents)
+    # Extract results from AI service response
+    if ai_result.get("status") != "success":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="AI service returned unsuccessful status",
+        )
 
-    # Reset file pointer for potential reuse
-    await file.seek(0)
+    ai_data = ai_result.get("data", {})
+    measurements_dict = ai_data.get("measurements", {})
+    confidence = ai_data.get("confidence", 0.0)
+
+    # Create measurement record
+    measurement = Measurement(
+        user_id=current_user.id,
+        measurements=measurements_dict,
+        image_paths=image_paths,
+        confidence_score=confidence,
+        upload_token_id=upload_token_id,
+        **measurement_crud.typed_measurement_values(measurements_dict),
+    )
 
-    return f"{user_id}/{unique_filename}"
+    db.add(measurement)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent /finalize with the same token got there first
+        db.rollback()
+        if upload_token_id is None:
+            raise
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload token has already been used")
+    db.refresh(measurement)
+    catalog_cache.invalidate(measurement_crud.measurements_namespace(current_user.id))
+    derivative_worker.submit("measurement", measurement.id)
+
+    return MeasurementProcessResponse(
+        id=measurement.id,
+        user_id=measurement.user_id,
+        measurements=measurements_dict,
+        confidence_score=measurement.confidence_score,
+        processed_at=measurement.processed_at,
+    )
 
 
 # CRUD endpoints for manual measurements
 
 
+def check_image_paths(image_paths: Optional[Dict[str, str]], user_id: uuid.UUID) -> None:
+    """
+    Reject image paths a measurement of ``user_id`` may not reference.
+
+    Only uploaded photos are accepted - content-addressed keys, or the
+    user's own legacy uploads. URLs and other storage keys would have the
+    thumbnail worker fetch them and the image route sign or redirect to them.
+    """
+    for view, path in (image_paths or {}).items():
+        if not is_user_photo_path(path, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"image_paths.{view} is not an uploaded photo",
+            )
+
+
 @router.post("/", response_model=MeasurementResponse, status_code=status.HTTP_201_CREATED)
 def create_measurement_endpoint(
     payload: MeasurementCreate,
@@ -92,20 +207,96 @@ def create_measurement_endpoint(
     db: Session = Depends(get_db),
 ):
     """Create a manual measurement record for the authenticated user."""
+    check_image_paths(payload.image_paths, current_user.id)
     db_measurement = measurement_crud.create_measurement(db, current_user.id, payload)
+    if payload.image_paths:
+        derivative_worker.submit("measurement", db_measurement.id)
     return db_measurement
 
 
 @router.get("/", response_model=list[MeasurementResponse])
 def list_measurements_for_user(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """List measurements belonging to the authenticated user."""
-    measurements = measurement_crud.get_measurements_for_user(db, current_user.id, skip, limit)
-    return measurements
+    namespace = measurement_crud.measurements_namespace(current_user.id)
+
+    def build():
+        measurements = measurement_crud.get_measurements_for_user(db, current_user.id, skip, limit)
+        return Response(
+            content=serialize([MeasurementResponse.from_orm(m) for m in measurements]),
+            media_type="application/json",
+        )
+
+    return conditional_response(
+        request,
+        namespace,
+        catalog_cache.version(namespace),
+        {"skip": skip, "limit": limit},
+        build,
+        PRIVATE_CACHE_CONTROL,
+    )
+
+
+def analytics_fields(
+    field: Optional[List[str]] = Query(
+        None, description=f"Measurements to include (default: all of {', '.join(measurement_crud.MEASUREMENT_FIELDS)})"
+    ),
+) -> List[str]:
+    """Validate the requested analytics fields, keeping their request order."""
+    if not field:
+        return list(measurement_crud.MEASUREMENT_FIELDS)
+    unknown = sorted(set(field) - set(measurement_crud.MEASUREMENT_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown measurement field(s): {', '.join(unknown)}",
+        )
+    return list(dict.fromkeys(field))
+
+
+@router.get("/analytics/history")
+def measurement_history(
+    user_id: Optional[uuid.UUID] = Query(None, description="Customer to report on (default: yourself)"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: List[str] = Depends(analytics_fields),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Measurement history of one customer as columnar JSON.
+
+    Each key (``id``, ``processed_at``, ``<field>``, ``<field>_delta``) maps
+    to an array in chronological order. Customers can read their own history;
+    tailors and admins can read anyone's.
+    """
+    target_id = user_id or current_user.id
+    if (
+        target_id != current_user.id
+        and not current_user.is_superuser
+        and current_user.role not in (UserRole.TAILOR, UserRole.ADMIN)
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access these measurements")
+
+    body = measurement_crud.get_measurement_history(db, target_id, fields, since, until)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/analytics/summary", response_model=MeasurementSummary)
+def measurement_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: List[str] = Depends(analytics_fields),
+    current_user: User = Depends(is_tailor_or_admin),
+    db: Session = Depends(get_db),
+):
+    """Per-field statistics across customers (latest measurement of each), for tailors and admins."""
+    return measurement_crud.get_measurement_summary(db, fields, since, until)
 
 
 @router.get("/{measurement_id}", response_model=MeasurementResponse)
@@ -123,6 +314,71 @@ def get_measurement_endpoint(
     return measurement
 
 
+@router.get("/{measurement_id}/similar", response_model=list[SimilarMeasurement])
+def similar_measurements(
+    measurement_id: uuid.UUID,
+    k: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(is_tailor_or_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Customers whose latest measurement is closest to this one (tailors and admins only).
+
+    Answered from the in-memory index in services.measurement_index; the
+    owner's own entry is excluded. The results are other customers' body
+    measurements, so customers cannot call this.
+    """
+    measurement = measurement_crud.get_measurement(db, measurement_id)
+    if measurement is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Measurement not found")
+
+    values = [getattr(measurement, field) for field in measurement_crud.MEASUREMENT_FIELDS]
+    if any(value is None for value in values):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Measurement must include {', '.join(measurement_crud.MEASUREMENT_FIELDS)}",
+        )
+
+    neighbours = measurement_index.search(db, values, k, exclude_user_id=measurement.user_id)
+    return [
+        SimilarMeasurement(distance=neighbour.distance, measurements=neighbour.values)
+        for neighbour in neighbours
+    ]
+
+
+@router.get("/{measurement_id}/images/{view}")
+def get_measurement_image(
+    measurement_id: uuid.UUID,
+    view: str,
+    size: Optional[str] = Query(None, regex=SIZE_PATTERN, description="Thumbnail size (default: the original)"),
+    format: str = Query("webp", regex=FORMAT_PATTERN),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Redirect to a photo of a measurement, or to one of its thumbnails.
+
+    Thumbnails are generated in the background after upload; until then
+    asking for one answers 404. Owners, tailors and admins only.
+    """
+    measurement = measurement_crud.get_measurement(db, measurement_id)
+    if measurement is None or view not in measurement.image_paths:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    if (
+        measurement.user_id != current_user.id
+        and not current_user.is_superuser
+        and current_user.role not in (UserRole.TAILOR, UserRole.ADMIN)
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this measurement")
+
+    source = measurement.image_paths[view]
+    # Records written before image paths were checked may hold anything
+    if not is_user_photo_path(source, measurement.user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    derivatives = (measurement.image_derivatives or {}).get(view)
+    return image_response(source, derivatives, size, format)
+
+
 @router.put("/{measurement_id}", response_model=MeasurementResponse)
 def update_measurement_endpoint(
     measurement_id: uuid.UUID,
@@ -136,8 +392,11 @@ def update_measurement_endpoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Measurement not found")
     if measurement.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this measurement")
+    check_image_paths(payload.image_paths, current_user.id)
 
     updated = measurement_crud.update_measurement(db, measurement_id, payload)
+    if payload.image_paths is not None:
+        derivative_worker.submit("measurement", measurement_id)
     return updated
 
 
@@ -166,7 +425,9 @@ async def upload_single_image(
     """Upload a single image for later association with a measurement."""
     validate_file(file)
     try:
-        path = await save_upload_file(file, current_user.id)
+        path = await save_upload_file(file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save file: {str(e)}")
 
@@ -209,8 +470,10 @@ async def upload_photos(
     saved_paths = {}
     try:
         for name, photo in photos.items():
-            path = await save_upload_file(photo, current_user.id)
+            path = await save_upload_file(photo)
             saved_paths[name] = path
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -265,56 +528,210 @@ async def process_measurements(
         # Save photos
         saved_paths = {}
         for name, photo in photos.items():
-            path = await save_upload_file(photo, current_user.id)
+            path = await save_upload_file(photo)
             saved_paths[name] = path
 
-        # Call AI service
-        try:
-            ai_result = await ai_client.process_measurements(
-                photo_front=photo_front,
-                photo_back=photo_back,
-                photo_left=photo_left,
-                photo_right=photo_right,
-                height=height,
-                weight=weight,
-            )
-        except AIServiceError as e:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"AI service error: {str(e)}",
-            )
+        files = {
+            name: (photo.filename, await photo.read(), photo.content_type)
+            for name, photo in photos.items()
+        }
+        return await run_processing(files, saved_paths, height, weight, current_user, db)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process measurements: {str(e)}",
+        )
+
+
+@router.post("/uploads", response_model=PhotoUploadTicket)
+async def create_photo_uploads(
+    payload: PhotoUploadRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Signed URLs for uploading the four views directly to storage.
 
-        # Extract results from AI service response
-        if ai_result.get("status") != "success":
+    Each URL accepts exactly the photo described in the request (its
+    SHA-256 and content type are part of the signature). Views whose photo
+    is already stored get no URL. Upload with the returned method and
+    headers, then call ``/finalize`` with ``upload_token``.
+
+    With ``resumable`` the URLs are resumable upload sessions on this API
+    instead (see ``PATCH /uploads/resumable/{upload_id}``).
+    """
+    if payload.resumable:
+        expires_in = settings.UPLOAD_STAGING_EXPIRES_SECONDS
+    else:
+        expires_in = settings.STORAGE_PRESIGN_EXPIRES_SECONDS
+    uploads = {}
+    for view in VIEWS:
+        spec = getattr(payload, view)
+        if spec.size > photo_store.max_size:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI service returned unsuccessful status",
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"{view} photo is larger than {photo_store.max_size / (1024 * 1024):g}MB",
             )
+        if payload.resumable:
+            session = await resumable_uploads.create(current_user.id, spec.sha256, spec.size, spec.content_type)
+            if session.complete:
+                uploads[view] = PhotoUploadTarget(key=session.key)
+            else:
+                uploads[view] = PhotoUploadTarget(
+                    key=session.key,
+                    url=f"{settings.API_V1_PREFIX}/measurements/uploads/resumable/{session.id}",
+                    method="PATCH",
+                    headers={"Content-Type": RESUMABLE_CONTENT_TYPE, "Upload-Offset": "0"},
+                )
+            continue
+
+        key, upload = await photo_store.presign_upload(spec.sha256, spec.content_type, expires_in)
+        if upload is None:
+            uploads[view] = PhotoUploadTarget(key=key)
+        else:
+            uploads[view] = PhotoUploadTarget(key=key, url=upload.url, method=upload.method, headers=upload.headers)
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    upload_token = create_access_token(
+        {
+            "purpose": UPLOAD_TOKEN_PURPOSE,
+            "jti": uuid.uuid4().hex,
+            "uid": str(current_user.id),
+            "keys": {view: target.key for view, target in uploads.items()},
+        },
+        expires_delta=timedelta(seconds=expires_in) + UPLOAD_TOKEN_GRACE,
+    )
+    return PhotoUploadTicket(upload_token=upload_token, expires_at=expires_at, uploads=uploads)
+
 
-        ai_data = ai_result.get("data", {})
-        measurements_dict = ai_data.get("measurements", {})
-        confidence = ai_data.get("confidence", 0.0)
+def _upload_headers(session: UploadSession) -> Dict[str, str]:
+    return {
+        "Upload-Offset": str(session.offset),
+        "Upload-Length": str(session.size),
+        "Upload-Expires": formatdate(session.expires_at, usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+
+async def _get_upload_session(upload_id: str, current_user: User) -> UploadSession:
+    try:
+        return await resumable_uploads.get(upload_id, current_user.id)
+    except UploadNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found or expired")
 
-        # Create measurement record
-        measurement = Measurement(
-            user_id=current_user.id,
-            measurements=measurements_dict,
-            image_paths=saved_paths,
-            confidence_score=confidence,
+
+@router.head("/uploads/resumable/{upload_id}")
+async def resumable_upload_status(upload_id: str, current_user: User = Depends(get_current_user)):
+    """How much of a resumable upload has arrived (``Upload-Offset``) out of ``Upload-Length``."""
+    session = await _get_upload_session(upload_id, current_user)
+    return Response(status_code=status.HTTP_200_OK, headers=_upload_headers(session))
+
+
+@router.patch("/uploads/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Append the request body to a resumable upload at ``Upload-Offset``.
+
+    Bytes that arrive before a dropped connection are kept; ask for the
+    offset with ``HEAD`` and send the rest. A chunk that does not start at the
+    current offset gets 409 with the current ``Upload-Offset``. Once the last
+    byte is in, the photo is verified and stored, ready for ``/finalize``.
+    """
+    if request.headers.get("content-type") != RESUMABLE_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be {RESUMABLE_CONTENT_TYPE}",
         )
+    session = await _get_upload_session(upload_id, current_user)
 
-        db.add(measurement)
-        db.commit()
-        db.refresh(measurement)
-
-        return MeasurementProcessResponse(
-            id=measurement.id,
-            user_id=measurement.user_id,
-            measurements=measurements_dict,
-            confidence_score=measurement.confidence_score,
-            processed_at=measurement.processed_at,
+    async def body():
+        try:
+            async for chunk in request.stream():
+                yield chunk
+        except ClientDisconnect:
+            return
+
+    try:
+        session = await resumable_uploads.append(session, upload_offset, body())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.offset)},
+        )
+    except UploadBusy:
+        raise HTTPException(status_code=status.HTTP_423_LOCKED, detail="Another request is appending to this upload")
+    except UploadLengthExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload is limited to {session.size} bytes",
         )
+    except PhotoChecksumMismatch:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload does not match its checksum; start a new upload",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_upload_headers(session))
+
+
+@router.delete("/uploads/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_resumable_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Discard a resumable upload and its received bytes."""
+    session = await _get_upload_session(upload_id, current_user)
+    await resumable_uploads.cancel(session)
+
+
+@router.post("/finalize", response_model=MeasurementProcessResponse)
+async def finalize_photo_uploads(
+    payload: PhotoFinalizeRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Process photos uploaded with the URLs from ``/uploads``.
+
+    Every view must be in storage with content matching its checksum;
+    otherwise nothing is processed. Each upload token yields at most one
+    measurement; using it again gets 409.
+    """
+    claims = verify_access_token(payload.upload_token)
+    if (
+        claims is None
+        or claims.get("purpose") != UPLOAD_TOKEN_PURPOSE
+        or claims.get("uid") != str(current_user.id)
+        or not claims.get("jti")
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired upload token")
+    keys: Dict[str, str] = claims["keys"]
+    token_id: str = claims["jti"]
+    if db.query(Measurement.id).filter(Measurement.upload_token_id == token_id).first() is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload token has already been used")
+
+    files = {}
+    for view in VIEWS:
+        key = keys[view]
+        try:
+            content = await photo_store.load(key)
+        except PhotoMissing:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{view} photo has not been uploaded")
+        except PhotoChecksumMismatch:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"{view} photo does not match its checksum"
+            )
+        except PhotoTooLarge as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        files[view] = (key.rsplit("/", 1)[1], content, mimetypes.guess_type(key)[0])
 
+    try:
+        return await run_processing(files, keys, payload.height, payload.weight, current_user, db, token_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,124 @@
+"""
+Signed upload/download endpoints for the local storage backend.
+
+With ``STORAGE_BACKEND=local`` the URLs from ``storage.presign_put`` and
+``storage.presign_get`` point here, so clients upload and download objects
+the same way they would against S3. With the S3 backend these routes are
+unused and answer 404.
+"""
+
+import base64
+import binascii
+import hashlib
+import mimetypes
+import time
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from services.derivatives import IMMUTABLE_CACHE_CONTROL, is_derivative_key
+from services.photo_store import MAX_PHOTO_SIZE, is_blob_path
+from services.storage import LocalStorage, storage, verify_local_signature
+
+router = APIRouter()
+
+
+class _ChecksumMismatch(Exception):
+    pass
+
+
+class _TooLarge(Exception):
+    pass
+
+
+def _local_storage() -> LocalStorage:
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return storage
+
+
+@router.put("/{key:path}")
+async def put_object(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """Store the request body under ``key`` using a URL from ``presign_put``."""
+    local = _local_storage()
+    content_type = request.headers.get("content-type", "")
+    checksum = request.headers.get("x-amz-checksum-sha256", "")
+    try:
+        expected = base64.b64decode(checksum, validate=True).hex() if checksum else ""
+    except binascii.Error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid x-amz-checksum-sha256",
+        )
+
+    if not verify_local_signature(
+        "PUT", key, expires, signature, content_type, expected
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature"
+        )
+
+    async def body() -> AsyncIterator[bytes]:
+        digest = hashlib.sha256()
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_PHOTO_SIZE:
+                raise _TooLarge()
+            digest.update(chunk)
+            yield chunk
+        # Raising inside the stream makes put() discard the partial object
+        if expected and digest.hexdigest() != expected:
+            raise _ChecksumMismatch()
+
+    try:
+        await local.put(key, body(), content_type=content_type or None)
+    except _ChecksumMismatch:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Content does not match x-amz-checksum-sha256",
+        )
+    except _TooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Object is larger than {MAX_PHOTO_SIZE / (1024 * 1024):g}MB",
+        )
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@router.get("/{key:path}")
+async def get_object(
+    key: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """Stream ``key`` using a URL from ``presign_get``."""
+    local = _local_storage()
+    if not verify_local_signature("GET", key, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature"
+        )
+
+    info = await local.stat(key)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    if is_blob_path(key) or is_derivative_key(key):
+        # Content-addressed, so the content under this URL never changes
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = f"private, max-age={max(0, expires - int(time.time()))}"
+    return StreamingResponse(
+        local.get(key),
+        media_type=mimetypes.guess_type(key)[0] or "application/octet-stream",
+        headers={
+            "Content-Length": str(info.size),
+            "Cache-Control": cache_control,
+        },
+    )
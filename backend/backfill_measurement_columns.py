@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Backfill the typed measurement columns (chest, waist, ...) from the JSONB document.
+
+Walks ``measurements`` in primary-key order, updating one batch per
+transaction, so it can run against a live database. Each batch prints the
+last id it processed; pass it to ``--start-after`` to resume an interrupted
+run. Re-running over rows that are already filled is harmless.
+
+Usage (from the backend directory, after ``alembic upgrade head``):
+    python backfill_measurement_columns.py --batch-size 5000
+    python backfill_measurement_columns.py --start-after <uuid>
+"""
+
+import argparse
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text
+
+from core.database import SessionLocal
+from crud.measurement import MEASUREMENT_FIELDS
+
+# Non-numeric values in the document are left as NULL rather than failing the batch
+_ASSIGNMENTS = ",\n    ".join(
+    f"{field} = CASE WHEN jsonb_typeof(m.measurements -> '{field}') = 'number' "
+    f"THEN (m.measurements ->> '{field}')::double precision END"
+    for field in MEASUREMENT_FIELDS
+)
+
+BACKFILL_BATCH = text(f"""
+    WITH batch AS (
+        SELECT id FROM measurements
+        WHERE id > CAST(:after AS uuid)
+        ORDER BY id
+        LIMIT :batch_size
+    )
+    UPDATE measurements AS m
+    SET {_ASSIGNMENTS},
+    updated_at = now()
+    FROM batch
+    WHERE m.id = batch.id
+    RETURNING m.id
+    """)
+
+
+def backfill(batch_size: int, start_after: uuid.UUID, pause: float) -> int:
+    """Fill the typed columns batch by batch; returns the number of rows updated."""
+    db = SessionLocal()
+    after = start_after
+    total = 0
+    try:
+        while True:
+            ids = (
+                db.execute(
+                    BACKFILL_BATCH, {"after": str(after), "batch_size": batch_size}
+                )
+                .scalars()
+                .all()
+            )
+            db.commit()
+            if not ids:
+                break
+            after = max(ids)
+            total += len(ids)
+            print(f"✅ {total} rows backfilled (last id {after})")
+            if pause:
+                time.sleep(pause)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill stopped: {e}")
+        print(f"   Resume with --start-after {after}")
+        raise
+    finally:
+        db.close()
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="Rows updated per transaction"
+    )
+    parser.add_argument(
+        "--start-after",
+        type=uuid.UUID,
+        default=uuid.UUID(int=0),
+        help="Resume after this measurement id",
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+    )
+    args = parser.parse_args()
+
+    try:
+        total = backfill(args.batch_size, args.start_after, args.pause)
+    except Exception:
+        return 1
+    print(f"✅ Backfill complete: {total} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
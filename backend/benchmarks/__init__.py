@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the backend.
+
+These scripts are not part of the pytest suite. ``design_search`` needs a
+real PostgreSQL database; ``api`` also runs against SQLite.
+"""
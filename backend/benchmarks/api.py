@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the backend's hot API endpoints.
+
+Seeds bench customers (with measurement history), categories and designs,
+then drives login, ``/users/me``, design listing (plain, filtered and deep
+pages) and measurement upload/process through the real ASGI app in-process,
+with the AI service replaced by ``benchmarks.stub_ai``. Reports p50/p95/p99
+latency and throughput per scenario and compares them with a JSON baseline;
+exits non-zero when a scenario regresses by more than ``--threshold``.
+
+Runs against PostgreSQL (migrated with ``alembic upgrade head``) or SQLite
+(schema created on the fly, see ``benchmarks.sqlite_compat``). Baselines are
+machine-specific; record one before and compare after a change on the same
+host. For traffic from separate processes, replay the same scenarios with
+Locust (``benchmarks/locustfile.py``) after ``--seed-only``.
+
+Usage (from the backend directory):
+    python -m benchmarks.api --database-url sqlite:///bench.db --save-baseline
+    python -m benchmarks.api --database-url sqlite:///bench.db --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, delete, func, insert, or_, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from benchmarks.scenarios import (
+    BENCH_DESIGNER_EMAIL,
+    BENCH_DOMAIN,
+    BENCH_PASSWORD,
+    SCENARIOS,
+    SCENARIOS_BY_NAME,
+    STYLE_TYPES,
+    BenchContext,
+    Scenario,
+    bench_user_email,
+    photo_bytes,
+)
+from core.config import settings
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+BENCH_CATEGORY_PREFIX = "Bench category"
+TOKEN_POOL_SIZE = 50
+
+
+# Data
+
+
+def _bench_users_clause():
+    from models import User
+
+    return or_(
+        User.email.like(f"bench-user-%@{BENCH_DOMAIN}"),
+        User.email == BENCH_DESIGNER_EMAIL,
+    )
+
+
+def seed(
+    engine, users: int, designs: int, measurements_per_user: int, batch_size: int
+) -> None:
+    """Top up bench users (with measurements), categories and designs to the requested counts."""
+    from core.security import hash_password
+    from models import Category, Design, Measurement, User, UserRole
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    hashed = hash_password(BENCH_PASSWORD)
+
+    with Session(engine) as db:
+        designer_id = db.scalar(
+            select(User.id).where(User.email == BENCH_DESIGNER_EMAIL)
+        )
+        if designer_id is None:
+            designer_id = uuid.uuid4()
+            db.execute(
+                insert(User),
+                [
+                    {
+                        "id": designer_id,
+                        "email": BENCH_DESIGNER_EMAIL,
+                        "hashed_password": hashed,
+                        "role": UserRole.DESIGNER,
+                        "is_active": True,
+                        "is_superuser": False,
+                    }
+                ],
+            )
+
+        category_ids = list(
+            db.scalars(
+                select(Category.id).where(
+                    Category.name.like(f"{BENCH_CATEGORY_PREFIX} %")
+                )
+            )
+        )
+        if not category_ids:
+            category_ids = [uuid.uuid4() for _ in range(12)]
+            db.execute(
+                insert(Category),
+                [
+                    {
+                        "id": category_id,
+                        "name": f"{BENCH_CATEGORY_PREFIX} {i}",
+                        "is_active": True,
+                    }
+                    for i, category_id in enumerate(category_ids)
+                ],
+            )
+        db.commit()
+
+        existing = db.scalar(
+            select(func.count()).where(User.email.like(f"bench-user-%@{BENCH_DOMAIN}"))
+        )
+        print(f"Existing bench users: {existing}")
+        for start in range(existing, users, batch_size):
+            user_rows, measurement_rows = [], []
+            for i in range(start, min(start + batch_size, users)):
+                user_id = uuid.uuid4()
+                user_rows.append(
+                    {
+                        "id": user_id,
+                        "email": bench_user_email(i),
+                        "hashed_password": hashed,
+                        "first_name": "Bench",
+                        "last_name": str(i),
+                        "role": UserRole.CUSTOMER,
+                        "is_active": True,
+                        "is_superuser": False,
+                    }
+                )
+                scale = rng.uniform(0.85, 1.15)
+                for j in range(measurements_per_user):
+                    values = {
+                        "chest": round(96 * scale + rng.gauss(0, 1.5), 1),
+                        "waist": round(82 * scale + rng.gauss(0, 1.5), 1),
+                        "shoulders": round(45 * scale + rng.gauss(0, 0.5), 1),
+                        "arm_length": round(62 * scale + rng.gauss(0, 0.5), 1),
+                        "neck": round(38 * scale + rng.gauss(0, 0.3), 1),
+                        "hip": round(98 * scale + rng.gauss(0, 1.5), 1),
+                    }
+                    measurement_rows.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "user_id": user_id,
+                            "measurements": values,
+                            "image_paths": {
+                                side: f"{user_id}/{side}-{j}.jpg"
+                                for side in ("front", "back", "left", "right")
+                            },
+                            "confidence_score": round(rng.uniform(0.7, 0.99), 2),
+                            "processed_at": now
+                            - timedelta(
+                                days=30 * (measurements_per_user - j), seconds=i
+                            ),
+                            **values,
+                        }
+                    )
+            db.execute(insert(User), user_rows)
+            if measurement_rows:
+                db.execute(insert(Measurement), measurement_rows)
+            db.commit()
+            print(f"  seeded users {start + len(user_rows)}/{users}")
+
+        existing = db.scalar(select(func.count()).where(Design.owner_id == designer_id))
+        print(f"Existing bench designs: {existing}")
+        for start in range(existing, designs, batch_size):
+            db.execute(
+                insert(Design),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "name": f"{rng.choice(['Classic', 'Modern', 'Royal', 'Summer'])} {STYLE_TYPES[i % len(STYLE_TYPES)]} {i}",
+                        "description": "Benchmark design",
+                        "base_price": float(20 + i % 480),
+                        "owner_id": designer_id,
+                        "style_type": STYLE_TYPES[i % len(STYLE_TYPES)],
+                        "category_id": category_ids[i % len(category_ids)],
+                        "customization_rules": {},
+                        "is_active": i % 10 != 0,
+                        "created_at": now - timedelta(seconds=i),
+                    }
+                    for i in range(start, min(start + batch_size, designs))
+                ],
+            )
+            db.commit()
+            print(f"  seeded designs {min(start + batch_size, designs)}/{designs}")
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def cleanup(engine) -> None:
+    """Remove every bench user, their measurements and designs, and the bench categories."""
+    from models import Category, Design, Measurement, User
+
+    with engine.begin() as conn:
+        bench_users = select(User.id).where(_bench_users_clause())
+        conn.execute(delete(Measurement).where(Measurement.user_id.in_(bench_users)))
+        conn.execute(delete(Design).where(Design.owner_id.in_(bench_users)))
+        conn.execute(
+            delete(Category).where(Category.name.like(f"{BENCH_CATEGORY_PREFIX} %"))
+        )
+        conn.execute(delete(User).where(_bench_users_clause()))
+    print("Benchmark data removed.")
+
+
+def counts(engine) -> Dict[str, int]:
+    from models import Design, User
+
+    with Session(engine) as db:
+        return {
+            "users": db.scalar(
+                select(func.count()).where(
+                    User.email.like(f"bench-user-%@{BENCH_DOMAIN}")
+                )
+            ),
+            "designs": db.scalar(
+                select(func.count())
+                .select_from(Design)
+                .join(User, Design.owner_id == User.id)
+                .where(User.email == BENCH_DESIGNER_EMAIL)
+            ),
+        }
+
+
+# Load
+
+
+class _UnlimitedRedis:
+    """Stands in for Redis so fastapi-limiter admits every request (login is rate limited)."""
+
+    async def script_load(self, script):
+        return "bench"
+
+    async def evalsha(self, sha, keys, *args):
+        return 0
+
+
+def start_stub_ai(latency_ms: float) -> str:
+    """Serve ``benchmarks.stub_ai`` on a free local port; return its base URL."""
+    from benchmarks.stub_ai import serve_in_thread
+
+    return serve_in_thread(latency_ms)[0]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ctx: BenchContext,
+    tokens: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Send ``requests`` requests from ``concurrency`` workers; return latency stats in ms."""
+    rng = random.Random(scenario.name)
+    samples: List[float] = []
+    statuses: Counter = Counter()
+
+    async def send(record: bool) -> None:
+        kwargs = scenario.build(rng, ctx)
+        if scenario.auth:
+            kwargs["headers"] = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        t0 = time.perf_counter()
+        response = await client.request(scenario.method, scenario.path, **kwargs)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if record:
+            samples.append(elapsed)
+            statuses[response.status_code] += 1
+
+    for _ in range(warmup):
+        await send(record=False)
+
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            await send(record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(n for status, n in statuses.items() if status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+    }
+
+
+async def run(
+    app, scenarios: List[Scenario], ctx: BenchContext, tokens: List[str], args
+) -> Dict[str, Any]:
+    from fastapi_limiter import FastAPILimiter
+
+    await FastAPILimiter.init(_UnlimitedRedis())
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=60
+    ) as client:
+        for scenario in scenarios:
+            stats = await run_scenario(
+                client,
+                scenario,
+                ctx,
+                tokens,
+                args.requests,
+                args.concurrency,
+                args.warmup,
+            )
+            results[scenario.name] = stats
+            print(
+                f"{scenario.name:<22} p50={stats['p50_ms']:8.1f}ms p95={stats['p95_ms']:8.1f}ms "
+                f"p99={stats['p99_ms']:8.1f}ms {stats['throughput_rps']:8.1f} req/s  errors={stats['errors']}"
+            )
+    return results
+
+
+# Baselines
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Describe every scenario whose p95 or throughput regressed by more than ``threshold``."""
+    problems = []
+    for name, stats in results.items():
+        if stats["errors"]:
+            problems.append(
+                f"{name}: {stats['errors']} failed requests {stats['statuses']}"
+            )
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            problems.append(
+                f"{name}: p95 {stats['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms"
+            )
+        if stats["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            problems.append(
+                f"{name}: throughput {stats['throughput_rps']:.1f} req/s vs baseline {base['throughput_rps']:.1f} req/s"
+            )
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--designs", type=int, default=50_000)
+    parser.add_argument("--measurements-per-user", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument(
+        "--requests", type=int, default=300, help="Measured requests per scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS_BY_NAME),
+        help="Run only these scenarios",
+    )
+    parser.add_argument(
+        "--photo-kb", type=int, default=256, help="Size of each uploaded photo"
+    )
+    parser.add_argument(
+        "--ai-latency-ms", type=float, default=50.0, help="Delay of the stub AI service"
+    )
+    parser.add_argument(
+        "--ai-url",
+        help="Use an already running AI service instead of the in-process stub",
+    )
+    parser.add_argument(
+        "--ai-replicas", type=int, default=1, help="Stub AI replicas to balance across"
+    )
+    parser.add_argument(
+        "--ai-protocol",
+        choices=("multipart", "frame"),
+        default="multipart",
+        help="Encoding of AI processing calls",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the catalog response cache"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Baseline JSON (default: benchmarks/baselines/api-<dialect>.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write the results as the new baseline",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative regression (0.2 = 20%%)",
+    )
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument(
+        "--seed-only",
+        action="store_true",
+        help="Seed and exit (e.g. before a Locust run)",
+    )
+    parser.add_argument(
+        "--cleanup", action="store_true", help="Delete seeded rows and exit"
+    )
+    args = parser.parse_args()
+
+    engine_kwargs: Dict[str, Any] = {}
+    if args.database_url.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"check_same_thread": False, "timeout": 30}
+    engine = create_engine(args.database_url, **engine_kwargs)
+    dialect = engine.dialect.name
+
+    if dialect == "sqlite":
+        from benchmarks.sqlite_compat import create_schema
+
+        create_schema(engine)
+
+    if args.cleanup:
+        cleanup(engine)
+        return 0
+    if not args.skip_seed:
+        seed(
+            engine,
+            args.users,
+            args.designs,
+            args.measurements_per_user,
+            args.batch_size,
+        )
+    if args.seed_only:
+        return 0
+
+    seeded = counts(engine)
+    if not seeded["users"]:
+        print("❌ No bench users found; run without --skip-seed first")
+        return 1
+
+    # Must be set before the storage backend is created on import of the app
+    settings.UPLOAD_DIR = tempfile.mkdtemp(prefix="qeyafa-bench-")
+
+    from core.cache import catalog_cache
+    from core.database import get_db
+    from core.security import create_access_token
+    from main import app
+    from services.ai_client import ai_client
+
+    BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def bench_db():
+        db = BenchSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_db
+    if args.no_cache:
+        catalog_cache.enabled = False
+    if args.ai_url:
+        ai_client.base_urls = [args.ai_url]
+    else:
+        ai_client.base_urls = [
+            start_stub_ai(args.ai_latency_ms) for _ in range(args.ai_replicas)
+        ]
+    ai_client.wire_protocol = args.ai_protocol
+
+    token_rng = random.Random(7)
+    tokens = [
+        create_access_token(
+            {
+                "sub": bench_user_email(token_rng.randrange(seeded["users"])),
+                "role": "customer",
+            }
+        )
+        for _ in range(min(TOKEN_POOL_SIZE, seeded["users"]))
+    ]
+    ctx = BenchContext(
+        users=seeded["users"],
+        designs=seeded["designs"],
+        photo=photo_bytes(args.photo_kb),
+    )
+    scenarios = (
+        [SCENARIOS_BY_NAME[name] for name in args.scenario]
+        if args.scenario
+        else SCENARIOS
+    )
+
+    print(
+        f"Running {len(scenarios)} scenarios on {dialect}: {args.requests} requests each, "
+        f"concurrency {args.concurrency}, {seeded['users']} users, {seeded['designs']} designs"
+    )
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": dialect,
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": seeded["users"],
+            "designs": seeded["designs"],
+            "photo_kb": args.photo_kb,
+            "ai_latency_ms": None if args.ai_url else args.ai_latency_ms,
+            "ai_replicas": 1 if args.ai_url else args.ai_replicas,
+            "ai_protocol": args.ai_protocol,
+            "catalog_cache": not args.no_cache,
+        },
+        "scenarios": asyncio.run(run(app, scenarios, ctx, tokens, args)),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"api-{dialect}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline written to {baseline_path}")
+        return 0
+
+    baseline: Optional[Dict[str, Any]] = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    else:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+
+    problems = compare(results["scenarios"], baseline or {}, args.threshold)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
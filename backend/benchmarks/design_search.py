@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ``GET /designs/search`` at catalog scale.
+
+Seeds a PostgreSQL database with synthetic Arabic/English designs (1M by
+default), then times ``crud.design.search_designs`` for a set of queries and
+reports p50/p95/p99 latency. Exits non-zero if p95 exceeds the budget.
+
+Use a scratch database; seeded rows belong to a dedicated owner and can be
+removed with ``--cleanup``.
+
+Usage (from the backend directory, after ``alembic upgrade head``):
+    python -m benchmarks.design_search --rows 1000000 --budget-ms 50
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from crud.design import search_designs
+
+BENCH_OWNER_EMAIL = "bench-search@qeyafa.local"
+
+ADJECTIVES_EN = [
+    "classic",
+    "modern",
+    "royal",
+    "summer",
+    "winter",
+    "silk",
+    "linen",
+    "embroidered",
+]
+NOUNS_EN = ["thobe", "abaya", "kaftan", "bisht", "jalabiya", "shirt", "dress", "suit"]
+ADJECTIVES_AR = ["كلاسيكي", "عصري", "ملكي", "صيفي", "شتوي", "حريري", "مطرز", "أبيض"]
+NOUNS_AR = ["ثوب", "عباءة", "قفطان", "بشت", "جلابية", "قميص", "فستان", "بدلة"]
+
+QUERIES = [
+    "thobe",
+    "royal kaftan",
+    "embroidered abaya",
+    "ثوب",
+    "عباءة مطرزة",
+    "بشت ملكي",
+    "kaftn",  # typo, matched through trigram similarity
+    '"summer dress" -linen',
+]
+
+
+def seed(engine, rows: int, batch_size: int) -> None:
+    """Insert synthetic designs until the bench owner has ``rows`` of them."""
+    with engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO users (id, email, hashed_password, is_active, is_superuser, role)
+                VALUES (:id, :email, 'not-a-real-hash', false, false, 'designer')
+                ON CONFLICT (email) DO NOTHING
+                """),
+            {"id": uuid.uuid4(), "email": BENCH_OWNER_EMAIL},
+        )
+        owner_id = conn.execute(
+            text("SELECT id FROM users WHERE email = :email"),
+            {"email": BENCH_OWNER_EMAIL},
+        ).scalar_one()
+        existing = conn.execute(
+            text("SELECT count(*) FROM designs WHERE owner_id = :owner_id"),
+            {"owner_id": owner_id},
+        ).scalar_one()
+
+    print(f"Existing benchmark designs: {existing}")
+    start = existing
+    while start < rows:
+        end = min(start + batch_size, rows)
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO designs (id, name, description, base_price, owner_id,
+                                         style_type, is_active, created_at)
+                    SELECT gen_random_uuid(),
+                           CASE WHEN i % 2 = 0
+                                THEN (:adj_en)[1 + i % 8] || ' ' || (:noun_en)[1 + (i / 8) % 8]
+                                ELSE (:adj_ar)[1 + i % 8] || ' ' || (:noun_ar)[1 + (i / 8) % 8]
+                           END || ' ' || i,
+                           (:noun_en)[1 + (i / 64) % 8] || ' / ' || (:noun_ar)[1 + (i / 64) % 8]
+                               || ' ' || (:adj_ar)[1 + (i / 512) % 8] || ' ' || (:adj_en)[1 + (i / 4096) % 8],
+                           20 + (i % 480),
+                           :owner_id,
+                           (:noun_en)[1 + i % 8],
+                           i % 10 <> 0,
+                           now() - (i || ' seconds')::interval
+                    FROM generate_series(:start, :end - 1) AS i
+                    """),
+                {
+                    "adj_en": ADJECTIVES_EN,
+                    "noun_en": NOUNS_EN,
+                    "adj_ar": ADJECTIVES_AR,
+                    "noun_ar": NOUNS_AR,
+                    "owner_id": owner_id,
+                    "start": start,
+                    "end": end,
+                },
+            )
+        print(f"  seeded {end}/{rows} ({time.perf_counter() - t0:.1f}s)")
+        start = end
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            text("ANALYZE designs")
+        )
+
+
+def cleanup(engine) -> None:
+    """Remove every design seeded by this benchmark, and its owner."""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "DELETE FROM designs WHERE owner_id = "
+                "(SELECT id FROM users WHERE email = :email)"
+            ),
+            {"email": BENCH_OWNER_EMAIL},
+        )
+        conn.execute(
+            text("DELETE FROM users WHERE email = :email"),
+            {"email": BENCH_OWNER_EMAIL},
+        )
+    print("Benchmark data removed.")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(engine, iterations: int, limit: int) -> dict:
+    """Time every query ``iterations`` times; return latency stats in ms."""
+    samples = []
+    with Session(engine) as db:
+        for query in QUERIES:
+            search_designs(db, q=query, limit=limit)  # warm-up
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                search_designs(db, q=query, limit=limit)
+                samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "samples": len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument(
+        "--cleanup", action="store_true", help="Delete seeded rows and exit"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+
+    if args.cleanup:
+        cleanup(engine)
+        return 0
+
+    if not args.skip_seed:
+        seed(engine, args.rows, args.batch_size)
+
+    stats = run(engine, args.iterations, args.limit)
+    print(
+        f"search_designs over {stats['samples']} calls: "
+        f"p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms "
+        f"p99={stats['p99']:.1f}ms mean={stats['mean']:.1f}ms"
+    )
+
+    if stats["p95"] > args.budget_ms:
+        print(f"❌ p95 exceeds budget of {args.budget_ms:.0f}ms")
+        return 1
+    print(f"✅ p95 within budget of {args.budget_ms:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
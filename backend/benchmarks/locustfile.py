@@ -0,0 +1,77 @@
+"""
+Locust load test replaying ``benchmarks.scenarios`` against a running backend.
+
+Seed the target database first and point the backend at the AI stub:
+
+    python -m benchmarks.api --seed-only
+    python -m benchmarks.stub_ai --port 8100 &
+    AI_SERVICE_URL=http://127.0.0.1:8100 uvicorn main:app --workers 4 &
+    PYTHONPATH=. locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 \\
+        --headless -u 50 -r 10 -t 2m --csv bench
+
+``BENCH_USERS`` and ``BENCH_DESIGNS`` must match the seeded counts (defaults
+match ``benchmarks.api``). Login is rate limited per client address, so each
+login presents a distinct ``X-Forwarded-For``.
+"""
+
+import os
+import random
+
+from locust import HttpUser, between
+
+from benchmarks.scenarios import (
+    BENCH_PASSWORD,
+    SCENARIOS,
+    BenchContext,
+    Scenario,
+    bench_user_email,
+    photo_bytes,
+)
+
+CONTEXT = BenchContext(
+    users=int(os.getenv("BENCH_USERS", "2000")),
+    designs=int(os.getenv("BENCH_DESIGNS", "50000")),
+    photo=photo_bytes(int(os.getenv("BENCH_PHOTO_KB", "256"))),
+)
+
+
+def _forwarded_for(rng: random.Random) -> str:
+    return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def _task(scenario: Scenario):
+    def run(user: "BackendUser") -> None:
+        kwargs = scenario.build(user.rng, CONTEXT)
+        headers = {"X-Forwarded-For": _forwarded_for(user.rng)}
+        if scenario.auth:
+            headers["Authorization"] = f"Bearer {user.token}"
+        user.client.request(
+            scenario.method,
+            scenario.path,
+            name=scenario.name,
+            headers=headers,
+            **kwargs,
+        )
+
+    run.__name__ = scenario.name
+    return run
+
+
+class BackendUser(HttpUser):
+    wait_time = between(0.1, 0.5)
+
+    def on_start(self) -> None:
+        self.rng = random.Random()
+        response = self.client.post(
+            "/api/v1/auth/login",
+            name="login (on_start)",
+            data={
+                "username": bench_user_email(self.rng.randrange(CONTEXT.users)),
+                "password": BENCH_PASSWORD,
+            },
+            headers={"X-Forwarded-For": _forwarded_for(self.rng)},
+        )
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+    tasks = {_task(scenario): scenario.weight for scenario in SCENARIOS}
@@ -0,0 +1,147 @@
+"""
+Request mix shared by the in-process runner (``benchmarks.api``) and the
+Locust file.
+
+Each :class:`Scenario` builds keyword arguments (``params``, ``data``,
+``files``) accepted by both ``httpx`` and ``requests``, so the same traffic
+can be replayed in-process or against a deployed backend.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+API = "/api/v1"
+
+BENCH_DOMAIN = "qeyafa.local"
+BENCH_PASSWORD = "bench-password-123"
+BENCH_DESIGNER_EMAIL = f"bench-designer@{BENCH_DOMAIN}"
+STYLE_TYPES = [
+    "thobe",
+    "abaya",
+    "kaftan",
+    "bisht",
+    "jalabiya",
+    "shirt",
+    "dress",
+    "suit",
+]
+PAGE_SIZE = 20
+
+
+def bench_user_email(index: int) -> str:
+    return f"bench-user-{index}@{BENCH_DOMAIN}"
+
+
+def photo_bytes(size_kb: int, seed: int = 0) -> bytes:
+    """A JPEG-framed blob of roughly ``size_kb`` KiB (the backend only checks the extension)."""
+    body = random.Random(seed).randbytes(max(0, size_kb * 1024 - 4))
+    return b"\xff\xd8" + body + b"\xff\xd9"
+
+
+@dataclass(frozen=True)
+class BenchContext:
+    """What the scenarios need to know about the seeded data."""
+
+    users: int
+    designs: int
+    photo: bytes
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    weight: int
+    build: Callable[[random.Random, BenchContext], Dict[str, Any]]
+    auth: bool = False
+
+
+def _login(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    return {
+        "data": {
+            "username": bench_user_email(rng.randrange(ctx.users)),
+            "password": BENCH_PASSWORD,
+        }
+    }
+
+
+def _no_args(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    return {}
+
+
+def _list_designs(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    return {"params": {"limit": PAGE_SIZE}}
+
+
+def _filtered_designs(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    low = rng.randrange(20, 400, 20)
+    return {
+        "params": {
+            "style_type": rng.sample(STYLE_TYPES, 2),
+            "min_price": low,
+            "max_price": low + 100,
+            "limit": PAGE_SIZE,
+        }
+    }
+
+
+def _deep_page(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    last_page = max(0, ctx.designs // PAGE_SIZE - 1)
+    return {
+        "params": {
+            "skip": rng.randint(last_page // 2, last_page) * PAGE_SIZE,
+            "limit": PAGE_SIZE,
+        }
+    }
+
+
+def _photos(ctx: BenchContext) -> List:
+    return [
+        (f"photo_{side}", (f"{side}.jpg", ctx.photo, "image/jpeg"))
+        for side in ("front", "back", "left", "right")
+    ]
+
+
+def _upload(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    return {"files": _photos(ctx)}
+
+
+def _process(rng: random.Random, ctx: BenchContext) -> Dict[str, Any]:
+    return {
+        "files": _photos(ctx),
+        "data": {
+            "height": str(rng.randint(155, 195)),
+            "weight": str(rng.randint(50, 110)),
+        },
+    }
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("login", "POST", f"{API}/auth/login", weight=1, build=_login),
+    Scenario("users_me", "GET", f"{API}/users/me", weight=4, build=_no_args, auth=True),
+    Scenario("designs_list", "GET", f"{API}/designs/", weight=6, build=_list_designs),
+    Scenario(
+        "designs_filtered", "GET", f"{API}/designs/", weight=4, build=_filtered_designs
+    ),
+    Scenario("designs_deep_page", "GET", f"{API}/designs/", weight=2, build=_deep_page),
+    Scenario(
+        "measurements_upload",
+        "POST",
+        f"{API}/measurements/upload",
+        weight=1,
+        build=_upload,
+        auth=True,
+    ),
+    Scenario(
+        "measurements_process",
+        "POST",
+        f"{API}/measurements/process",
+        weight=1,
+        build=_process,
+        auth=True,
+    ),
+]
+
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
@@ -0,0 +1,57 @@
+"""
+DDL rules for creating the schema on SQLite, for quick local benchmark runs.
+
+The models target PostgreSQL. On SQLite, JSONB becomes JSON, UUID columns
+are stored as CHAR(32), the computed full-text ``search_vector`` becomes a
+plain nullable column, and indexes that only make sense on PostgreSQL
+(GIN, ``*_ops`` operator classes) are skipped. PostgreSQL DDL is unaffected;
+the rules only apply when compiling for the SQLite dialect.
+"""
+
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(TSVECTOR, "sqlite")
+def _tsvector(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(CreateColumn, "sqlite")
+def _create_column(element, compiler, **kw):
+    column = element.element
+    if column.computed is not None and isinstance(column.type, TSVECTOR):
+        return f"{compiler.preparer.format_column(column)} TEXT"
+    return compiler.visit_create_column(element, **kw)
+
+
+def _postgres_only(index) -> bool:
+    if index.dialect_options["postgresql"].get("using"):
+        return True
+    return any("_ops" in str(expression) for expression in index.expressions)
+
+
+@compiles(CreateIndex, "sqlite")
+def _create_index(element, compiler, **kw):
+    if _postgres_only(element.element):
+        return "SELECT 1"
+    return compiler.visit_create_index(element, **kw)
+
+
+def create_schema(engine) -> None:
+    """Create every table on a SQLite ``engine`` (PostgreSQL uses Alembic)."""
+    import models  # noqa: F401  (register every table on Base.metadata)
+    from core.database import Base
+
+    Base.metadata.create_all(engine)
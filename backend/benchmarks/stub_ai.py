@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Stub of the AI measurement service for load tests.
+
+Answers ``/health``, ``/api/measurements/process`` and the binary
+``/api/measurements/process-frame`` the way the real service does, after a configurable delay, so backend benchmarks measure the
+backend rather than the model.
+
+Usage (from the backend directory):
+    python -m benchmarks.stub_ai --port 8100 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from typing import Tuple
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import Response
+
+from services.ai_frames import (
+    FRAME_CONTENT_TYPE,
+    FrameError,
+    decode_process_request,
+    encode_process_response,
+)
+
+
+def create_app(latency_ms: float = 50.0, jitter_ms: float = 10.0) -> FastAPI:
+    """Build the stub app; each processing call sleeps ``latency_ms`` +/- ``jitter_ms``."""
+    app = FastAPI(title="Qeyafa AI stub")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "Qeyafa AI stub"}
+
+    @app.post("/api/measurements/process")
+    async def process_measurements(
+        photo_front: UploadFile = File(...),
+        photo_back: UploadFile = File(...),
+        photo_left: UploadFile = File(...),
+        photo_right: UploadFile = File(...),
+        height: float = Form(...),
+        weight: float = Form(...),
+    ):
+        for photo in (photo_front, photo_back, photo_left, photo_right):
+            await photo.read()
+        return await result(height, weight)
+
+    @app.post("/api/measurements/process-frame")
+    async def process_measurements_frame(request: Request):
+        try:
+            _, height, weight = decode_process_request(await request.body())
+        except FrameError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        answer = await result(height, weight)
+        if FRAME_CONTENT_TYPE in request.headers.get("accept", ""):
+            return Response(
+                encode_process_response(answer), media_type=FRAME_CONTENT_TYPE
+            )
+        return answer
+
+    async def result(height: float, weight: float):
+        delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        scale = height / 175.0
+        return {
+            "status": "success",
+            "data": {
+                "measurements": {
+                    "chest": round(96 * scale + weight * 0.1, 1),
+                    "waist": round(82 * scale + weight * 0.12, 1),
+                    "shoulders": round(45 * scale, 1),
+                    "arm_length": round(62 * scale, 1),
+                    "neck": round(38 * scale, 1),
+                    "hip": round(98 * scale + weight * 0.08, 1),
+                },
+                "confidence": 0.9,
+            },
+        }
+
+    return app
+
+
+def serve_in_thread(
+    latency_ms: float = 50.0, jitter_ms: float = 10.0
+) -> Tuple[str, "uvicorn.Server"]:
+    """
+    Serve the stub on a free local port from a daemon thread.
+
+    Returns its base URL and the server; set ``server.should_exit`` to stop it.
+    """
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(latency_ms, jitter_ms),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
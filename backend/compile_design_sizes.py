@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Recompile ``design_size_ranges`` from every design's ``customization_rules``.
+
+Designs are compiled when they are written; run this once after the
+``design_size_ranges`` migration, or after changing the size-chart format.
+Designs whose size chart cannot be compiled are reported and left without
+sizes.
+
+Usage (from the backend directory):
+    python compile_design_sizes.py
+"""
+
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.database import SessionLocal
+from crud.design import set_size_ranges
+from models.design import Design
+
+BATCH_SIZE = 500
+
+
+def compile_design_sizes() -> int:
+    """Compile all designs; returns the number of designs that failed."""
+    db = SessionLocal()
+    compiled = 0
+    failed = 0
+    try:
+        design_ids = [row[0] for row in db.query(Design.id).order_by(Design.id)]
+        for start in range(0, len(design_ids), BATCH_SIZE):
+            batch = db.query(Design).filter(
+                Design.id.in_(design_ids[start : start + BATCH_SIZE])
+            )
+            for design in batch:
+                try:
+                    set_size_ranges(db, design)
+                    compiled += 1
+                except ValueError as e:
+                    design.size_ranges = []
+                    failed += 1
+                    print(f"❌ Design {design.id} ({design.name}): {e}")
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Compiled size charts for {compiled} designs ({failed} failed)")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if compile_design_sizes() else 0)
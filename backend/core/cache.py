@@ -0,0 +1,295 @@
+"""
+Read-through cache for public catalog responses.
+
+Serialized JSON bodies are stored in Redis and mirrored in a small in-process
+L1. Every namespace (``categories``, ``designs``, ``fabrics``, ``colors``,
+``measurements:<user id>``) carries a version that is part of each cache key,
+so invalidating a namespace is a single ``SET`` and superseded entries simply
+expire. Versions are random tokens rather than counters, so a flushed or
+expired version key never brings an old version back; they expire after
+``version_ttl`` seconds without a write, which keeps per-user namespaces from
+piling up. The same versions back the ETags built in :mod:`core.etag`.
+
+If Redis is unavailable the cache keeps working from the L1 alone, with
+entries kept only ``l1_ttl`` seconds since other workers' invalidations are
+not seen, and retries Redis after a short back-off.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+import redis
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from core.config import settings
+
+_REDIS_RETRY_SECONDS = 30.0
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def normalize_params(params: Mapping[str, Any]) -> str:
+    """
+    Build a stable string from query parameters.
+
+    ``None`` values are dropped and list values are sorted, so that
+    ``?a=1&a=2`` and ``?a=2&a=1`` share a cache entry.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(item) for item in value)
+        else:
+            value = str(value)
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+def serialize(payload: Any) -> bytes:
+    """Serialize a response payload (ORM-backed schemas included) to JSON bytes."""
+    return json.dumps(
+        jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+class CatalogCache:
+    """Two-level (in-process + Redis) cache of serialized catalog responses."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        ttl: int,
+        l1_ttl: float,
+        l1_max_entries: int,
+        version_ttl: int = 86400,
+        enabled: bool = True,
+        prefix: str = "catalog",
+    ):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.l1_max_entries = l1_max_entries
+        self.version_ttl = version_ttl
+        self.enabled = enabled
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        self._l1: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        # namespace -> (expires_at, version) as last read from Redis
+        self._versions: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # namespace -> version used for L1 keys while Redis is unavailable
+        self._local_versions: "OrderedDict[str, str]" = OrderedDict()
+        self._redis: Optional[redis.Redis] = None
+        self._redis_retry_at = 0.0
+
+    # Redis connection handling
+
+    def _client(self) -> Optional[redis.Redis]:
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url, socket_timeout=0.25, socket_connect_timeout=0.25
+            )
+        return self._redis
+
+    def _redis_failed(self) -> None:
+        self._redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    # Versions
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:version:{namespace}"
+
+    def _remember(
+        self, versions: "OrderedDict[str, Any]", namespace: str, value: Any
+    ) -> None:
+        versions[namespace] = value
+        versions.move_to_end(namespace)
+        while len(versions) > self.l1_max_entries:
+            versions.popitem(last=False)
+
+    def version(self, namespace: str) -> Optional[str]:
+        """
+        Return the version of a namespace shared by all workers.
+
+        The version read from Redis is reused for ``l1_ttl`` seconds, which
+        bounds how long another worker's invalidation can go unnoticed.
+        Returns ``None`` while Redis is unavailable: a worker's own version
+        would not reflect invalidations made by the others.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(namespace)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        client = self._client()
+        if client is None:
+            return None
+        key = self._version_key(namespace)
+        try:
+            raw = client.get(key)
+            if raw is None:
+                # First use, or the key was flushed or expired: start a new version
+                client.set(key, _new_version(), nx=True, ex=self.version_ttl)
+                raw = client.get(key)
+        except redis.RedisError:
+            self._redis_failed()
+            return None
+        if raw is None:
+            return None
+        version = raw.decode()
+        with self._lock:
+            self._remember(self._versions, namespace, (now + self.l1_ttl, version))
+        return version
+
+    def _local_version(self, namespace: str) -> str:
+        with self._lock:
+            version = self._local_versions.get(namespace)
+            if version is None:
+                version = _new_version()
+            self._remember(self._local_versions, namespace, version)
+            return version
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Give each namespace a new version, orphaning its cached entries."""
+        client = self._client()
+        for namespace in namespaces:
+            with self._lock:
+                self._local_versions.pop(namespace, None)
+                self._versions.pop(namespace, None)
+                marker = f"{self.prefix}:{namespace}:"
+                for key in [k for k in self._l1 if k.startswith(marker)]:
+                    del self._l1[key]
+            if client is not None:
+                try:
+                    client.set(
+                        self._version_key(namespace),
+                        _new_version(),
+                        ex=self.version_ttl,
+                    )
+                except redis.RedisError:
+                    self._redis_failed()
+
+    # Entries
+
+    def _key(self, namespace: str, version: str, params: Mapping[str, Any]) -> str:
+        digest = hashlib.sha1(normalize_params(params).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{namespace}:{version}:{digest}"
+
+    def _l1_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry[1]
+
+    def _l1_set(self, key: str, body: bytes, ttl: float) -> None:
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, body)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def get_or_set(
+        self,
+        namespace: str,
+        params: Mapping[str, Any],
+        loader: Callable[[], Any],
+    ) -> bytes:
+        """
+        Return the serialized response for ``params``, calling ``loader`` on a miss.
+
+        ``loader`` returns the (unserialized) payload; only its JSON bytes are
+        cached.
+        """
+        if not self.enabled:
+            return serialize(loader())
+
+        version = self.version(namespace)
+        if version is None:
+            key = self._key(
+                namespace, f"local-{self._local_version(namespace)}", params
+            )
+            body = self._l1_get(key)
+            if body is None:
+                body = serialize(loader())
+                self._l1_set(key, body, self.l1_ttl)
+            return body
+
+        key = self._key(namespace, version, params)
+        body = self._l1_get(key)
+        if body is not None:
+            return body
+
+        client = self._client()
+        if client is not None:
+            try:
+                body = client.get(key)
+            except redis.RedisError:
+                self._redis_failed()
+                body = None
+            if body is not None:
+                self._l1_set(key, body, self.ttl)
+                return body
+
+        body = serialize(loader())
+        self._l1_set(key, body, self.ttl)
+        if client is not None:
+            try:
+                client.set(key, body, ex=self.ttl)
+            except redis.RedisError:
+                self._redis_failed()
+        return body
+
+    def json_response(
+        self,
+        namespace: str,
+        params: Mapping[str, Any],
+        loader: Callable[[], Any],
+    ) -> Response:
+        """Like :meth:`get_or_set`, wrapped in a JSON response."""
+        return Response(
+            content=self.get_or_set(namespace, params, loader),
+            media_type="application/json",
+        )
+
+    def clear(self) -> None:
+        """Drop every namespace version, in Redis too, and empty the L1."""
+        with self._lock:
+            self._versions.clear()
+            self._local_versions.clear()
+            self._l1.clear()
+        client = self._client()
+        if client is not None:
+            try:
+                for key in client.scan_iter(match=self._version_key("*")):
+                    client.delete(key)
+            except redis.RedisError:
+                self._redis_failed()
+
+
+# Singleton instance
+catalog_cache = CatalogCache(
+    redis_url=settings.REDIS_URL or "redis://localhost:6379/0",
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    l1_ttl=settings.CATALOG_CACHE_L1_TTL_SECONDS,
+    l1_max_entries=settings.CATALOG_CACHE_L1_MAX_ENTRIES,
+    version_ttl=settings.CATALOG_CACHE_VERSION_TTL_SECONDS,
+    enabled=settings.CATALOG_CACHE_ENABLED,
+)
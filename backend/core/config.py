@@ -14,6 +14,45 @@ class Settings(BaseSettings):
     """Application settings with environment variable validation"""
     REDIS_URL: Optional[str] = Field(default=None, description="Redis connection URL")
 
+    # Catalog cache (public category/design listings)
+    CATALOG_CACHE_ENABLED: bool = Field(default=True, description="Cache serialized catalog responses")
+    CATALOG_CACHE_TTL_SECONDS: int = Field(default=300, description="Lifetime of a cached catalog response", ge=1)
+    CATALOG_CACHE_L1_TTL_SECONDS: float = Field(default=2.0, description="How long a worker trusts its copy of a catalog version before re-reading Redis", ge=0)
+    CATALOG_CACHE_L1_MAX_ENTRIES: int = Field(default=1024, description="Maximum entries in the in-process catalog cache", ge=1)
+    CATALOG_CACHE_VERSION_TTL_SECONDS: int = Field(default=86400, description="How long a cache namespace version lives in Redis after its last invalidation", ge=60)
+
+    # Design search
+    DESIGN_SEARCH_MAX_OFFSET: int = Field(default=1000, description="Largest skip accepted by design search; bounds the top-N sort of the matches", ge=0)
+
+    # Similar-measurement index (in-memory, per worker)
+    SIMILARITY_REFRESH_SECONDS: float = Field(default=30.0, description="Minimum interval between incremental refreshes of the similarity index", ge=0)
+    SIMILARITY_REBUILD_SECONDS: float = Field(default=3600.0, description="Interval between full rebuilds of the similarity index", ge=1)
+
+    # Performance metrics
+    METRICS_ENABLED: bool = Field(default=True, description="Collect request metrics")
+    METRICS_TOKEN: Optional[str] = Field(default=None, description="Bearer token Prometheus sends to scrape /metrics (unset: /metrics is not served)")
+    SERVER_TIMING_ENABLED: bool = Field(default=True, description="Add Server-Timing headers (app, db, ai) to responses")
+    QUERY_TRACKING_ENABLED: bool = Field(default=True, description="Log slow queries and probable N+1 query patterns per request")
+    SLOW_QUERY_MS: float = Field(default=200.0, description="Log statements taking at least this many milliseconds", ge=0)
+    N_PLUS_ONE_THRESHOLD: int = Field(default=10, description="Flag a statement repeated this many times within one request as a probable N+1", ge=2)
+
+    # Upload storage
+    STORAGE_BACKEND: str = Field(default="local", description="Where uploads are stored (local, s3)")
+    UPLOAD_DIR: str = Field(default="/workspaces/Qeyafa/backend/uploads", description="Root directory of the local storage backend")
+    STORAGE_PUBLIC_URL: str = Field(default="", description="Base URL clients reach this API on, for signed local storage URLs (empty: relative URLs)")
+    STORAGE_PRESIGN_EXPIRES_SECONDS: int = Field(default=900, description="Lifetime of presigned upload/download URLs", ge=1, le=604800)
+    UPLOAD_STAGING_EXPIRES_SECONDS: int = Field(default=86400, description="How long an unfinished resumable upload is kept", ge=60)
+    DERIVATIVES_ENABLED: bool = Field(default=True, description="Generate thumbnails of uploaded photos and catalog images in the background")
+    CATALOG_IMAGE_HOSTS_STR: str = Field(default="", description="Hosts design/category image URLs may point at, fetched for thumbnails and redirected to (comma-separated; empty: none)")
+    DERIVATIVE_WORKERS: int = Field(default=2, description="Threads per API worker rendering thumbnails", ge=1, le=32)
+    S3_ENDPOINT_URL: Optional[str] = Field(default=None, description="S3-compatible endpoint, e.g. http://minio:9000 (empty: AWS S3 for S3_REGION)")
+    S3_REGION: str = Field(default="us-east-1", description="S3 region used for request signing")
+    S3_BUCKET: Optional[str] = Field(default=None, description="Bucket holding uploads when STORAGE_BACKEND=s3")
+    S3_ACCESS_KEY_ID: Optional[str] = Field(default=None, description="S3 access key id")
+    S3_SECRET_ACCESS_KEY: Optional[str] = Field(default=None, description="S3 secret access key")
+    S3_FORCE_PATH_STYLE: bool = Field(default=True, description="Address buckets as <endpoint>/<bucket> (MinIO) instead of <bucket>.<endpoint>")
+    S3_MULTIPART_PART_SIZE: int = Field(default=8 * 1024 * 1024, description="Part size for streamed multipart uploads", ge=5 * 1024 * 1024)
+
     # Environment Configuration
     ENVIRONMENT: str = Field(
         default="development",
@@ -38,7 +77,29 @@ class Settings(BaseSettings):
     CORS_ORIGINS_STR: str = Field(default="http://localhost:3000,http://localhost:8080", description="Allowed CORS origins (comma-separated in env)")
 
     # AI Service - Optional with sensible default
-    AI_SERVICE_URL: str = Field(default="http://ai-models:8000", description="AI service URL for model inference")
+    AI_SERVICE_URL: str = Field(default="http://ai-models:8000", description="AI service URL for model inference (comma-separated for replicas)")
+    AI_CONNECT_TIMEOUT_SECONDS: float = Field(default=2.0, description="Timeout for connecting to the AI service", gt=0)
+    AI_READ_TIMEOUT_SECONDS: float = Field(default=30.0, description="Timeout for each read from the AI service (inference can be slow)", gt=0)
+    AI_RETRY_ATTEMPTS: int = Field(default=3, description="Attempts per idempotent AI call (validation, health checks)", ge=1, le=10)
+    AI_RETRY_BACKOFF_SECONDS: float = Field(default=0.2, description="Base of the jittered exponential back-off between retries", ge=0)
+    AI_RETRY_BUDGET_RATIO: float = Field(default=0.2, description="Retries allowed per regular AI call, averaged over time", ge=0)
+    AI_BREAKER_FAILURE_RATIO: float = Field(default=0.5, description="Share of failed calls that opens a replica's circuit", gt=0, le=1)
+    AI_BREAKER_MIN_CALLS: int = Field(default=10, description="Calls within the window before the failure ratio is judged", ge=1)
+    AI_BREAKER_WINDOW_SECONDS: float = Field(default=30.0, description="Sliding window over which failures are counted", gt=0)
+    AI_BREAKER_OPEN_SECONDS: float = Field(default=15.0, description="How long an open circuit fails fast before a trial call", gt=0)
+    AI_LOAD_BALANCING: str = Field(default="p2c", description="How calls are spread over replicas (p2c, least_outstanding)")
+    AI_EWMA_DECAY_SECONDS: float = Field(default=10.0, description="Time constant of the per-replica latency average", gt=0)
+    AI_HEALTH_PROBE_INTERVAL_SECONDS: float = Field(default=5.0, description="Interval between /health probes of each replica (0: no probes)", ge=0)
+    AI_HEALTH_PROBE_TIMEOUT_SECONDS: float = Field(default=1.0, description="Timeout of one health probe", gt=0)
+    AI_UNHEALTHY_THRESHOLD: int = Field(default=2, description="Consecutive failed probes before a replica is ejected", ge=1)
+    AI_CONCURRENCY_INITIAL: int = Field(default=8, description="Starting limit of concurrent inference calls per worker", ge=1)
+    AI_CONCURRENCY_MIN: int = Field(default=1, description="Lowest the adaptive concurrency limit goes", ge=1)
+    AI_CONCURRENCY_MAX: int = Field(default=64, description="Highest the adaptive concurrency limit goes", ge=1)
+    AI_CONCURRENCY_LATENCY_TOLERANCE: float = Field(default=2.0, description="Latency, as a multiple of the baseline, above which the limit shrinks", gt=1)
+    AI_QUEUE_MAX: int = Field(default=32, description="Inference calls per worker that may wait for a slot; more are rejected with 503", ge=0)
+    AI_QUEUE_TIMEOUT_SECONDS: float = Field(default=5.0, description="How long a call waits for a slot before it is rejected with 503", ge=0)
+    AI_WIRE_PROTOCOL: str = Field(default="multipart", description="Encoding of processing calls: multipart (form data and JSON) or frame (compact binary, needs an AI service with /api/measurements/process-frame)")
+    AI_HEDGE_DELAY_SECONDS: Optional[float] = Field(default=None, description="Send a duplicate idempotent request to another replica when the first has not answered after this long (empty: no hedging)", gt=0)
 
     # Debug mode - automatically set based on environment
     DEBUG: bool = Field(default=True, description="Debug mode (automatically False in production)")
@@ -52,6 +113,33 @@ class Settings(BaseSettings):
             raise ValueError(f"ENVIRONMENT must be one of {allowed}, got: {v}")
         return v.lower()
 
+    @validator("STORAGE_BACKEND", pre=True)
+    def validate_storage_backend(cls, v):
+        if v is None:
+            return v
+        allowed = ["local", "s3"]
+        if v.lower() not in allowed:
+            raise ValueError(f"STORAGE_BACKEND must be one of {allowed}, got: {v}")
+        return v.lower()
+
+    @validator("AI_LOAD_BALANCING", pre=True)
+    def validate_ai_load_balancing(cls, v):
+        if v is None:
+            return v
+        allowed = ["p2c", "least_outstanding"]
+        if v.lower() not in allowed:
+            raise ValueError(f"AI_LOAD_BALANCING must be one of {allowed}, got: {v}")
+        return v.lower()
+
+    @validator("AI_WIRE_PROTOCOL", pre=True)
+    def validate_ai_wire_protocol(cls, v):
+        if v is None:
+            return v
+        allowed = ["multipart", "frame"]
+        if v.lower() not in allowed:
+            raise ValueError(f"AI_WIRE_PROTOCOL must be one of {allowed}, got: {v}")
+        return v.lower()
+
     @validator("SECRET_KEY", pre=True)
     def validate_secret_key(cls, v):
         if v is None:
@@ -81,6 +169,16 @@ class Settings(BaseSettings):
         """Parse and return CORS origins as a list"""
         return [origin.strip() for origin in self.CORS_ORIGINS_STR.split(",")]
 
+    @property
+    def AI_SERVICE_URLS(self) -> List[str]:
+        """Parse and return the AI service replica URLs as a list"""
+        return [url.strip().rstrip("/") for url in self.AI_SERVICE_URL.split(",") if url.strip()]
+
+    @property
+    def CATALOG_IMAGE_HOSTS(self) -> List[str]:
+        """Parse and return the allowed catalog image hosts as a list"""
+        return [host.strip().lower() for host in self.CATALOG_IMAGE_HOSTS_STR.split(",") if host.strip()]
+
     @property
     def is_development(self) -> bool:
         return self.ENVIRONMENT == "development"
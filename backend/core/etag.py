@@ -0,0 +1,89 @@
+"""
+Conditional GET support (weak ETags and ``If-None-Match``).
+
+ETags are derived from a namespace version (see :mod:`core.cache`) and the
+normalized query parameters, so a matching request can be answered with
+``304 Not Modified`` before any row is loaded or serialized. While Redis is
+unavailable there is no version shared by all workers; the ETag is then a
+hash of the response body, which costs building the response but is never
+stale.
+"""
+
+import hashlib
+from typing import Any, Callable, Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from core.cache import normalize_params
+
+# Cache-Control policies used by the read endpoints
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(namespace: str, version: str, params: Mapping[str, Any]) -> str:
+    """Build a weak ETag for a namespace version and a set of query parameters."""
+    raw = f"{namespace}|{version}|{normalize_params(params)}"
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def content_etag(namespace: str, params: Mapping[str, Any], body: bytes) -> str:
+    """Build a weak ETag from a response body and the query parameters it answers."""
+    digest = hashlib.sha1(f"{namespace}|{normalize_params(params)}|".encode("utf-8"))
+    digest.update(body)
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check ``If-None-Match`` against ``etag`` using weak comparison."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional_response(
+    request: Request,
+    namespace: str,
+    version: Optional[str],
+    params: Mapping[str, Any],
+    build: Callable[[], Response],
+    cache_control: str,
+) -> Response:
+    """
+    Answer with 304 if the client already holds the current representation,
+    otherwise call ``build`` and attach ``ETag``/``Cache-Control`` to its response.
+
+    ``version`` is ``None`` when no shared namespace version is available;
+    the response is then built first and its body hashed.
+    """
+    if version is None:
+        response = build()
+        headers = {
+            "ETag": content_etag(namespace, params, response.body),
+            "Cache-Control": cache_control,
+        }
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return response
+
+    etag = make_etag(namespace, version, params)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = build()
+    response.headers.update(headers)
+    return response
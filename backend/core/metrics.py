@@ -0,0 +1,491 @@
+"""
+Request-level performance metrics.
+
+A small in-process registry rendered in the Prometheus text format on
+``/metrics``, fed by:
+
+- :class:`MetricsMiddleware` - per-route latency, status counts and
+  in-flight requests, plus a ``Server-Timing`` header on every response;
+- :func:`instrument_engine` - SQL query count and duration via SQLAlchemy
+  engine events;
+- :func:`track_ai_call` - AI service call timings.
+
+Per-request totals (queries, DB time, AI time) are collected in a
+``contextvars`` slot, which FastAPI carries into the threadpool that runs
+sync endpoints. Each worker process keeps its own registry.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Any other request method is labelled OTHER, so clients cannot add label values at will
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items()) or (
+                [((), 0.0)] if not self.labelnames else []
+            )
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or (
+                [0] * len(self.buckets),
+                0.0,
+                0,
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets=buckets)
+        )
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route and status.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route"),
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+)
+HTTP_DB_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "SQL queries issued per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_LATENCY = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time."
+)
+AI_CALL_LATENCY = registry.histogram(
+    "ai_request_duration_seconds", "AI service call latency.", ("operation", "outcome")
+)
+AI_RETRIES = registry.counter(
+    "ai_retries_total", "AI service calls retried.", ("operation",)
+)
+AI_HEDGES = registry.counter(
+    "ai_hedged_requests_total",
+    "Duplicate AI requests sent to another replica.",
+    ("operation",),
+)
+AI_CIRCUIT_OPEN = registry.counter(
+    "ai_circuit_rejections_total",
+    "AI calls failed fast because every replica's circuit was open.",
+    ("operation",),
+)
+AI_CONCURRENCY_LIMIT = registry.gauge(
+    "ai_concurrency_limit", "Current adaptive limit of concurrent AI inference calls."
+)
+AI_IN_FLIGHT = registry.gauge(
+    "ai_requests_in_flight", "AI inference calls holding a concurrency slot."
+)
+AI_QUEUE_DEPTH = registry.gauge(
+    "ai_queue_depth", "AI inference calls waiting for a concurrency slot."
+)
+AI_SHED = registry.counter(
+    "ai_requests_shed_total",
+    "AI calls rejected because no concurrency slot freed up in time.",
+    ("operation",),
+)
+AI_ENDPOINT_REQUESTS = registry.counter(
+    "ai_endpoint_requests_total",
+    "Requests sent to each AI service replica.",
+    ("endpoint",),
+)
+AI_ENDPOINT_HEALTHY = registry.gauge(
+    "ai_endpoint_healthy",
+    "Whether an AI service replica passes its health probes (1) or is ejected (0).",
+    ("endpoint",),
+)
+
+
+@dataclass
+class RequestStats:
+    """Totals collected while one request is being served."""
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    ai_calls: int = 0
+    ai_seconds: float = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, if any."""
+    return _request_stats.get()
+
+
+# SQLAlchemy instrumentation
+
+# Called with (statement, seconds) after every statement on an instrumented engine
+_statement_observers: List[Callable[[str, float], None]] = []
+
+
+def observe_statements(callback: Callable[[str, float], None]) -> None:
+    """Have ``callback`` called with each statement and its duration, from the same engine listeners."""
+    if callback not in _statement_observers:
+        _statement_observers.append(callback)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+    for callback in _statement_observers:
+        callback(statement, elapsed)
+
+
+def _handle_error(context):
+    # The statement failed, so after_cursor_execute will not pop its start time
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record query count and duration for every statement run on ``engine``."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# AI service instrumentation
+
+
+@contextmanager
+def track_ai_call(operation: str) -> Iterator[None]:
+    """Time an AI service call, labelled with ``operation`` and its outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        elapsed = time.perf_counter() - started
+        AI_CALL_LATENCY.observe(elapsed, operation=operation, outcome=outcome)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.ai_calls += 1
+            stats.ai_seconds += elapsed
+
+
+def timed_ai_call(operation: str):
+    """Decorator applying :func:`track_ai_call` to an async AI client method."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_ai_call(operation):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# HTTP middleware
+
+
+def _server_timing(total: float, stats: RequestStats) -> str:
+    parts = [
+        f"app;dur={total * 1000:.1f}",
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries"',
+    ]
+    if stats.ai_calls:
+        parts.append(f"ai;dur={stats.ai_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route HTTP metrics.
+
+    Routes are labelled by their path template (``/api/v1/designs/{design_id}``)
+    and methods outside :data:`HTTP_METHODS` as ``OTHER``, so label
+    cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(
+        self,
+        app,
+        server_timing: bool = True,
+        exclude_paths: Sequence[str] = ("/metrics",),
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            _server_timing(time.perf_counter() - started, stats).encode(
+                                "latin-1"
+                            ),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_label = (
+                getattr(route, "path_format", None)
+                or getattr(route, "path", None)
+                or "unmatched"
+            )
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            HTTP_REQUESTS.inc(method=method, route=route_label, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_label)
+            HTTP_DB_QUERIES.observe(stats.db_queries, method=method, route=route_label)
+            _request_stats.reset(token)
+
+
+def setup_metrics(
+    app, engine: Engine, server_timing: bool = True, token: Optional[str] = None
+) -> None:
+    """
+    Instrument ``engine`` and wrap ``app`` in :class:`MetricsMiddleware`.
+
+    ``/metrics`` is only served when ``token`` is set, and then only to
+    requests sending it as ``Authorization: Bearer <token>``.
+    """
+    import secrets
+
+    from fastapi import Request
+    from fastapi.responses import PlainTextResponse
+
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware, server_timing=server_timing)
+    if token is None:
+        return
+    expected = f"Bearer {token}".encode()
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        """Prometheus scrape endpoint (per worker process)."""
+        if not secrets.compare_digest(
+            request.headers.get("authorization", "").encode(), expected
+        ):
+            return PlainTextResponse(
+                "Unauthorized\n",
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
@@ -0,0 +1,180 @@
+"""
+Slow-query and N+1 detection.
+
+Every statement run on an instrumented engine is normalized (literals and
+``IN`` lists collapsed) and counted against the request being served.
+:class:`QueryTrackerMiddleware` logs a warning when one normalized statement
+repeats ``n_plus_one_threshold`` times or more within a request - the usual
+sign of a lazy load inside a loop - and statements slower than
+``slow_query_ms`` are logged in normalized form with their route. Bind
+parameters are never logged, since they carry customer data.
+
+Statements are timed by the engine listeners of :mod:`core.metrics`, so an
+engine carries one pair of listeners however many consumers it has.
+
+:func:`capture_queries` records statements outside of a request, which the
+``max_queries`` pytest fixture uses to bound the queries an endpoint issues.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from core import metrics
+
+logger = logging.getLogger("qeyafa.sql")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(
+    r"\bIN\s*\((?:\s*(?:%\(\w+\)s|%s|\?|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape, so repeated executions group together."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def _route_of(scope: Optional[Dict[str, Any]]) -> str:
+    if not scope:
+        return "-"
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or scope.get("path", "-")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+@dataclass
+class QueryTracker:
+    """Statements recorded for one request (or one :func:`capture_queries` block)."""
+
+    scope: Optional[Dict[str, Any]] = None
+    statements: Counter = field(default_factory=Counter)
+    total_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    @property
+    def route(self) -> str:
+        return _route_of(self.scope)
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.statements[normalize_sql(statement)] += 1
+            self.total_seconds += seconds
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Normalized statements executed at least ``threshold`` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def report(self, limit: int = 10) -> str:
+        """Human-readable summary of the most frequent statements."""
+        lines = [
+            f"{self.count} queries ({self.total_seconds * 1000:.1f} ms) for {self.route}:"
+        ]
+        for sql, n in self.statements.most_common(limit):
+            lines.append(f"  {n:>4}x {sql[:200]}")
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[QueryTracker]] = contextvars.ContextVar(
+    "query_tracker", default=None
+)
+# Trackers opened with capture_queries(); they see statements from every thread
+_captures: List[QueryTracker] = []
+_captures_lock = threading.Lock()
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryTracker]:
+    """Record every statement run on instrumented engines while the block runs."""
+    tracker = QueryTracker()
+    with _captures_lock:
+        _captures.append(tracker)
+    try:
+        yield tracker
+    finally:
+        with _captures_lock:
+            _captures.remove(tracker)
+
+
+# Statements at least this slow are logged; set by instrument_engine()
+_slow_query_seconds = float("inf")
+
+
+def _observe(statement: str, elapsed: float) -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(statement, elapsed)
+    if _captures:
+        with _captures_lock:
+            captures = list(_captures)
+        for capture in captures:
+            capture.record(statement, elapsed)
+
+    if elapsed >= _slow_query_seconds:
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000,
+            _route_of(tracker.scope if tracker else None),
+            normalize_sql(statement),
+        )
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float) -> None:
+    """Feed statements run on ``engine`` to the active trackers and log slow ones."""
+    global _slow_query_seconds
+    _slow_query_seconds = slow_query_ms / 1000
+    metrics.instrument_engine(engine)
+    metrics.observe_statements(_observe)
+
+
+class QueryTrackerMiddleware:
+    """ASGI middleware giving each request its own :class:`QueryTracker`."""
+
+    def __init__(self, app, n_plus_one_threshold: int):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker(scope=scope)
+        token = _current.set(tracker)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            for sql, n in tracker.repeated(self.n_plus_one_threshold):
+                logger.warning(
+                    "Probable N+1 on %s: %d executions of %s",
+                    tracker.route,
+                    n,
+                    sql[:500],
+                )
+
+
+def setup_query_tracking(
+    app, engine: Engine, slow_query_ms: float, n_plus_one_threshold: int
+) -> None:
+    """Instrument ``engine`` and install :class:`QueryTrackerMiddleware` on ``app``."""
+    instrument_engine(engine, slow_query_ms)
+    app.add_middleware(
+        QueryTrackerMiddleware, n_plus_one_threshold=n_plus_one_threshold
+    )
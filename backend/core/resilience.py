@@ -0,0 +1,324 @@
+"""
+Failure handling for calls to downstream services.
+
+- :class:`CircuitBreaker` - stops sending requests to a dependency whose
+  recent error rate is too high, so callers fail fast instead of each
+  waiting for a timeout, and lets one trial request through after a pause;
+- :class:`RetryBudget` - caps retries at a fraction of regular calls, so
+  retries cannot multiply the load on a struggling dependency;
+- :class:`AdaptiveLimiter` - bounds concurrent calls with a limit that grows
+  while latency stays near its baseline and shrinks when it climbs (AIMD),
+  queueing excess calls for a bounded time;
+- :func:`backoff_delay` - exponential back-off with full jitter.
+
+State is kept per process and is not shared between workers.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding time window.
+
+    The circuit opens once at least ``min_calls`` calls were recorded in the
+    last ``window_seconds`` and ``failure_ratio`` of them failed. While open,
+    :meth:`allow` is false; after ``open_seconds`` the circuit is half-open
+    and lets a single trial call through, whose outcome closes it (success)
+    or opens it for another pause (failure). Outcomes reported while the
+    circuit is open, by calls that started before it opened, are ignored.
+
+    Callers claim each call with :meth:`acquire` and end it with
+    :meth:`record_success`, :meth:`record_failure` or, when it was abandoned
+    without an outcome, :meth:`release`.
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float,
+        min_calls: int,
+        window_seconds: float,
+        open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = None
+        # Whether the half-open trial call is in flight
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if self.clock() - self._opened_at < self.open_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (without claiming it, see :meth:`acquire`)."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._trial)
+
+    def acquire(self) -> bool:
+        """Claim a call; false if the circuit is open or the half-open trial is already in flight."""
+        with self._lock:
+            state = self.state
+            if state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return state == CLOSED
+
+    def release(self) -> None:
+        """End a claimed call that has no outcome (e.g. cancelled), freeing the trial if it was one."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial = False
+
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a trial call through (0 if not open)."""
+        if self._opened_at is None:
+            return 0.0
+        if self._trial:
+            # The trial's outcome is due; there is no pause left to wait out
+            return 1.0
+        return max(0.0, self._opened_at + self.open_seconds - self.clock())
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] <= now - self.window_seconds:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                if self._trial:
+                    # The trial call succeeded; start over with a clean window
+                    self._opened_at = None
+                    self._trial = False
+                    self._outcomes.clear()
+                    self._failures = 0
+                return
+            now = self.clock()
+            self._trim(now)
+            self._outcomes.append((now, True))
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = self.clock()
+            if self._opened_at is not None:
+                if self._trial:
+                    # A failed trial call re-opens the circuit for another pause
+                    self._opened_at = now
+                    self._trial = False
+                return
+            self._trim(now)
+            self._outcomes.append((now, False))
+            self._failures += 1
+            if len(
+                self._outcomes
+            ) >= self.min_calls and self._failures >= self.failure_ratio * len(
+                self._outcomes
+            ):
+                self._opened_at = now
+
+
+class RetryBudget:
+    """
+    Token bucket allowing about ``ratio`` retries per regular call.
+
+    Every call deposits ``ratio`` tokens (up to ``capacity``) and every retry
+    spends one, so under a persistent outage retries add at most ``ratio``
+    extra load instead of multiplying it by the number of attempts.
+    """
+
+    def __init__(self, ratio: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend a token for a retry; false when the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class LimitExceeded(Exception):
+    """Raised when a call can neither start nor wait for a slot of an :class:`AdaptiveLimiter`."""
+
+    pass
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted by additive increase, multiplicative decrease.
+
+    Each call holds a slot from :meth:`acquire` to :meth:`release`. A call
+    that completes within ``latency_tolerance`` times the baseline latency
+    (the lowest seen in the current or previous ``baseline_seconds``) raises
+    the limit by ``1 / limit`` - about one per limit's worth of calls - as
+    long as the slots are in use; a slower or overloaded call multiplies it
+    by ``backoff``. Calls beyond the limit wait up to ``queue_timeout``
+    seconds, at most ``max_queue`` of them; the rest get
+    :class:`LimitExceeded`.
+
+    Waiters are futures of the running event loop, so one limiter serves one
+    loop (one per worker process).
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.9,
+        max_queue: int = 32,
+        queue_timeout: float = 5.0,
+        baseline_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.baseline_seconds = baseline_seconds
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._previous_min: Optional[float] = None
+        self._window_min: Optional[float] = None
+        self._window_started = clock()
+        self._decreased_at = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free now, without queueing."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting for one if the limit is reached."""
+        if self.try_acquire():
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise LimitExceeded(
+                f"{self.in_flight} calls in flight, {len(self._waiters)} queued"
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the wait timed out
+            if waiter.done() and not waiter.cancelled():
+                return
+            raise LimitExceeded(f"No slot freed up within {self.queue_timeout:g}s")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled after being handed a slot; pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float], overloaded: bool = False) -> None:
+        """
+        Return a slot.
+
+        ``latency`` is how long the call took, or ``None`` for calls that say
+        nothing about the dependency's load (e.g. rejected requests);
+        ``overloaded`` marks timeouts and server errors.
+        """
+        utilized = self.in_flight >= int(self.limit) / 2
+        self.in_flight -= 1
+        if overloaded:
+            self._decrease()
+        elif latency is not None:
+            self._observe(latency)
+            if latency > self.latency_tolerance * self.baseline:
+                self._decrease()
+            elif utilized:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _decrease(self) -> None:
+        # Once per round trip: the calls in flight when load peaked all report it
+        now = self.clock()
+        if now - self._decreased_at >= (self.baseline or 0.0):
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._decreased_at = now
+
+    def retry_after(self) -> float:
+        """Rough seconds until a rejected caller could get a slot."""
+        latency = self.baseline or 1.0
+        return max(
+            1.0,
+            latency
+            * self.latency_tolerance
+            * (len(self._waiters) + 1)
+            / max(1, int(self.limit)),
+        )
+
+    def _observe(self, latency: float) -> None:
+        now = self.clock()
+        if now - self._window_started >= self.baseline_seconds:
+            # Windows roll over so the baseline can rise again, e.g. after a model upgrade
+            self._previous_min = self._window_min
+            self._window_min = None
+            self._window_started = now
+        self._window_min = (
+            latency if self._window_min is None else min(self._window_min, latency)
+        )
+        self.baseline = min(
+            m for m in (self._previous_min, self._window_min) if m is not None
+        )
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Delay before retry ``attempt`` (1-based): uniform in ``[0, min(cap, base * 2**(attempt-1))]``."""
+    return random.uniform(0.0, min(cap, base * 2 ** (attempt - 1)))
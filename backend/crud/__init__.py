@@ -21,6 +21,9 @@ from crud.color import (
 from crud.design import (
     get_design,
     get_designs,
+    get_design_facets,
+    normalize_search_query,
+    search_designs,
     create_design,
     update_design,
     delete_design,
@@ -41,6 +44,9 @@ __all__ = [
     "delete_color",
     "get_design",
     "get_designs",
+    "get_design_facets",
+    "normalize_search_query",
+    "search_designs",
     "create_design",
     "update_design",
     "delete_design",
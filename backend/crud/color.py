@@ -6,6 +6,7 @@ from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 
+from core.cache import catalog_cache
 from models.color import Color
 from schemas.color import ColorCreate, ColorUpdate
 
@@ -31,6 +32,8 @@ def create_color(db: Session, color: ColorCreate) -> Color:
     db.add(db_color)
     db.commit()
     db.refresh(db_color)
+    # Design listings filter by and show colors
+    catalog_cache.invalidate("designs")
     return db_color
 
 
@@ -46,6 +49,7 @@ def update_color(db: Session, color_id: UUID, color: ColorUpdate) -> Optional[Co
 
     db.commit()
     db.refresh(db_color)
+    catalog_cache.invalidate("designs")
     return db_color
 
 
@@ -57,4 +61,5 @@ def delete_color(db: Session, color_id: UUID) -> bool:
 
     db.delete(db_color)
     db.commit()
+    catalog_cache.invalidate("designs")
     return True
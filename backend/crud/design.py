@@ -2,14 +2,25 @@
 CRUD operations for Design model.
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
+from sqlalchemy import Float, cast, exists, func, or_, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by, array
 from sqlalchemy.orm import Session
 
-from models.design import Design
+from models.design import (
+    Design,
+    DesignSizeRange,
+    design_color_association,
+    design_fabric_association,
+)
 from models.fabric import Fabric
 from models.color import Color
 from schemas.design import DesignCreate, DesignUpdate
+from services.fitting import FIT_FIELDS, compile_size_ranges
+
+# Upper bounds of the price bands reported by get_design_facets
+PRICE_BAND_EDGES = [50.0, 100.0, 250.0, 500.0, 1000.0]
 
 
 def get_design(db: Session, design_id: UUID) -> Optional[Design]:
@@ -17,25 +28,247 @@ def get_design(db: Session, design_id: UUID) -> Optional[Design]:
     return db.query(Design).filter(Design.id == design_id).first()
 
 
-def get_designs(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def filter_designs(
+    query,
     owner_id: Optional[UUID] = None,
     active_only: bool = False,
-) -> List[Design]:
-    """Get all designs with optional filtering by owner_id."""
-    query = db.query(Design)
+    style_types: Optional[Sequence[str]] = None,
+    category_ids: Optional[Sequence[UUID]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fabric_ids: Optional[Sequence[UUID]] = None,
+    color_ids: Optional[Sequence[UUID]] = None,
+):
+    """
+    Apply the design listing filters to a query over ``Design``.
 
+    Multi-valued filters match any of the given values. Fabric and color
+    filters are ``EXISTS`` semijoins on the association tables, so a design
+    offered in several matching fabrics is still returned once.
+    """
     if owner_id:
         query = query.filter(Design.owner_id == owner_id)
 
     if active_only:
         query = query.filter(Design.is_active == True)
 
+    if style_types:
+        query = query.filter(Design.style_type.in_(style_types))
+
+    if category_ids:
+        query = query.filter(Design.category_id.in_(category_ids))
+
+    if min_price is not None:
+        query = query.filter(Design.base_price >= min_price)
+
+    if max_price is not None:
+        query = query.filter(Design.base_price <= max_price)
+
+    if fabric_ids:
+        query = query.filter(
+            exists().where(
+                design_fabric_association.c.design_id == Design.id,
+                design_fabric_association.c.fabric_id.in_(fabric_ids),
+            )
+        )
+
+    if color_ids:
+        query = query.filter(
+            exists().where(
+                design_color_association.c.design_id == Design.id,
+                design_color_association.c.color_id.in_(color_ids),
+            )
+        )
+
+    return query
+
+
+def get_designs(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    owner_id: Optional[UUID] = None,
+    active_only: bool = False,
+    **filters: Any,
+) -> List[Design]:
+    """
+    Get all designs with optional filtering.
+
+    ``filters`` are passed through to :func:`filter_designs`.
+    """
+    query = filter_designs(
+        db.query(Design), owner_id=owner_id, active_only=active_only, **filters
+    )
     return query.order_by(Design.created_at.desc()).offset(skip).limit(limit).all()
 
 
+def price_band_label(band: int) -> str:
+    """Label for a ``width_bucket`` index over ``PRICE_BAND_EDGES``."""
+    if band <= 0:
+        return f"<{PRICE_BAND_EDGES[0]:g}"
+    if band >= len(PRICE_BAND_EDGES):
+        return f"{PRICE_BAND_EDGES[-1]:g}+"
+    return f"{PRICE_BAND_EDGES[band - 1]:g}-{PRICE_BAND_EDGES[band]:g}"
+
+
+def get_design_facets(
+    db: Session,
+    active_only: bool = True,
+    **filters: Any,
+) -> Dict[str, Any]:
+    """
+    Count designs per style type, category and price band in one query.
+
+    Uses ``GROUP BY GROUPING SETS`` so all facets (and the overall total) come
+    from a single scan of the designs matching ``filters`` (see
+    :func:`filter_designs`).
+    """
+    price_band = func.width_bucket(
+        Design.base_price, array(PRICE_BAND_EDGES, type_=Float)
+    ).label("price_band")
+
+    filtered = filter_designs(
+        db.query(
+            Design.style_type.label("style_type"),
+            Design.category_id.label("category_id"),
+            price_band,
+        ),
+        active_only=active_only,
+        **filters,
+    ).subquery()
+
+    rows = (
+        db.query(
+            filtered.c.style_type,
+            filtered.c.category_id,
+            filtered.c.price_band,
+            func.grouping(filtered.c.style_type).label("g_style_type"),
+            func.grouping(filtered.c.category_id).label("g_category_id"),
+            func.grouping(filtered.c.price_band).label("g_price_band"),
+            func.count().label("count"),
+        )
+        .group_by(
+            func.grouping_sets(
+                tuple_(filtered.c.style_type),
+                tuple_(filtered.c.category_id),
+                tuple_(filtered.c.price_band),
+                tuple_(),
+            )
+        )
+        .all()
+    )
+
+    facets: Dict[str, Any] = {
+        "total": 0,
+        "style_type": [],
+        "category_id": [],
+        "price_band": [],
+    }
+    price_bands = []
+    for row in rows:
+        if row.g_style_type == 0:
+            facets["style_type"].append({"value": row.style_type, "count": row.count})
+        elif row.g_category_id == 0:
+            value = str(row.category_id) if row.category_id is not None else None
+            facets["category_id"].append({"value": value, "count": row.count})
+        elif row.g_price_band == 0:
+            price_bands.append((row.price_band, row.count))
+        else:
+            facets["total"] = row.count
+
+    for name in ("style_type", "category_id"):
+        facets[name].sort(key=lambda facet: (-facet["count"], facet["value"] or ""))
+    facets["price_band"] = [
+        {"value": price_band_label(band), "count": count}
+        for band, count in sorted(price_bands)
+    ]
+    return facets
+
+
+def normalize_search_query(q: str) -> str:
+    """Trim a search query and collapse its whitespace, as used for searching and caching."""
+    return " ".join(q.split())
+
+
+def _is_plain_query(q: str) -> bool:
+    """Whether ``q`` is just words, without websearch phrase (``"..."``) or exclusion (``-word``) syntax."""
+    return '"' not in q and not any(word.startswith("-") for word in q.split())
+
+
+def search_designs(
+    db: Session,
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    active_only: bool = True,
+) -> List[Design]:
+    """
+    Search designs by name and description, best matches first.
+
+    Full-text matches (``search_vector``) come first, ranked by
+    ``ts_rank_cd`` plus name similarity. When they do not fill the page,
+    designs whose name contains a word similar to the query follow (pg_trgm
+    word similarity on ``search_name``), so typos are still found. Queries
+    using phrase or ``-word`` syntax get full-text matches only, since
+    similarity cannot honour them. Both conditions are backed by GIN indexes.
+
+    Every match is ranked, and only the top ``skip + limit`` are kept (a
+    top-N sort), so the work is bounded by capping ``skip`` at
+    ``DESIGN_SEARCH_MAX_OFFSET`` in the endpoint.
+    ``q`` is expected to be normalized with :func:`normalize_search_query`.
+    """
+    config = cast("qeyafa_search", REGCONFIG)
+    normalized_q = func.qeyafa_search_normalize(q)
+    ts_query = func.websearch_to_tsquery(config, normalized_q)
+    full_text = Design.search_vector.op("@@")(ts_query)
+    wanted = skip + limit
+
+    def ranked(condition, rank, count: int) -> List[UUID]:
+        matches = db.query(Design.id).filter(condition)
+        if active_only:
+            matches = matches.filter(Design.is_active == True)
+        return [
+            row.id
+            for row in matches.order_by(rank.desc(), Design.created_at.desc()).limit(
+                count
+            )
+        ]
+
+    ids = ranked(
+        full_text,
+        func.ts_rank_cd(Design.search_vector, ts_query)
+        + func.similarity(Design.search_name, normalized_q),
+        wanted,
+    )
+    if len(ids) < wanted and _is_plain_query(q):
+        ids += ranked(
+            normalized_q.op("<%")(Design.search_name) & ~full_text,
+            func.word_similarity(normalized_q, Design.search_name),
+            wanted - len(ids),
+        )
+
+    ids = ids[skip:]
+    if not ids:
+        return []
+    designs = {
+        design.id: design for design in db.query(Design).filter(Design.id.in_(ids))
+    }
+    return [designs[design_id] for design_id in ids]
+
+
+def _size_ranges(rules: Optional[Dict[str, Any]]) -> List[DesignSizeRange]:
+    return [DesignSizeRange(**row) for row in compile_size_ranges(rules)]
+
+
+def set_size_ranges(db: Session, db_design: Design) -> None:
+    """Recompile the design's size chart from its ``customization_rules``."""
+    ranges = _size_ranges(db_design.customization_rules)
+    # Flush the removal first: recompiled rows reuse the same primary keys
+    db_design.size_ranges = []
+    db.flush()
+    db_design.size_ranges = ranges
+
+
 def create_design(db: Session, design: DesignCreate, owner_id: UUID) -> Design:
     """Create a new design."""
     # Extract fabric and color IDs
@@ -45,6 +278,7 @@ def create_design(db: Session, design: DesignCreate, owner_id: UUID) -> Design:
     # Create design without relationships
     design_data = design.dict(exclude={"available_fabric_ids", "available_color_ids"})
     db_design = Design(**design_data, owner_id=owner_id)
+    db_design.size_ranges = _size_ranges(design.customization_rules)
 
     # Add fabrics if provided
     if fabric_ids:
@@ -90,6 +324,10 @@ def update_design(
     for field, value in update_data.items():
         setattr(db_design, field, value)
 
+    if "customization_rules" in update_data:
+        set_size_ranges(db, db_design)
+        db_design.rules_version = Design.rules_version + 1
+
     db.commit()
     db.refresh(db_design)
     return db_design
@@ -104,3 +342,55 @@ def delete_design(db: Session, design_id: UUID) -> bool:
     db.delete(db_design)
     db.commit()
     return True
+
+
+def get_fitting_designs(
+    db: Session,
+    measurements: Dict[str, Optional[float]],
+    skip: int = 0,
+    limit: int = 50,
+) -> List[Tuple[Design, List[str]]]:
+    """
+    Find active designs with at least one size that fits ``measurements``.
+
+    A size fits when every bound it declares holds; a bound on a measurement
+    that is missing (``None``) never holds. The whole check is one
+    predicate over ``design_size_ranges``. Returns ``(design, sizes)`` pairs,
+    newest designs first, with sizes in chart order.
+    """
+    clauses = []
+    for field in FIT_FIELDS:
+        low = getattr(DesignSizeRange, f"{field}_min")
+        high = getattr(DesignSizeRange, f"{field}_max")
+        value = measurements.get(field)
+        if value is None:
+            clauses += [low.is_(None), high.is_(None)]
+        else:
+            clauses += [
+                or_(low.is_(None), low <= value),
+                or_(high.is_(None), high >= value),
+            ]
+
+    sizes = func.array_agg(
+        aggregate_order_by(DesignSizeRange.size, DesignSizeRange.position)
+    )
+    fits = (
+        db.query(DesignSizeRange.design_id, sizes.label("sizes"))
+        .join(Design, Design.id == DesignSizeRange.design_id)
+        .filter(Design.is_active == True, *clauses)
+        .group_by(DesignSizeRange.design_id, Design.created_at)
+        .order_by(Design.created_at.desc(), DesignSizeRange.design_id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    if not fits:
+        return []
+
+    designs = {
+        design.id: design
+        for design in db.query(Design).filter(
+            Design.id.in_([fit.design_id for fit in fits])
+        )
+    }
+    return [(designs[fit.design_id], list(fit.sizes)) for fit in fits]
@@ -6,6 +6,7 @@ from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 
+from core.cache import catalog_cache
 from models.fabric import Fabric
 from schemas.fabric import FabricCreate, FabricUpdate
 
@@ -31,6 +32,8 @@ def create_fabric(db: Session, fabric: FabricCreate) -> Fabric:
     db.add(db_fabric)
     db.commit()
     db.refresh(db_fabric)
+    # Design listings filter by and show fabrics
+    catalog_cache.invalidate("designs")
     return db_fabric
 
 
@@ -48,6 +51,7 @@ def update_fabric(
 
     db.commit()
     db.refresh(db_fabric)
+    catalog_cache.invalidate("designs")
     return db_fabric
 
 
@@ -59,4 +63,5 @@ def delete_fabric(db: Session, fabric_id: UUID) -> bool:
 
     db.delete(db_fabric)
     db.commit()
+    catalog_cache.invalidate("designs")
     return True
@@ -2,12 +2,46 @@
 CRUD operations for Measurement model.
 """
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from uuid import UUID
+from sqlalchemy import Float, Text, cast, column, func, select, text, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array
 from sqlalchemy.orm import Session
 
+from core.cache import catalog_cache
 from models.measurement import Measurement
-from schemas.measurement import MeasurementCreate, MeasurementUpdate
+from schemas.measurement import MeasurementCreate, MeasurementResult, MeasurementUpdate
+
+# Body measurements that analytics can be computed over
+MEASUREMENT_FIELDS = list(MeasurementResult.__fields__)
+
+# Percentiles reported by get_measurement_summary
+SUMMARY_PERCENTILES = [0.1, 0.5, 0.9]
+
+
+def measurements_namespace(user_id: UUID) -> str:
+    """Version namespace (used for ETags) covering one user's measurements."""
+    return f"measurements:{user_id}"
+
+
+def typed_measurement_values(
+    measurements: Optional[Dict[str, Any]],
+) -> Dict[str, Optional[float]]:
+    """
+    Extract the typed column values for ``MEASUREMENT_FIELDS`` from a measurements document.
+
+    Missing or non-numeric entries become ``None``. Every write of
+    ``Measurement.measurements`` should also set these columns.
+    """
+    measurements = measurements or {}
+    values = {}
+    for field in MEASUREMENT_FIELDS:
+        value = measurements.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            value = None
+        values[field] = float(value) if value is not None else None
+    return values
 
 
 def get_measurement(db: Session, measurement_id: UUID) -> Optional[Measurement]:
@@ -36,15 +70,18 @@ def create_measurement(
 ) -> Measurement:
     """Create a new measurement record."""
     data = measurement_in.dict(exclude_unset=True)
+    measurements = data.get("measurements", {})
     db_measurement = Measurement(
         user_id=user_id,
-        measurements=data.get("measurements", {}),
+        measurements=measurements,
         image_paths=data.get("image_paths", {}),
         confidence_score=data.get("confidence_score", 0.0),
+        **typed_measurement_values(measurements),
     )
     db.add(db_measurement)
     db.commit()
     db.refresh(db_measurement)
+    catalog_cache.invalidate(measurements_namespace(user_id))
     return db_measurement
 
 
@@ -57,11 +94,14 @@ def update_measurement(
         return None
 
     update_data = measurement_in.dict(exclude_unset=True)
+    if "measurements" in update_data:
+        update_data.update(typed_measurement_values(update_data["measurements"]))
     for field, value in update_data.items():
         setattr(db_measurement, field, value)
 
     db.commit()
     db.refresh(db_measurement)
+    catalog_cache.invalidate(measurements_namespace(db_measurement.user_id))
     return db_measurement
 
 
@@ -70,6 +110,137 @@ def delete_measurement(db: Session, measurement_id: UUID) -> bool:
     db_measurement = get_measurement(db, measurement_id)
     if db_measurement is None:
         return False
+    user_id = db_measurement.user_id
     db.delete(db_measurement)
     db.commit()
+    catalog_cache.invalidate(measurements_namespace(user_id))
     return True
+
+
+def _measurement_record(measurements, fields: Sequence[str]):
+    """``jsonb_to_record(measurements) AS r(<field> FLOAT, ...)`` for ``fields``."""
+    return (
+        func.jsonb_to_record(measurements)
+        .table_valued(*[column(field, Float) for field in fields])
+        .render_derived(name="r", with_types=True)
+    )
+
+
+def _time_window(since: Optional[datetime], until: Optional[datetime]) -> List[Any]:
+    clauses = []
+    if since is not None:
+        clauses.append(Measurement.processed_at >= since)
+    if until is not None:
+        clauses.append(Measurement.processed_at < until)
+    return clauses
+
+
+def get_measurement_history(
+    db: Session,
+    user_id: UUID,
+    fields: Sequence[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> str:
+    """
+    Return one user's measurement history as a columnar JSON document.
+
+    The document maps ``id``, ``processed_at``, each field and
+    ``<field>_delta`` (change since the previous measurement) to arrays in
+    chronological order. It is built entirely in Postgres, so no rows are
+    loaded into Python.
+    """
+    record = _measurement_record(Measurement.measurements, fields)
+    history = (
+        select(
+            Measurement.id,
+            Measurement.processed_at,
+            *[record.c[field] for field in fields],
+        )
+        .select_from(Measurement)
+        .join(record, true())
+        .where(Measurement.user_id == user_id, *_time_window(since, until))
+        .subquery("h")
+    )
+
+    by_time = [history.c.processed_at, history.c.id]
+    windowed_columns = [history.c.id, history.c.processed_at]
+    for field in fields:
+        value = history.c[field]
+        windowed_columns.append(value)
+        windowed_columns.append(
+            (value - func.lag(value).over(order_by=by_time)).label(f"{field}_delta")
+        )
+    windowed = select(*windowed_columns).subquery("w")
+
+    pairs = []
+    for col in windowed.c:
+        pairs.append(col.name)
+        pairs.append(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(col, windowed.c.processed_at, windowed.c.id)
+                ),
+                text("'[]'::json"),
+            )
+        )
+    return db.execute(select(cast(func.json_build_object(*pairs), Text))).scalar_one()
+
+
+def get_measurement_summary(
+    db: Session,
+    fields: Sequence[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregate each field across customers, using each customer's latest measurement.
+
+    Returns a columnar mapping: ``field`` lists the fields and ``count``,
+    ``mean``, ``stddev`` and ``p10``/``p50``/``p90`` hold the statistic for
+    each field at the same position. ``customers`` is the number of customers
+    with at least one of the fields.
+    """
+    latest = (
+        select(Measurement.user_id, Measurement.measurements)
+        .where(
+            Measurement.measurements.has_any(array(list(fields))),
+            *_time_window(since, until),
+        )
+        .distinct(Measurement.user_id)
+        .order_by(Measurement.user_id, Measurement.processed_at.desc())
+        .subquery("latest")
+    )
+    record = _measurement_record(latest.c.measurements, fields)
+
+    columns = [func.count().label("customers")]
+    for field in fields:
+        value = record.c[field]
+        columns += [
+            func.count(value),
+            func.avg(value),
+            func.stddev_samp(value),
+            func.percentile_cont(array(SUMMARY_PERCENTILES)).within_group(value),
+        ]
+    row = db.execute(select(*columns).select_from(latest).join(record, true())).one()
+
+    summary: Dict[str, Any] = {
+        "customers": row[0],
+        "field": list(fields),
+        "count": [],
+        "mean": [],
+        "stddev": [],
+    }
+    percentile_keys = [f"p{int(p * 100)}" for p in SUMMARY_PERCENTILES]
+    for key in percentile_keys:
+        summary[key] = []
+    for index in range(len(fields)):
+        count, mean, stddev, percentiles = row[1 + index * 4 : 5 + index * 4]
+        summary["count"].append(count)
+        summary["mean"].append(mean)
+        summary["stddev"].append(stddev)
+        for key, value in zip(
+            percentile_keys, percentiles or [None] * len(percentile_keys)
+        ):
+            summary[key].append(value)
+    return summary
@@ -0,0 +1,162 @@
+"""
+CRUD operations for User model.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from models.roles import UserRole
+from models.user import User
+
+# Columns included in admin exports (never the password hash)
+EXPORT_COLUMNS = [
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "role",
+    "is_active",
+    "is_superuser",
+    "created_at",
+]
+
+
+def user_filter_clauses(
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    email_prefix: Optional[str] = None,
+) -> List[Any]:
+    """Build the WHERE clauses for the admin user filters."""
+    clauses = []
+    if role is not None:
+        clauses.append(User.role == role)
+
+    if is_active is not None:
+        clauses.append(User.is_active == is_active)
+
+    if created_after is not None:
+        clauses.append(User.created_at >= created_after)
+
+    if created_before is not None:
+        clauses.append(User.created_at < created_before)
+
+    if email_prefix:
+        # Matches the lower(email) text_pattern_ops index
+        clauses.append(
+            func.lower(User.email).startswith(email_prefix.lower(), autoescape=True)
+        )
+
+    return clauses
+
+
+def filter_users(query, **filters: Any):
+    """Apply the admin user listing filters to a query over ``User``."""
+    return query.filter(*user_filter_clauses(**filters))
+
+
+def get_users(
+    db: Session, skip: int = 0, limit: int = 100, **filters: Any
+) -> List[User]:
+    """Get users, newest first, filtered as in :func:`filter_users`."""
+    return (
+        filter_users(db.query(User), **filters)
+        .order_by(User.created_at.desc(), User.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def iter_users_for_export(
+    db: Session, batch_size: int = 1000, **filters: Any
+) -> Iterator[tuple]:
+    """
+    Yield ``EXPORT_COLUMNS`` tuples for every matching user.
+
+    Rows are fetched through a server-side cursor ``batch_size`` at a time,
+    so memory use does not grow with the number of users.
+    """
+    columns = [getattr(User, name) for name in EXPORT_COLUMNS]
+    query = (
+        filter_users(db.query(*columns), **filters)
+        .order_by(User.created_at, User.id)
+        .yield_per(batch_size)
+    )
+    for row in query:
+        yield tuple(row)
+
+
+def _bulk_clauses(
+    user_ids: Optional[Sequence[UUID]],
+    filters: Dict[str, Any],
+    exclude_id: Optional[UUID],
+) -> List[Any]:
+    clauses = user_filter_clauses(**filters)
+    if user_ids is not None:
+        clauses.append(User.id.in_(user_ids))
+    if exclude_id is not None:
+        clauses.append(User.id != exclude_id)
+    return clauses
+
+
+def count_users_for_bulk(
+    db: Session,
+    user_ids: Optional[Sequence[UUID]] = None,
+    exclude_id: Optional[UUID] = None,
+    **filters: Any,
+) -> int:
+    """Count the users a bulk operation would touch."""
+    clauses = _bulk_clauses(user_ids, filters, exclude_id)
+    return db.execute(
+        select(func.count()).select_from(User).where(*clauses)
+    ).scalar_one()
+
+
+def bulk_update_users(
+    db: Session,
+    values: Dict[str, Any],
+    user_ids: Optional[Sequence[UUID]] = None,
+    exclude_id: Optional[UUID] = None,
+    **filters: Any,
+) -> List[UUID]:
+    """
+    Apply ``values`` to every matching user in a single ``UPDATE ... RETURNING``.
+
+    The caller owns the transaction. Returns the ids of the updated users.
+    """
+    clauses = _bulk_clauses(user_ids, filters, exclude_id)
+    statement = (
+        update(User)
+        .where(*clauses)
+        .values(**values)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(statement).scalars())
+
+
+def bulk_delete_users(
+    db: Session,
+    user_ids: Optional[Sequence[UUID]] = None,
+    exclude_id: Optional[UUID] = None,
+    **filters: Any,
+) -> List[UUID]:
+    """
+    Delete every matching user in a single ``DELETE ... RETURNING``.
+
+    The caller owns the transaction. Returns the ids of the deleted users.
+    """
+    clauses = _bulk_clauses(user_ids, filters, exclude_id)
+    statement = (
+        delete(User)
+        .where(*clauses)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(statement).scalars())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Remove stored photos that no record references.
+
+Uploads that were never attached to a measurement, and photos saved by
+``/process`` calls that then failed, are found by checking each batch of
+stored keys against ``Measurement.image_paths`` (and design/category images)
+in a single indexed query. Unreferenced photos older than the grace period
+are deleted with their thumbnails, at most ``--max-deletes-per-second`` at a
+time; legacy uploads (``<user_id>/<uuid>.<ext>``) are included. Expired
+resumable uploads are removed from the staging area as well.
+
+Meant to run on a schedule, e.g. nightly from cron:
+    0 3 * * * cd /app/backend && python gc_photo_store.py >> /var/log/qeyafa-gc.log 2>&1
+
+Usage (from the backend directory):
+    python gc_photo_store.py --dry-run
+    python gc_photo_store.py --grace-hours 26 --batch-size 500 --max-deletes-per-second 50
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.database import SessionLocal
+from services.photo_store import min_grace_seconds, photo_store
+from services.resumable_uploads import resumable_uploads
+
+
+def main() -> int:
+    # Photos uploaded for a still valid upload token are not referenced yet
+    min_grace_hours = min_grace_seconds() / 3600
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=max(24.0, min_grace_hours),
+        help=f"Keep unreferenced photos younger than this; at least the upload token lifetime, {min_grace_hours:g}h",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="Keys checked per reference query"
+    )
+    parser.add_argument(
+        "--max-deletes-per-second",
+        type=float,
+        default=50.0,
+        help="Throttle deletions to spare the storage backend (0: unlimited)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be removed without deleting",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="List every removed photo"
+    )
+    args = parser.parse_args()
+    if args.grace_hours < min_grace_hours:
+        parser.error(
+            f"--grace-hours must be at least {min_grace_hours:g}: upload tokens stay valid that long "
+            "(UPLOAD_STAGING_EXPIRES_SECONDS or STORAGE_PRESIGN_EXPIRES_SECONDS, plus 30 minutes)"
+        )
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        report = asyncio.run(
+            photo_store.collect_garbage(
+                db,
+                args.grace_hours * 3600,
+                dry_run=args.dry_run,
+                batch_size=args.batch_size,
+                max_deletes_per_second=args.max_deletes_per_second or None,
+            )
+        )
+        expired = 0 if args.dry_run else asyncio.run(resumable_uploads.purge_expired())
+    except Exception as e:
+        print(f"❌ Garbage collection failed: {e}")
+        return 1
+    finally:
+        db.close()
+
+    verb = "Would reclaim" if args.dry_run else "Reclaimed"
+    if args.verbose:
+        for path in report.removed:
+            print(f"   {path}")
+    print(
+        f"✅ {verb} {report.bytes_removed / (1024 * 1024):.1f} MB: "
+        f"{len(report.removed)} of {report.scanned} photos ({report.legacy_removed} legacy uploads) "
+        f"in {report.batches} batches, {report.seconds:.1f}s"
+    )
+    print(f"   {report.referenced} referenced, {report.recent} within the grace period")
+    if expired:
+        print(f"✅ Removed {expired} expired resumable uploads")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
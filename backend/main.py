@@ -26,7 +26,11 @@ if os.getenv("TESTING", "false").lower() == "true":
     _fal.default_identifier = _safe_default_identifier
 
 from core.config import settings
+from core.database import engine
+from core.metrics import setup_metrics
+from core.query_tracker import setup_query_tracking
 from api.v1.api import api_router
+from services.ai_client import ai_client
 
 
 from contextlib import asynccontextmanager
@@ -40,7 +44,11 @@ async def lifespan(app: FastAPI):
         print("✅ Redis rate limiting enabled.")
     except Exception as e:
         print(f"⚠️ Redis not available, rate limiting disabled. Reason: {e}")
+    # Ejects AI service replicas that stop answering /health
+    ai_probes = ai_client.start_health_probes()
     yield
+    if ai_probes is not None:
+        ai_probes.cancel()
 
 app = FastAPI(title="Qeyafa Backend (FastAPI)", lifespan=lifespan)
 
@@ -65,6 +73,21 @@ app.add_middleware(
 )
 
 
+# Slow-query and N+1 logging
+if settings.QUERY_TRACKING_ENABLED:
+    setup_query_tracking(
+        app,
+        engine,
+        slow_query_ms=settings.SLOW_QUERY_MS,
+        n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+    )
+
+
+# Performance metrics (added last so it wraps every other middleware)
+if settings.METRICS_ENABLED:
+    setup_metrics(app, engine, server_timing=settings.SERVER_TIMING_ENABLED, token=settings.METRICS_TOKEN)
+
+
 # Rate limiting setup (Redis)
 import asyncio
 
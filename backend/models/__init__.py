@@ -6,8 +6,17 @@ from models.user import User
 from models.measurement import Measurement
 from models.roles import UserRole
 from models.category import Category
-from models.design import Design
+from models.design import Design, DesignSizeRange
 from models.fabric import Fabric
 from models.color import Color
 
-__all__ = ["User", "Measurement", "UserRole", "Category", "Design", "Fabric", "Color"]
+__all__ = [
+    "User",
+    "Measurement",
+    "UserRole",
+    "Category",
+    "Design",
+    "DesignSizeRange",
+    "Fabric",
+    "Color",
+]
@@ -4,7 +4,7 @@ Category model.
 
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, String
+from sqlalchemy import JSON, Boolean, Column, DateTime, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
@@ -20,6 +20,8 @@ class Category(Base):
     name = Column(String, unique=True, nullable=False, index=True)
     description = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
+    # {size: {format: key}}, filled in by services.derivatives
+    image_derivatives = Column(JSON, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -4,10 +4,22 @@ Design model.
 
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, String, Table
-from sqlalchemy.dialects.postgresql import UUID, JSON
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import UUID, JSON, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.sql import func, text
 
 from core.database import Base
 
@@ -17,6 +29,7 @@ design_fabric_association = Table(
     Base.metadata,
     Column("design_id", UUID(as_uuid=True), ForeignKey("designs.id"), primary_key=True),
     Column("fabric_id", UUID(as_uuid=True), ForeignKey("fabrics.id"), primary_key=True),
+    Index("ix_design_fabric_fabric_id_design_id", "fabric_id", "design_id"),
 )
 
 # Association table for Design-Color many-to-many relationship
@@ -25,6 +38,7 @@ design_color_association = Table(
     Base.metadata,
     Column("design_id", UUID(as_uuid=True), ForeignKey("designs.id"), primary_key=True),
     Column("color_id", UUID(as_uuid=True), ForeignKey("colors.id"), primary_key=True),
+    Index("ix_design_color_color_id_design_id", "color_id", "design_id"),
 )
 
 
@@ -32,23 +46,53 @@ class Design(Base):
     """Design model for marketplace designs."""
 
     __tablename__ = "designs"
+    __table_args__ = (
+        Index("ix_designs_is_active_created_at", "is_active", text("created_at DESC")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
     base_image_url = Column(String, nullable=True)
-    base_price = Column(Float, nullable=False)
+    # {size: {format: key}}, filled in by services.derivatives
+    base_image_derivatives = Column(JSON, nullable=True)
+    base_price = Column(Float, nullable=False, index=True)
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     customization_rules = Column(JSON, nullable=True, default=dict)
+    # Bumped whenever customization_rules changes; keys the compiled-rules cache
+    rules_version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Legacy fields for backward compatibility
     style_type = Column(String, nullable=True, index=True)
-    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
+    category_id = Column(
+        UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True, index=True
+    )
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
+    # Full-text search document, maintained by Postgres (see migration 3e7a9c1b5d20)
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('qeyafa_search'::regconfig, qeyafa_search_normalize(name)), 'A') || "
+                "setweight(to_tsvector('qeyafa_search'::regconfig, qeyafa_search_normalize(description)), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        )
+    )
+    # Normalized name for trigram matching (see migration b8d0f2a4c6e9)
+    search_name = deferred(
+        Column(
+            Text,
+            Computed("qeyafa_search_normalize(name)", persisted=True),
+            nullable=True,
+        )
+    )
+
     # Many-to-many relationships
     available_fabrics = relationship(
         "Fabric", secondary=design_fabric_association, backref="designs"
@@ -57,5 +101,48 @@ class Design(Base):
         "Color", secondary=design_color_association, backref="designs"
     )
 
+    # Size chart compiled from customization_rules["sizes"] (see services.fitting)
+    size_ranges = relationship(
+        "DesignSizeRange",
+        cascade="all, delete-orphan",
+        order_by="DesignSizeRange.position",
+        passive_deletes=True,
+    )
+
     def __repr__(self):
         return f"<Design(id={self.id}, name={self.name})>"
+
+
+class DesignSizeRange(Base):
+    """
+    One size of a design as numeric measurement bounds.
+
+    Rows are derived from ``Design.customization_rules`` whenever a design is
+    written. A ``NULL`` bound leaves that side of the range open.
+    """
+
+    __tablename__ = "design_size_ranges"
+
+    design_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("designs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    size = Column(String(32), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+
+    chest_min = Column(Float, nullable=True)
+    chest_max = Column(Float, nullable=True)
+    waist_min = Column(Float, nullable=True)
+    waist_max = Column(Float, nullable=True)
+    shoulders_min = Column(Float, nullable=True)
+    shoulders_max = Column(Float, nullable=True)
+    arm_length_min = Column(Float, nullable=True)
+    arm_length_max = Column(Float, nullable=True)
+    neck_min = Column(Float, nullable=True)
+    neck_max = Column(Float, nullable=True)
+    hip_min = Column(Float, nullable=True)
+    hip_max = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f"<DesignSizeRange(design_id={self.design_id}, size={self.size})>"
@@ -4,9 +4,9 @@ Measurement model.
 
 import uuid
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, String
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 from core.database import Base
 
@@ -15,15 +15,55 @@ class Measurement(Base):
     """Measurement model for storing AI-processed body measurements."""
 
     __tablename__ = "measurements"
+    __table_args__ = (
+        Index(
+            "ix_measurements_user_id_processed_at",
+            "user_id",
+            text("processed_at DESC"),
+        ),
+        Index(
+            "ix_measurements_measurements",
+            "measurements",
+            postgresql_using="gin",
+        ),
+        # Photo garbage collection: image_paths @@ '$.* == "<key>" || ...'
+        Index(
+            "ix_measurements_image_paths",
+            "image_paths",
+            postgresql_using="gin",
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     measurements = Column(JSONB, nullable=False)
     image_paths = Column(JSONB, nullable=False)
+    # {view: {size: {format: key}}}, filled in by services.derivatives
+    image_derivatives = Column(JSONB, nullable=True)
     processed_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     confidence_score = Column(Float, nullable=False)
+    # ``jti`` of the upload token this measurement was finalized from, so a token is used once
+    upload_token_id = Column(String(32), nullable=True, unique=True, index=True)
+    # Last insert or update; incremental refreshes of services.measurement_index follow it
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        index=True,
+    )
+
+    # Typed copies of the core fields in ``measurements`` (see
+    # crud.measurement.typed_measurement_values), so range queries can use
+    # B-tree indexes instead of parsing JSON per row.
+    chest = Column(Float, nullable=True, index=True)
+    waist = Column(Float, nullable=True, index=True)
+    shoulders = Column(Float, nullable=True, index=True)
+    arm_length = Column(Float, nullable=True, index=True)
+    neck = Column(Float, nullable=True, index=True)
+    hip = Column(Float, nullable=True, index=True)
 
     def __repr__(self):
         return f"<Measurement(id={self.id}, user_id={self.user_id})>"
@@ -4,9 +4,9 @@ User model.
 
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, String, Enum
+from sqlalchemy import Boolean, Column, DateTime, String, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 from core.database import Base
 from models.roles import UserRole
@@ -16,6 +16,9 @@ class User(Base):
     """User model for authentication and authorization."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email_lower_pattern", text("lower(email) text_pattern_ops")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, nullable=False, index=True)
@@ -29,9 +32,10 @@ class User(Base):
         nullable=False,
         default=UserRole.CUSTOMER,
         server_default=UserRole.CUSTOMER.value,
+        index=True,
     )
     created_at = Column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
     )
 
     def __repr__(self):
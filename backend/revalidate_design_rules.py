@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Re-validate every design's ``customization_rules`` and recompile its size chart.
+
+Rules are validated when a design is written, but designs saved before
+validation existed (or before a schema change) may not conform. This
+reports each invalid design and rebuilds ``design_size_ranges`` for the
+valid ones; invalid designs are left without sizes. With ``--dry-run``
+nothing is written.
+
+Usage (from the backend directory):
+    python revalidate_design_rules.py
+    python revalidate_design_rules.py --dry-run
+"""
+
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.database import SessionLocal
+from crud.design import set_size_ranges
+from models.design import Design
+from services.customization import compile_rules
+
+BATCH_SIZE = 500
+
+
+def revalidate_design_rules(dry_run: bool = False) -> int:
+    """Validate all designs; returns the number of invalid designs."""
+    db = SessionLocal()
+    valid = 0
+    invalid = 0
+    try:
+        design_ids = [row[0] for row in db.query(Design.id).order_by(Design.id)]
+        for start in range(0, len(design_ids), BATCH_SIZE):
+            batch = db.query(Design).filter(
+                Design.id.in_(design_ids[start : start + BATCH_SIZE])
+            )
+            for design in batch:
+                try:
+                    compile_rules(design.customization_rules)
+                    if not dry_run:
+                        set_size_ranges(db, design)
+                    valid += 1
+                except ValueError as e:
+                    if not dry_run:
+                        design.size_ranges = []
+                    invalid += 1
+                    print(f"❌ Design {design.id} ({design.name}): {e}")
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+    finally:
+        db.close()
+
+    print(
+        f"✅ {valid} designs valid, {invalid} invalid"
+        + (" (dry run)" if dry_run else "")
+    )
+    return invalid
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report invalid designs"
+    )
+    args = parser.parse_args()
+    return 1 if revalidate_design_rules(args.dry_run) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ Schemas package.
 
 from schemas.user import UserRegister, UserLogin, Token, UserResponse
 from schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
-from schemas.design import DesignCreate, DesignUpdate, DesignResponse
+from schemas.design import DesignCreate, DesignUpdate, DesignResponse, DesignFacets
 from schemas.fabric import FabricCreate, FabricUpdate, FabricResponse
 from schemas.color import ColorCreate, ColorUpdate, ColorResponse
 
@@ -19,6 +19,7 @@ __all__ = [
     "DesignCreate",
     "DesignUpdate",
     "DesignResponse",
+    "DesignFacets",
     "FabricCreate",
     "FabricUpdate",
     "FabricResponse",
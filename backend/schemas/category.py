@@ -2,7 +2,7 @@
 Pydantic schemas for Category operations.
 """
 
-from typing import Optional
+from typing import Dict, Optional
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel, Field
@@ -34,6 +34,8 @@ class CategoryResponse(BaseModel):
     name: str
     description: Optional[str] = None
     image_url: Optional[str] = None
+    # {size: {format: key}}; fetch with GET /categories/{id}/image
+    image_derivatives: Optional[Dict[str, Dict[str, str]]] = None
     is_active: bool
     created_at: datetime
 
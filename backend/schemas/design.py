@@ -2,11 +2,102 @@
 Pydantic schemas for Design operations.
 """
 
+from enum import Enum
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 from datetime import datetime
+from pydantic import BaseModel, Field, root_validator, validator
 from pydantic import BaseModel, Field
-from pydantic import BaseModel, Field
+
+from services.fitting import compile_size_ranges
+
+
+class OptionType(str, Enum):
+    """Kinds of customer-selectable design options."""
+
+    CHOICE = "choice"
+    NUMBER = "number"
+    TEXT = "text"
+    BOOLEAN = "boolean"
+
+
+class CustomizationOption(BaseModel):
+    """One option a customer can set when ordering a design."""
+
+    type: OptionType
+    label: Optional[str] = Field(None, max_length=100)
+    required: bool = False
+    default: Optional[Any] = None
+    # choice
+    choices: Optional[List[str]] = Field(None, min_items=1)
+    choice_prices: Optional[Dict[str, float]] = Field(None, description="Surcharge per choice")
+    # number
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # text
+    max_length: Optional[int] = Field(None, gt=0)
+    price: float = Field(0.0, ge=0, description="Surcharge when the option is set (true for booleans)")
+
+    class Config:
+        extra = "forbid"
+
+    @root_validator(skip_on_failure=True)
+    def check_type_settings(cls, values):
+        kind = values["type"]
+        choices = values.get("choices")
+        if kind == OptionType.CHOICE:
+            if not choices:
+                raise ValueError("choice options need choices")
+            if len(set(choices)) != len(choices):
+                raise ValueError("choices must be unique")
+            unknown = set(values.get("choice_prices") or {}) - set(choices)
+            if unknown:
+                raise ValueError(f"choice_prices for unknown choices: {', '.join(sorted(unknown))}")
+        elif choices is not None or values.get("choice_prices") is not None:
+            raise ValueError("choices only apply to choice options")
+        if kind != OptionType.NUMBER and (values.get("min") is not None or values.get("max") is not None):
+            raise ValueError("min/max only apply to number options")
+        if values.get("min") is not None and values.get("max") is not None and values["min"] > values["max"]:
+            raise ValueError("min is greater than max")
+        if kind != OptionType.TEXT and values.get("max_length") is not None:
+            raise ValueError("max_length only applies to text options")
+        return values
+
+
+class CustomizationRules(BaseModel):
+    """Schema of ``Design.customization_rules``."""
+
+    sizes: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Size chart, see services.fitting")
+    options: Dict[str, CustomizationOption] = Field(default_factory=dict)
+
+    class Config:
+        extra = "forbid"
+
+    @validator("sizes")
+    def check_sizes(cls, sizes):
+        if sizes is not None:
+            compile_size_ranges({"sizes": sizes})
+        return sizes
+
+    @validator("options")
+    def check_defaults(cls, options):
+        # Imported here: services.customization builds on these schemas
+        from services.customization import compile_option
+
+        for name, option in options.items():
+            if option.default is not None:
+                try:
+                    compile_option(name, option).check(option.default)
+                except ValueError as e:
+                    raise ValueError(f"default for option '{name}': {e}")
+        return options
+
+
+def _check_customization_rules(rules: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reject customization rules that do not match :class:`CustomizationRules`."""
+    if rules is not None:
+        CustomizationRules.parse_obj(rules)
+    return rules
 
 
 class DesignCreate(BaseModel):
@@ -24,6 +115,8 @@ class DesignCreate(BaseModel):
     style_type: Optional[str] = None
     category_id: Optional[UUID] = None
 
+    _validate_rules = validator("customization_rules", allow_reuse=True)(_check_customization_rules)
+
 
 class DesignUpdate(BaseModel):
     """Schema for updating a design."""
@@ -41,6 +134,8 @@ class DesignUpdate(BaseModel):
     category_id: Optional[UUID] = None
     is_active: Optional[bool] = None
 
+    _validate_rules = validator("customization_rules", allow_reuse=True)(_check_customization_rules)
+
 
 class DesignResponse(BaseModel):
     """Schema for design response."""
@@ -49,6 +144,8 @@ class DesignResponse(BaseModel):
     name: str
     description: Optional[str] = None
     base_image_url: Optional[str] = None
+    # {size: {format: key}}; fetch with GET /designs/{id}/image
+    base_image_derivatives: Optional[Dict[str, Dict[str, str]]] = None
     base_price: float
     owner_id: UUID
     customization_rules: Optional[Dict[str, Any]] = None
@@ -60,3 +157,41 @@ class DesignResponse(BaseModel):
     created_at: datetime
     class Config:
         orm_mode = True
+
+
+class FacetCount(BaseModel):
+    """Number of designs sharing one facet value."""
+
+    value: Optional[str] = None
+    count: int
+
+
+class DesignFacets(BaseModel):
+    """Grouped design counts for the marketplace filters."""
+
+    total: int
+    style_type: List[FacetCount]
+    category_id: List[FacetCount]
+    price_band: List[FacetCount]
+
+
+class DesignFit(BaseModel):
+    """A design together with the sizes that fit a measurement."""
+
+    design: DesignResponse
+    sizes: List[str]
+
+
+class DesignOptionsRequest(BaseModel):
+    """Options a customer selected for a design."""
+
+    options: Dict[str, Any] = Field(default_factory=dict)
+
+
+class DesignOptionsResult(BaseModel):
+    """Outcome of checking selected options against a design's rules."""
+
+    valid: bool
+    errors: List[str]
+    options: Dict[str, Any] = Field(..., description="Selected options with defaults applied")
+    price: float = Field(..., description="Base price plus option surcharges")
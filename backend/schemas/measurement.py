@@ -4,7 +4,7 @@ Measurement schemas for API request/response validation.
 
 from pydantic import BaseModel, Field
 from pydantic import BaseModel, Field
-from typing import Dict
+from typing import Dict, List, Literal
 from datetime import datetime
 import uuid
 from typing import Optional
@@ -35,6 +35,49 @@ class MeasurementProcessRequest(BaseModel):
     weight: float = Field(..., gt=0, description="Weight in kg")
 
 
+class PhotoUploadSpec(BaseModel):
+    """A photo the client is about to upload directly to storage."""
+
+    sha256: str = Field(..., regex="^[0-9a-f]{64}$", description="Lower-case hex SHA-256 of the photo")
+    size: int = Field(..., gt=0, description="Size of the photo in bytes")
+    content_type: Literal["image/jpeg", "image/png"]
+
+
+class PhotoUploadRequest(BaseModel):
+    """Request for signed upload URLs for the four measurement views."""
+
+    front: PhotoUploadSpec
+    back: PhotoUploadSpec
+    left: PhotoUploadSpec
+    right: PhotoUploadSpec
+    resumable: bool = Field(False, description="Upload through resumable sessions on this API instead of presigned URLs")
+
+
+class PhotoUploadTarget(BaseModel):
+    """Where to upload one photo; ``url`` is null when it is already stored."""
+
+    key: str
+    url: Optional[str] = None
+    method: str = "PUT"
+    headers: Dict[str, str] = Field(default_factory=dict)
+
+
+class PhotoUploadTicket(BaseModel):
+    """Signed upload URLs, plus the token that finalizes the upload."""
+
+    upload_token: str
+    expires_at: datetime
+    uploads: Dict[str, PhotoUploadTarget]
+
+
+class PhotoFinalizeRequest(BaseModel):
+    """Request to process photos uploaded with a :class:`PhotoUploadTicket`."""
+
+    upload_token: str
+    height: float = Field(..., gt=0, description="Height in cm")
+    weight: float = Field(..., gt=0, description="Weight in kg")
+
+
 class MeasurementProcessResponse(BaseModel):
     """Response after processing measurements."""
 
@@ -55,6 +98,8 @@ class MeasurementResponse(BaseModel):
     user_id: uuid.UUID
     measurements: Dict[str, float]
     image_paths: Dict[str, str]
+    # {view: {size: {format: key}}}; fetch with GET /measurements/{id}/images/{view}
+    image_derivatives: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None
     processed_at: datetime
     confidence_score: float
 
@@ -76,3 +121,23 @@ class MeasurementUpdate(BaseModel):
     measurements: Optional[Dict[str, float]] = Field(None, description="Updated measurements map")
     image_paths: Optional[Dict[str, str]] = Field(None, description="Updated image paths")
     confidence_score: Optional[float] = Field(None, description="Updated confidence score")
+
+
+class MeasurementSummary(BaseModel):
+    """Columnar per-field statistics across customers."""
+
+    customers: int
+    field: List[str]
+    count: List[int]
+    mean: List[Optional[float]]
+    stddev: List[Optional[float]]
+    p10: List[Optional[float]]
+    p50: List[Optional[float]]
+    p90: List[Optional[float]]
+
+
+class SimilarMeasurement(BaseModel):
+    """A customer whose latest measurement is close to the requested one."""
+
+    distance: float = Field(..., description="Distance in standardized units (lower is closer)")
+    measurements: Dict[str, float]
@@ -1,9 +1,10 @@
 """Pydantic schemas for User operations."""
 
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, root_validator
 
 from models.roles import UserRole
 
@@ -77,3 +78,58 @@ class UserOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class BulkUserAction(str, Enum):
+    """Operations supported by the admin bulk endpoint."""
+
+    ACTIVATE = "activate"
+    DEACTIVATE = "deactivate"
+    SET_ROLE = "set_role"
+    DELETE = "delete"
+
+
+class UserBulkFilter(BaseModel):
+    """Selects users by attribute instead of by id."""
+
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    email_prefix: Optional[str] = Field(None, min_length=1, max_length=254)
+
+    @root_validator
+    def require_criterion(cls, values):
+        if all(value is None for value in values.values()):
+            raise ValueError("filter must set at least one criterion")
+        return values
+
+
+class UserBulkRequest(BaseModel):
+    """Schema for a bulk admin operation on users."""
+
+    action: BulkUserAction
+    user_ids: Optional[List[UUID]] = Field(None, min_items=1, max_items=10000)
+    filter: Optional[UserBulkFilter] = None
+    role: Optional[UserRole] = None
+    dry_run: bool = False
+
+    @root_validator(skip_on_failure=True)
+    def check_target_and_role(cls, values):
+        if (values.get("user_ids") is None) == (values.get("filter") is None):
+            raise ValueError("provide exactly one of user_ids or filter")
+        if (
+            values.get("action") == BulkUserAction.SET_ROLE
+            and values.get("role") is None
+        ):
+            raise ValueError("role is required for set_role")
+        return values
+
+
+class UserBulkResult(BaseModel):
+    """Schema for the result of a bulk admin operation."""
+
+    action: BulkUserAction
+    dry_run: bool
+    matched: int
+    user_ids: List[UUID] = []
@@ -1,12 +1,65 @@
 """
 AI Service Client for communicating with the AI model service.
+
+Calls are spread over the replicas in ``settings.AI_SERVICE_URLS`` by an
+:class:`~services.ai_endpoints.EndpointPool` (latency- and load-aware
+balancing, background health probes). Each replica has its own
+:class:`~core.resilience.CircuitBreaker`, so a degraded replica fails fast
+instead of tying up connections until the read timeout; when all circuits
+are open :class:`AIServiceUnavailable` is raised immediately. Idempotent
+calls (validation, health checks) are retried, preferring replicas not
+tried yet, with jittered back-off and within a
+:class:`~core.resilience.RetryBudget`; measurement processing is only retried
+when the connection could not be established, as the request then never
+reached the service. With
+``AI_HEDGE_DELAY_SECONDS`` set, an idempotent call still unanswered after
+that delay is duplicated to a second replica and the first response wins;
+processing is never hedged, as both replicas would run it.
+
+Inference calls (processing, validation) are also bounded by an
+:class:`~core.resilience.AdaptiveLimiter`, so a burst of uploads queues in
+the backend instead of overloading the service; calls that cannot get a slot
+in time fail with :class:`AIServiceOverloaded`. A slot is held per request
+sent, so a hedge needs a second one and is skipped when none is free. With
+``AI_WIRE_PROTOCOL=frame``, processing calls use the compact binary format of
+:mod:`services.ai_frames` instead of multipart form data and JSON.
 """
 
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
 import httpx
-from typing import Dict, Any
 from fastapi import UploadFile
 
 from core.config import settings
+from core.metrics import (
+    AI_CIRCUIT_OPEN,
+    AI_CONCURRENCY_LIMIT,
+    AI_HEDGES,
+    AI_IN_FLIGHT,
+    AI_QUEUE_DEPTH,
+    AI_RETRIES,
+    AI_SHED,
+    timed_ai_call,
+)
+from core.resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    LimitExceeded,
+    RetryBudget,
+    backoff_delay,
+)
+from services.ai_endpoints import Endpoint, EndpointPool
+from services.ai_frames import (
+    FRAME_CONTENT_TYPE,
+    VIEWS,
+    FrameError,
+    decode_process_response,
+    encode_process_request,
+)
+
+_MAX_BACKOFF_SECONDS = 2.0
 
 
 class AIServiceError(Exception):
@@ -15,13 +68,318 @@ class AIServiceError(Exception):
     pass
 
 
+class AIServiceUnavailable(AIServiceError):
+    """Raised without calling the service, e.g. when the circuit of every replica is open."""
+
+    def __init__(
+        self, retry_after: float, message: str = "AI service unavailable (circuit open)"
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AIServiceOverloaded(AIServiceUnavailable):
+    """Raised when a call finds no free concurrency slot within the queue timeout."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after, "AI service at capacity, try again shortly")
+
+
+class AIRequestInvalid(AIServiceError):
+    """Raised without calling the service when the inputs cannot be sent, e.g. photos of an unsupported type."""
+
+    pass
+
+
+class _TransientError(AIServiceError):
+    """A replica failed in a way another attempt may not (connection error, timeout, 5xx)."""
+
+    def __init__(self, message: str, sent: bool = True, overloaded: bool = False):
+        super().__init__(message)
+        # False when the request never reached the service, so retrying is always safe
+        self.sent = sent
+        # True for timeouts and 5xx answers, the signs of a service under too much load
+        self.overloaded = overloaded
+
+
 class AIClient:
     """Client for communicating with the AI model service."""
 
-    def __init__(self):
-        self.base_url = settings.AI_SERVICE_URL
-        self.timeout = 30.0
+    def __init__(
+        self,
+        base_urls: Optional[List[str]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = httpx.Timeout(
+            settings.AI_READ_TIMEOUT_SECONDS,
+            connect=settings.AI_CONNECT_TIMEOUT_SECONDS,
+        )
+        self.retry_attempts = settings.AI_RETRY_ATTEMPTS
+        self.retry_backoff = settings.AI_RETRY_BACKOFF_SECONDS
+        self.hedge_delay = settings.AI_HEDGE_DELAY_SECONDS
+        self.wire_protocol = settings.AI_WIRE_PROTOCOL
+        self.retry_budget = RetryBudget(settings.AI_RETRY_BUDGET_RATIO)
+        self.limiter = AdaptiveLimiter(
+            initial=settings.AI_CONCURRENCY_INITIAL,
+            min_limit=settings.AI_CONCURRENCY_MIN,
+            max_limit=settings.AI_CONCURRENCY_MAX,
+            latency_tolerance=settings.AI_CONCURRENCY_LATENCY_TOLERANCE,
+            max_queue=settings.AI_QUEUE_MAX,
+            queue_timeout=settings.AI_QUEUE_TIMEOUT_SECONDS,
+        )
+        self.transport = transport
+        self.base_urls = base_urls or settings.AI_SERVICE_URLS
+
+    @property
+    def base_urls(self) -> List[str]:
+        return self.pool.urls
+
+    @base_urls.setter
+    def base_urls(self, urls: List[str]) -> None:
+        self.pool = EndpointPool(
+            urls,
+            breaker_factory=lambda: CircuitBreaker(
+                failure_ratio=settings.AI_BREAKER_FAILURE_RATIO,
+                min_calls=settings.AI_BREAKER_MIN_CALLS,
+                window_seconds=settings.AI_BREAKER_WINDOW_SECONDS,
+                open_seconds=settings.AI_BREAKER_OPEN_SECONDS,
+            ),
+            strategy=settings.AI_LOAD_BALANCING,
+            decay_seconds=settings.AI_EWMA_DECAY_SECONDS,
+            failure_penalty=settings.AI_READ_TIMEOUT_SECONDS,
+            unhealthy_threshold=settings.AI_UNHEALTHY_THRESHOLD,
+        )
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker of replica ``url``."""
+        return self.pool.endpoints[url].breaker
+
+    def start_health_probes(self) -> Optional["asyncio.Task"]:
+        """Probe the replicas' ``/health`` in the background of the running loop (``None`` if disabled)."""
+        if settings.AI_HEALTH_PROBE_INTERVAL_SECONDS <= 0:
+            return None
+        return asyncio.create_task(
+            self.pool.run_probes(
+                settings.AI_HEALTH_PROBE_INTERVAL_SECONDS,
+                settings.AI_HEALTH_PROBE_TIMEOUT_SECONDS,
+                self.transport,
+            )
+        )
+
+    def _candidates(self, operation: str) -> List[Endpoint]:
+        candidates = self.pool.candidates()
+        if not candidates:
+            AI_CIRCUIT_OPEN.inc(operation=operation)
+            raise AIServiceUnavailable(
+                min(
+                    endpoint.breaker.retry_after()
+                    for endpoint in self.pool.endpoints.values()
+                )
+            )
+        return candidates
+
+    async def _send_one(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: Endpoint,
+        method: str,
+        path: str,
+        **kwargs,
+    ) -> httpx.Response:
+        url = endpoint.url
+        breaker = endpoint.breaker
+        if not breaker.acquire():
+            # Another call took the half-open trial since the replica was picked
+            raise _TransientError(f"{url}: circuit open", sent=False)
+        started = self.pool.acquire(endpoint)
+        ok = None
+        try:
+            response = await client.request(method, f"{url}{path}", **kwargs)
+            ok = response.status_code < 500
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            ok = False
+            breaker.record_failure()
+            raise _TransientError(f"{url}: {e}", sent=False)
+        except httpx.TimeoutException as e:
+            ok = False
+            breaker.record_failure()
+            raise _TransientError(f"{url}: {e}", overloaded=True)
+        except httpx.HTTPError as e:
+            # Dropped connections, undecodable or redirecting answers
+            ok = False
+            breaker.record_failure()
+            raise _TransientError(f"{url}: {e}")
+        except BaseException:
+            # No outcome (cancelled, or a bug): free the half-open trial if this was it
+            breaker.release()
+            raise
+        finally:
+            self.pool.release(endpoint, started, ok)
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise _TransientError(
+                f"{url}: HTTP {response.status_code}", overloaded=True
+            )
+        # 4xx answers mean the replica is healthy; the request itself is at fault
+        breaker.record_success()
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise AIServiceError(str(e))
+        return response
+
+    async def _send_limited(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: Endpoint,
+        method: str,
+        path: str,
+        **kwargs,
+    ) -> httpx.Response:
+        """``_send_one`` holding a limiter slot taken by the caller, returned with this request's latency."""
+        started = time.perf_counter()
+        latency = None
+        overloaded = False
+        try:
+            response = await self._send_one(client, endpoint, method, path, **kwargs)
+            latency = time.perf_counter() - started
+            return response
+        except _TransientError as e:
+            # Only timeouts and 5xx shrink the limit; refused connections say nothing about latency
+            overloaded = e.overloaded
+            raise
+        finally:
+            self.limiter.release(latency, overloaded=overloaded)
+            self._report_limiter()
+
+    async def _take_slot(self, operation: str) -> None:
+        try:
+            await self.limiter.acquire()
+        except LimitExceeded:
+            AI_SHED.inc(operation=operation)
+            raise AIServiceOverloaded(self.limiter.retry_after())
+        finally:
+            self._report_limiter()
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        operation: str,
+        tried: Set[str],
+        idempotent: bool,
+        limited: bool,
+        method: str,
+        path: str,
+        **kwargs,
+    ) -> httpx.Response:
+        if limited:
+            await self._take_slot(operation)
+            send = self._send_limited
+        else:
+            send = self._send_one
+        try:
+            candidates = self._candidates(operation)
+        except AIServiceUnavailable:
+            if limited:
+                self.limiter.release(None)
+                self._report_limiter()
+            raise
+        endpoint = self.pool.pick(candidates, exclude=tried)
+        tried.add(endpoint.url)
+        # A hedge sends the call twice, so non-idempotent calls are never hedged
+        if not idempotent or self.hedge_delay is None or len(candidates) < 2:
+            return await send(client, endpoint, method, path, **kwargs)
+
+        primary = asyncio.ensure_future(send(client, endpoint, method, path, **kwargs))
+        pending = {primary}
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                return primary.result()
+            if limited and not self.limiter.try_acquire():
+                # No slot to spare for a duplicate; it would only add to the overload
+                return await primary
+
+            AI_HEDGES.inc(operation=operation)
+            second = self.pool.pick(
+                [other for other in candidates if other is not endpoint], exclude=tried
+            )
+            tried.add(second.url)
+            hedge = asyncio.ensure_future(send(client, second, method, path, **kwargs))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            # Also when the caller is cancelled: nothing may outlive the client
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise error
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        idempotent: bool,
+        limited: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Call ``path`` on a replica, retrying transient failures.
 
+        Non-idempotent calls are retried only when the request never reached
+        the service. Each request of a ``limited`` call (first attempt,
+        retry or hedge) holds a slot of the concurrency limiter while it is
+        in flight, and its latency alone adapts the limit; back-off between
+        attempts holds no slot.
+        """
+        self.retry_budget.deposit()
+        async with httpx.AsyncClient(
+            timeout=self.timeout, transport=self.transport
+        ) as client:
+            attempt = 1
+            tried: Set[str] = set()
+            while True:
+                try:
+                    return await self._send(
+                        client,
+                        operation,
+                        tried,
+                        idempotent,
+                        limited,
+                        method,
+                        path,
+                        **kwargs,
+                    )
+                except _TransientError as e:
+                    retryable = idempotent or not e.sent
+                    if (
+                        not retryable
+                        or attempt >= self.retry_attempts
+                        or not self.retry_budget.withdraw()
+                    ):
+                        raise AIServiceError(f"AI service request failed: {e}") from e
+                AI_RETRIES.inc(operation=operation)
+                await asyncio.sleep(
+                    backoff_delay(attempt, self.retry_backoff, _MAX_BACKOFF_SECONDS)
+                )
+                attempt += 1
+
+    def _report_limiter(self) -> None:
+        AI_CONCURRENCY_LIMIT.set(self.limiter.limit)
+        AI_IN_FLIGHT.set(self.limiter.in_flight)
+        AI_QUEUE_DEPTH.set(self.limiter.waiting)
+
+    @timed_ai_call("health_check")
     async def health_check(self) -> Dict[str, Any]:
         """
         Check if the AI service is healthy.
@@ -29,13 +387,15 @@ class AIClient:
         Returns:
             Dict with health status
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(f"{self.base_url}/health")
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                raise AIServiceError(f"AI service health check failed: {str(e)}")
+        try:
+            response = await self._request(
+                "health_check", "GET", "/health", idempotent=True
+            )
+        except AIServiceUnavailable:
+            raise
+        except AIServiceError as e:
+            raise AIServiceError(f"AI service health check failed: {str(e)}")
+        return response.json()
 
     async def process_measurements(
         self,
@@ -63,59 +423,95 @@ class AIClient:
         Raises:
             AIServiceError: If the request fails
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                # Prepare files for upload
-                files = [
-                    (
-                        "photo_front",
-                        (
-                            photo_front.filename,
-                            await photo_front.read(),
-                            photo_front.content_type,
-                        ),
-                    ),
-                    (
-                        "photo_back",
-                        (
-                            photo_back.filename,
-                            await photo_back.read(),
-                            photo_back.content_type,
-                        ),
-                    ),
-                    (
-                        "photo_left",
-                        (
-                            photo_left.filename,
-                            await photo_left.read(),
-                            photo_left.content_type,
-                        ),
-                    ),
-                    (
-                        "photo_right",
-                        (
-                            photo_right.filename,
-                            await photo_right.read(),
-                            photo_right.content_type,
-                        ),
-                    ),
-                ]
-
-                # Prepare form data
-                data = {"height": height, "weight": weight}
-
-                # Make the request
-                response = await client.post(
-                    f"{self.base_url}/api/measurements/process",
-                    files=files,
-                    data=data,
-                )
-                response.raise_for_status()
-                return response.json()
+        photos = {
+            "front": photo_front,
+            "back": photo_back,
+            "left": photo_left,
+            "right": photo_right,
+        }
+        files = {
+            view: (photo.filename, await photo.read(), photo.content_type)
+            for view, photo in photos.items()
+        }
+        return await self.process_measurement_files(files, height, weight)
+
+    @timed_ai_call("process_measurements")
+    async def process_measurement_files(
+        self,
+        files: Dict[str, Tuple[str, bytes, Optional[str]]],
+        height: float,
+        weight: float,
+    ) -> Dict[str, Any]:
+        """
+        Send photo contents and measurements to AI service for processing.
 
-            except httpx.HTTPError as e:
-                raise AIServiceError(f"AI service request failed: {str(e)}")
+        Args:
+            files: ``(filename, content, content_type)`` for each of the
+                front, back, left and right views
+            height: User height in cm
+            weight: User weight in kg
 
+        Returns:
+            Dict with measurement results from AI service
+
+        Raises:
+            AIServiceError: If the request fails
+            AIRequestInvalid: If a photo is of a type the frame protocol cannot carry
+            AIServiceUnavailable: If every replica's circuit is open, or
+                (:class:`AIServiceOverloaded`) no concurrency slot frees up in time
+        """
+        if self.wire_protocol == "frame":
+            return await self._process_frame(files, height, weight)
+
+        # Prepare files for upload
+        multipart = [
+            (f"photo_{view}", files[view])
+            for view in ("front", "back", "left", "right")
+        ]
+
+        # Prepare form data
+        data = {"height": height, "weight": weight}
+
+        response = await self._request(
+            "process_measurements",
+            "POST",
+            "/api/measurements/process",
+            idempotent=False,
+            limited=True,
+            files=multipart,
+            data=data,
+        )
+        return response.json()
+
+    async def _process_frame(
+        self,
+        files: Dict[str, Tuple[str, bytes, Optional[str]]],
+        height: float,
+        weight: float,
+    ) -> Dict[str, Any]:
+        """``process_measurement_files`` over the binary frame protocol (see :mod:`services.ai_frames`)."""
+        try:
+            body = encode_process_request(
+                {view: files[view] for view in VIEWS}, height, weight
+            )
+        except FrameError as e:
+            raise AIRequestInvalid(f"Cannot encode photos for the AI service: {e}")
+
+        response = await self._request(
+            "process_measurements",
+            "POST",
+            "/api/measurements/process-frame",
+            idempotent=False,
+            limited=True,
+            content=body,
+            headers={"Content-Type": FRAME_CONTENT_TYPE, "Accept": FRAME_CONTENT_TYPE},
+        )
+        try:
+            return decode_process_response(response.content)
+        except FrameError as e:
+            raise AIServiceError(f"Malformed AI service response: {e}")
+
+    @timed_ai_call("validate_photo")
     async def validate_photo(self, photo: UploadFile) -> Dict[str, Any]:
         """
         Validate a single photo with the AI service.
@@ -129,20 +525,21 @@ class AIClient:
         Raises:
             AIServiceError: If the request fails
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                files = {
-                    "photo": (photo.filename, await photo.read(), photo.content_type)
-                }
-
-                response = await client.post(
-                    f"{self.base_url}/api/measurements/validate", files=files
-                )
-                response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPError as e:
-                raise AIServiceError(f"Photo validation failed: {str(e)}")
+        files = {"photo": (photo.filename, await photo.read(), photo.content_type)}
+        try:
+            response = await self._request(
+                "validate_photo",
+                "POST",
+                "/api/measurements/validate",
+                idempotent=True,
+                limited=True,
+                files=files,
+            )
+        except AIServiceUnavailable:
+            raise
+        except AIServiceError as e:
+            raise AIServiceError(f"Photo validation failed: {str(e)}")
+        return response.json()
 
 
 # Singleton instance
@@ -0,0 +1,218 @@
+"""
+Client-side load balancing across AI service replicas.
+
+:class:`EndpointPool` tracks, per replica, the requests in flight, an
+exponentially weighted moving average (EWMA) of response latency, a
+:class:`~core.resilience.CircuitBreaker`, and the outcome of background
+``/health`` probes. Each call goes to one replica:
+
+- ``p2c`` (power of two choices): two random candidates are compared and the
+  one with the lower ``latency EWMA * (requests in flight + 1)`` wins, which
+  steers load away from slow or busy replicas without herding every worker
+  onto the same "best" one;
+- ``least_outstanding``: the replica with the fewest requests in flight,
+  ties broken by latency.
+
+Failed requests (errors, timeouts, 5xx) count in the EWMA as taking at
+least ``failure_penalty`` seconds, so a replica refusing connections does
+not look like the fastest one. An average above that of unmeasured replicas
+fades with the time since its last update, so a replica avoided after a bad
+spell is tried again instead of starving.
+
+Replicas failing ``AI_UNHEALTHY_THRESHOLD`` consecutive probes are ejected
+until a probe succeeds again. If every replica is ejected the pool falls
+back to all of them (the probes may be what is failing), leaving it to the
+circuit breakers to fail fast. State is per worker process.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import httpx
+
+from core.metrics import AI_ENDPOINT_HEALTHY, AI_ENDPOINT_REQUESTS
+from core.resilience import CircuitBreaker
+
+logger = logging.getLogger("qeyafa.ai")
+
+BALANCING_STRATEGIES = ("p2c", "least_outstanding")
+
+
+class Endpoint:
+    """Load and health of one AI service replica."""
+
+    def __init__(
+        self,
+        url: str,
+        breaker: CircuitBreaker,
+        decay_seconds: float,
+        clock: Callable[[], float],
+    ):
+        self.url = url
+        self.breaker = breaker
+        self.decay_seconds = decay_seconds
+        self.clock = clock
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.healthy = True
+        self.probe_failures = 0
+        self._observed_at = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Fold one response time into the latency EWMA (decaying with the time since the last one)."""
+        now = self.clock()
+        if self.ewma is None:
+            self.ewma = seconds
+        else:
+            weight = math.exp(-(now - self._observed_at) / self.decay_seconds)
+            self.ewma = weight * self.ewma + (1 - weight) * seconds
+        self._observed_at = now
+
+    def cost(self, default_latency: float) -> float:
+        """Expected wait for a new request on this replica."""
+        latency = self.ewma if self.ewma is not None else default_latency
+        if latency > default_latency:
+            # Not picked since a slow or failed response: decay towards an unmeasured replica
+            weight = math.exp(-(self.clock() - self._observed_at) / self.decay_seconds)
+            latency = default_latency + weight * (latency - default_latency)
+        return latency * (self.outstanding + 1)
+
+
+class EndpointPool:
+    """Replicas of the AI service and the policy choosing between them."""
+
+    def __init__(
+        self,
+        urls: List[str],
+        breaker_factory: Callable[[], CircuitBreaker],
+        strategy: str = "p2c",
+        decay_seconds: float = 10.0,
+        failure_penalty: float = 30.0,
+        unhealthy_threshold: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy {strategy!r}")
+        self.strategy = strategy
+        self.failure_penalty = failure_penalty
+        self.unhealthy_threshold = unhealthy_threshold
+        self.endpoints: Dict[str, Endpoint] = {
+            url: Endpoint(url, breaker_factory(), decay_seconds, clock) for url in urls
+        }
+        for url in urls:
+            AI_ENDPOINT_HEALTHY.set(1, endpoint=url)
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self.endpoints)
+
+    def candidates(self) -> List[Endpoint]:
+        """Replicas that may take a call: healthy and not failing fast (all non-failing ones if none is healthy)."""
+        allowed = [
+            endpoint for endpoint in self.endpoints.values() if endpoint.breaker.allow()
+        ]
+        healthy = [endpoint for endpoint in allowed if endpoint.healthy]
+        return healthy or allowed
+
+    def _default_latency(self) -> float:
+        # Unmeasured replicas look faster than the fastest known one, so each gets tried
+        known = [
+            endpoint.ewma
+            for endpoint in self.endpoints.values()
+            if endpoint.ewma is not None
+        ]
+        return min(known) / 2 if known else 0.0
+
+    def pick(
+        self, candidates: List[Endpoint], exclude: Set[str] = frozenset()
+    ) -> Endpoint:
+        """Choose a replica among ``candidates``, avoiding ``exclude`` unless nothing else is left."""
+        fresh = [endpoint for endpoint in candidates if endpoint.url not in exclude]
+        choices = fresh or candidates
+        default = self._default_latency()
+        if self.strategy == "least_outstanding":
+            lowest = min(endpoint.outstanding for endpoint in choices)
+            return min(
+                (endpoint for endpoint in choices if endpoint.outstanding == lowest),
+                key=lambda endpoint: (
+                    endpoint.ewma if endpoint.ewma is not None else default,
+                    random.random(),
+                ),
+            )
+        if len(choices) == 1:
+            return choices[0]
+        first, second = random.sample(choices, 2)
+        return first if first.cost(default) <= second.cost(default) else second
+
+    def acquire(self, endpoint: Endpoint) -> float:
+        """Count a request sent to ``endpoint``; returns its start time for :meth:`release`."""
+        endpoint.outstanding += 1
+        AI_ENDPOINT_REQUESTS.inc(endpoint=endpoint.url)
+        return time.perf_counter()
+
+    def release(self, endpoint: Endpoint, started: float, ok: Optional[bool]) -> None:
+        """
+        End a request and fold its latency into the EWMA.
+
+        Failed requests (``ok`` false) count as taking at least
+        ``failure_penalty``; requests without an outcome (``None``, e.g.
+        cancelled) only stop counting as outstanding.
+        """
+        endpoint.outstanding -= 1
+        if ok is None:
+            return
+        elapsed = time.perf_counter() - started
+        endpoint.observe(elapsed if ok else max(elapsed, self.failure_penalty))
+
+    def record_probe(self, endpoint: Endpoint, ok: bool) -> None:
+        if ok:
+            if not endpoint.healthy:
+                logger.info("AI endpoint %s is healthy again", endpoint.url)
+            endpoint.healthy = True
+            endpoint.probe_failures = 0
+        else:
+            endpoint.probe_failures += 1
+            if endpoint.healthy and endpoint.probe_failures >= self.unhealthy_threshold:
+                logger.warning(
+                    "Ejecting AI endpoint %s after %d failed health checks",
+                    endpoint.url,
+                    endpoint.probe_failures,
+                )
+                endpoint.healthy = False
+        AI_ENDPOINT_HEALTHY.set(1 if endpoint.healthy else 0, endpoint=endpoint.url)
+
+    async def probe(
+        self, timeout: float, transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        """Check ``/health`` of every replica once, concurrently."""
+
+        async def check(client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+            try:
+                response = await client.get(f"{endpoint.url}/health")
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            self.record_probe(endpoint, ok)
+
+        async with httpx.AsyncClient(timeout=timeout, transport=transport) as client:
+            await asyncio.gather(
+                *(check(client, endpoint) for endpoint in self.endpoints.values())
+            )
+
+    async def run_probes(
+        self,
+        interval: float,
+        timeout: float,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """Probe every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                await self.probe(timeout, transport)
+            except Exception:
+                logger.exception("AI endpoint health probe failed")
+            await asyncio.sleep(interval)
@@ -0,0 +1,197 @@
+"""
+Compact binary frames for measurement processing calls to the AI service.
+
+An alternative to multipart form data out and JSON back, used with
+``AI_WIRE_PROTOCOL=frame``: one length-prefixed frame carries the raw image
+bytes and a small typed header, so neither side parses multipart boundaries,
+form strings or JSON. Sent to ``POST /api/measurements/process-frame`` with
+``Content-Type: FRAME_CONTENT_TYPE``; the service answers with a frame when
+the ``Accept`` header asks for one. All integers and floats are big-endian::
+
+    request   "QF" version:u8 type:u8=1 height:f64 weight:f64 count:u8
+              count x (view:u8 content_type:u8 length:u32 bytes[length])
+    response  "QF" version:u8 type:u8=2 status:u8 confidence:f64 count:u8
+              count x (field:u8 value:f64)
+
+``view``, ``content_type``, ``status`` and ``field`` index ``VIEWS``,
+``IMAGE_TYPES``, ``STATUSES`` and ``MEASUREMENT_FIELDS``. The AI service
+decodes the same format in ``measurement_model/frames.py``; the two must
+change together (bump ``FRAME_VERSION``).
+"""
+
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+FRAME_CONTENT_TYPE = "application/vnd.qeyafa.frame"
+FRAME_VERSION = 1
+
+VIEWS = ("front", "back", "left", "right")
+IMAGE_TYPES = ("image/jpeg", "image/png")
+STATUSES = ("success", "error")
+MEASUREMENT_FIELDS = ("chest", "waist", "shoulders", "arm_length", "neck", "hip")
+
+_MAGIC = b"QF"
+_PROCESS_REQUEST = 1
+_PROCESS_RESPONSE = 2
+
+_PREAMBLE = struct.Struct(">2sBB")
+_REQUEST_HEADER = struct.Struct(">ddB")
+_IMAGE_HEADER = struct.Struct(">BBI")
+_RESPONSE_HEADER = struct.Struct(">BdB")
+_MEASUREMENT = struct.Struct(">Bd")
+
+# Aliases clients send for the types in IMAGE_TYPES
+_IMAGE_TYPE_ALIASES = {"image/jpg": "image/jpeg"}
+# Leading bytes of each type in IMAGE_TYPES
+_IMAGE_SIGNATURES = {b"\xff\xd8\xff": "image/jpeg", b"\x89PNG\r\n\x1a\n": "image/png"}
+_IMAGE_EXTENSIONS = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+
+
+class FrameError(ValueError):
+    """Raised for frames (or contents) that do not follow the format."""
+
+    pass
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, layout: struct.Struct) -> Tuple:
+        if self.offset + layout.size > len(self.data):
+            raise FrameError("Truncated frame")
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def take(self, length: int) -> bytes:
+        if self.offset + length > len(self.data):
+            raise FrameError("Truncated frame")
+        chunk = self.data[self.offset : self.offset + length].tobytes()
+        self.offset += length
+        return chunk
+
+    def preamble(self, expected_type: int) -> None:
+        magic, version, message_type = self.unpack(_PREAMBLE)
+        if magic != _MAGIC:
+            raise FrameError("Not a frame")
+        if version != FRAME_VERSION:
+            raise FrameError(f"Unsupported frame version {version}")
+        if message_type != expected_type:
+            raise FrameError(f"Unexpected message type {message_type}")
+
+    def end(self) -> None:
+        if self.offset != len(self.data):
+            raise FrameError("Trailing bytes after frame")
+
+
+def _index(values: Tuple[str, ...], value: str, what: str) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        raise FrameError(f"Unsupported {what} {value!r}")
+
+
+def _lookup(values: Tuple[str, ...], index: int, what: str) -> str:
+    if index >= len(values):
+        raise FrameError(f"Unknown {what} {index}")
+    return values[index]
+
+
+def image_type(
+    filename: Optional[str], content: bytes, content_type: Optional[str]
+) -> str:
+    """
+    The entry of ``IMAGE_TYPES`` for a photo.
+
+    The declared ``content_type`` is used when it is one of them; clients
+    often send ``application/octet-stream`` or nothing, so otherwise the type
+    is recognized from the content's leading bytes, then from the filename
+    extension.
+    """
+    declared = _IMAGE_TYPE_ALIASES.get(content_type, content_type)
+    if declared in IMAGE_TYPES:
+        return declared
+    for signature, sniffed in _IMAGE_SIGNATURES.items():
+        if content.startswith(signature):
+            return sniffed
+    extension = (
+        filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else None
+    )
+    if extension in _IMAGE_EXTENSIONS:
+        return _IMAGE_EXTENSIONS[extension]
+    raise FrameError(f"Unsupported content type {content_type!r}")
+
+
+def encode_process_request(
+    files: Dict[str, Tuple[str, bytes, Optional[str]]], height: float, weight: float
+) -> bytes:
+    """Frame the ``{view: (filename, content, content_type)}`` photos with height and weight."""
+    parts = [
+        _PREAMBLE.pack(_MAGIC, FRAME_VERSION, _PROCESS_REQUEST),
+        _REQUEST_HEADER.pack(height, weight, len(files)),
+    ]
+    for view, (filename, content, content_type) in files.items():
+        parts.append(
+            _IMAGE_HEADER.pack(
+                _index(VIEWS, view, "view"),
+                IMAGE_TYPES.index(image_type(filename, content, content_type)),
+                len(content),
+            )
+        )
+        parts.append(content)
+    return b"".join(parts)
+
+
+def decode_process_request(
+    data: bytes,
+) -> Tuple[Dict[str, Tuple[bytes, str]], float, float]:
+    """``({view: (content, content_type)}, height, weight)`` of a request frame."""
+    reader = _Reader(data)
+    reader.preamble(_PROCESS_REQUEST)
+    height, weight, count = reader.unpack(_REQUEST_HEADER)
+    images = {}
+    for _ in range(count):
+        view, content_type, length = reader.unpack(_IMAGE_HEADER)
+        images[_lookup(VIEWS, view, "view")] = (
+            reader.take(length),
+            _lookup(IMAGE_TYPES, content_type, "content type"),
+        )
+    reader.end()
+    return images, height, weight
+
+
+def encode_process_response(result: Dict[str, Any]) -> bytes:
+    """Frame a processing result shaped like the JSON response (``status``, ``data``)."""
+    data = result.get("data") or {}
+    measurements = data.get("measurements") or {}
+    parts = [
+        _PREAMBLE.pack(_MAGIC, FRAME_VERSION, _PROCESS_RESPONSE),
+        _RESPONSE_HEADER.pack(
+            _index(STATUSES, result.get("status"), "status"),
+            data.get("confidence", 0.0),
+            len(measurements),
+        ),
+    ]
+    for field, value in measurements.items():
+        parts.append(
+            _MEASUREMENT.pack(_index(MEASUREMENT_FIELDS, field, "measurement"), value)
+        )
+    return b"".join(parts)
+
+
+def decode_process_response(data: bytes) -> Dict[str, Any]:
+    """The processing result of a response frame, shaped like the JSON response."""
+    reader = _Reader(data)
+    reader.preamble(_PROCESS_RESPONSE)
+    status, confidence, count = reader.unpack(_RESPONSE_HEADER)
+    measurements = {}
+    for _ in range(count):
+        field, value = reader.unpack(_MEASUREMENT)
+        measurements[_lookup(MEASUREMENT_FIELDS, field, "measurement")] = value
+    reader.end()
+    return {
+        "status": _lookup(STATUSES, status, "status"),
+        "data": {"measurements": measurements, "confidence": confidence},
+    }
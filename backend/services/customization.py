@@ -0,0 +1,190 @@
+"""
+Compiled design customization rules.
+
+``Design.customization_rules`` is validated against
+:class:`schemas.design.CustomizationRules` on write. For evaluation it is
+compiled once into :class:`CompiledRules` - per-option checkers plus the set
+of required options and the defaults - and cached per design and
+``rules_version``, so checking a customer's selection costs one pass over
+the selected options.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+from uuid import UUID
+
+from schemas.design import CustomizationOption, CustomizationRules, OptionType
+
+_MAX_CACHED_DESIGNS = 4096
+
+
+@dataclass(frozen=True)
+class CompiledOption:
+    """Checker for a single option."""
+
+    name: str
+    type: OptionType
+    required: bool
+    default: Any
+    price: float
+    choice_prices: Dict[str, float] = field(default_factory=dict)
+    choices: FrozenSet[str] = frozenset()
+    min: Optional[float] = None
+    max: Optional[float] = None
+    max_length: Optional[int] = None
+
+    def check(self, value: Any) -> Tuple[Any, float]:
+        """Return the normalized value and its surcharge, or raise ``ValueError``."""
+        if self.type == OptionType.CHOICE:
+            if not isinstance(value, str) or value not in self.choices:
+                raise ValueError(f"must be one of {', '.join(sorted(self.choices))}")
+            return value, self.price + self.choice_prices.get(value, 0.0)
+
+        if self.type == OptionType.NUMBER:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("must be a number")
+            if self.min is not None and value < self.min:
+                raise ValueError(f"must be at least {self.min:g}")
+            if self.max is not None and value > self.max:
+                raise ValueError(f"must be at most {self.max:g}")
+            return value, self.price
+
+        if self.type == OptionType.TEXT:
+            if not isinstance(value, str):
+                raise ValueError("must be text")
+            if self.max_length is not None and len(value) > self.max_length:
+                raise ValueError(f"must be at most {self.max_length} characters")
+            return value, self.price if value else 0.0
+
+        if not isinstance(value, bool):
+            raise ValueError("must be true or false")
+        return value, self.price if value else 0.0
+
+
+@dataclass
+class OptionsEvaluation:
+    """Result of :meth:`CompiledRules.evaluate`."""
+
+    errors: List[str]
+    options: Dict[str, Any]
+    surcharge: float
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """A design's options in a form that is cheap to evaluate."""
+
+    options: Dict[str, CompiledOption]
+    required: FrozenSet[str]
+    defaults: Dict[str, Any]
+
+    def evaluate(self, selected: Dict[str, Any]) -> OptionsEvaluation:
+        """Check ``selected`` against the rules, applying defaults for unset options."""
+        errors = []
+        options = dict(self.defaults)
+        surcharge = 0.0
+
+        for name, value in selected.items():
+            option = self.options.get(name)
+            if option is None:
+                errors.append(f"{name}: unknown option")
+                continue
+            if value is None:
+                options.pop(name, None)
+                continue
+            try:
+                options[name], _ = option.check(value)
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+
+        for name in self.required:
+            if name not in options:
+                errors.append(f"{name}: required")
+
+        if not errors:
+            surcharge = sum(
+                self.options[name].check(value)[1] for name, value in options.items()
+            )
+        return OptionsEvaluation(errors=errors, options=options, surcharge=surcharge)
+
+
+def compile_option(name: str, option: CustomizationOption) -> CompiledOption:
+    """Compile one validated option."""
+    return CompiledOption(
+        name=name,
+        type=option.type,
+        required=option.required,
+        default=option.default,
+        price=option.price,
+        choice_prices=dict(option.choice_prices or {}),
+        choices=frozenset(option.choices or ()),
+        min=option.min,
+        max=option.max,
+        max_length=option.max_length,
+    )
+
+
+def compile_rules(rules: Optional[Dict[str, Any]]) -> CompiledRules:
+    """Validate and compile a design's ``customization_rules``."""
+    parsed = CustomizationRules.parse_obj(rules or {})
+    options = {
+        name: compile_option(name, option) for name, option in parsed.options.items()
+    }
+    return CompiledRules(
+        options=options,
+        required=frozenset(
+            name
+            for name, option in options.items()
+            if option.required and option.default is None
+        ),
+        defaults={
+            name: option.default
+            for name, option in options.items()
+            if option.default is not None
+        },
+    )
+
+
+class CompiledRulesCache:
+    """LRU of compiled rules keyed by ``(design_id, rules_version)``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[UUID, int], CompiledRules]" = OrderedDict()
+
+    def get(
+        self,
+        design_id: UUID,
+        rules_version: int,
+        load_rules: Callable[[], Optional[Dict[str, Any]]],
+    ) -> CompiledRules:
+        """Return the compiled rules, calling ``load_rules`` and compiling on a miss."""
+        key = (design_id, rules_version)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+
+        compiled = compile_rules(load_rules())
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton instance
+compiled_rules_cache = CompiledRulesCache(max_entries=_MAX_CACHED_DESIGNS)
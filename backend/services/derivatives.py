@@ -0,0 +1,326 @@
+"""
+Thumbnails of measurement photos and catalog images.
+
+Every image gets a fixed set of derivatives - each size in
+``DERIVATIVE_SIZES`` (longest edge, never upscaled) in each format of
+``DERIVATIVE_FORMATS`` - so list screens never fetch an original. A
+derivative is stored next to its original, ``<original key without
+extension>.<size>.<format>``::
+
+    ab/cd/abcd...ef.jpg  ->  ab/cd/abcd...ef.sm.webp, ab/cd/abcd...ef.md.jpg, ...
+
+Catalog images (designs, categories) given as http(s) URLs are fetched -
+only from hosts in ``CATALOG_IMAGE_HOSTS`` - and their derivatives kept
+under ``catalog/`` by the SHA-256 of the fetched content. Measurement photos
+are always storage keys; URLs in them are neither fetched nor redirected
+to. Images that do not decode, or have more than ``MAX_IMAGE_PIXELS``
+pixels, get no derivatives. As originals are content-addressed, derivatives
+never change and are served with ``IMMUTABLE_CACHE_CONTROL``.
+
+Rendering is CPU-bound, so it runs on a small thread pool
+(:class:`DerivativeWorker`) after the record referencing an image is saved;
+the generated keys are then written next to the original's column
+(``Measurement.image_derivatives``, ``Design.base_image_derivatives``,
+``Category.image_derivatives``).
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import re
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException, status
+from fastapi.responses import RedirectResponse
+from PIL import Image, ImageOps
+
+from core.cache import catalog_cache
+from core.config import settings
+from core.database import SessionLocal
+from crud.measurement import measurements_namespace
+from models.category import Category
+from models.design import Design
+from models.measurement import Measurement
+from services.storage import StorageBackend, storage
+
+logger = logging.getLogger("qeyafa.derivatives")
+
+# Longest edge in pixels
+DERIVATIVE_SIZES = {"sm": 160, "md": 480}
+DERIVATIVE_FORMATS = {"webp": "image/webp", "jpg": "image/jpeg"}
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+MAX_FETCH_SIZE = 10 * 1024 * 1024  # 10MB
+# Larger images are not decoded (a small compressed file can expand to gigabytes)
+MAX_IMAGE_PIXELS = 40_000_000
+# Thumbnails of catalog images given as URLs (there is no stored original)
+CATALOG_PREFIX = "catalog/"
+SIZE_PATTERN = f"^({'|'.join(DERIVATIVE_SIZES)})$"
+FORMAT_PATTERN = f"^({'|'.join(DERIVATIVE_FORMATS)})$"
+
+_DERIVATIVE_KEY = re.compile(
+    rf"\.({'|'.join(DERIVATIVE_SIZES)})\.({'|'.join(DERIVATIVE_FORMATS)})$"
+)
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+# kind -> (model, column holding the original(s), column receiving the derivatives)
+_TARGETS = {
+    "measurement": (Measurement, "image_paths", "image_derivatives"),
+    "design": (Design, "base_image_url", "base_image_derivatives"),
+    "category": (Category, "image_url", "image_derivatives"),
+}
+
+
+def derivative_keys(stem: str) -> Dict[str, Dict[str, str]]:
+    """``{size: {format: key}}`` of the derivatives of the original at ``stem``."""
+    return {
+        size: {fmt: f"{stem}.{size}.{fmt}" for fmt in DERIVATIVE_FORMATS}
+        for size in DERIVATIVE_SIZES
+    }
+
+
+def derivatives_of(key: str) -> Dict[str, Dict[str, str]]:
+    """Derivative keys of the stored original ``key``."""
+    return derivative_keys(key.rsplit(".", 1)[0])
+
+
+def is_derivative_key(key: str) -> bool:
+    """Whether ``key`` names a derivative rather than an original."""
+    return bool(_DERIVATIVE_KEY.search(key))
+
+
+def is_url(source: str) -> bool:
+    """Whether an image reference is an http(s) URL rather than a storage key."""
+    return source.startswith(("http://", "https://"))
+
+
+def is_allowed_image_url(url: str) -> bool:
+    """Whether ``url`` is on a host in ``CATALOG_IMAGE_HOSTS``, so it may be fetched or redirected to."""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return False
+    return (
+        is_url(url)
+        and host is not None
+        and host.lower() in settings.CATALOG_IMAGE_HOSTS
+    )
+
+
+def render(content: bytes) -> Dict[Tuple[str, str], bytes]:
+    """
+    Encode every ``(size, format)`` derivative of the image ``content``.
+
+    Raises ``PIL.UnidentifiedImageError`` (an ``OSError``) for content that
+    is not an image and ``PIL.Image.DecompressionBombError`` for images over
+    ``MAX_IMAGE_PIXELS``, before anything is decoded.
+    """
+    largest = max(DERIVATIVE_SIZES.values())
+    rendered = {}
+    with Image.open(io.BytesIO(content)) as original:
+        width, height = original.size
+        if width * height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"{width}x{height} image exceeds {MAX_IMAGE_PIXELS} pixels"
+            )
+        # Lets the JPEG decoder downscale by up to 8x while decoding
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    # Largest first, so each size is resized from the previous one
+    for size, edge in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        for fmt in DERIVATIVE_FORMATS:
+            buffer = io.BytesIO()
+            image.save(buffer, **_SAVE_OPTIONS[fmt])
+            rendered[(size, fmt)] = buffer.getvalue()
+    return rendered
+
+
+def image_response(
+    source: str,
+    derivatives: Optional[Dict[str, Dict[str, str]]],
+    size: Optional[str],
+    fmt: str,
+    allow_urls: bool = False,
+) -> RedirectResponse:
+    """
+    Redirect to image ``source``, or to its ``size``/``fmt`` derivative.
+
+    Stored images are reached through short-lived signed URLs; the redirect
+    itself may be cached for half their lifetime, so repeat views hit the
+    browser cache of the (immutable) target. A ``source`` URL is redirected
+    to only with ``allow_urls`` (catalog images) and when its host is
+    allowed; otherwise the image is not found.
+    """
+    if size is None:
+        key = source
+    else:
+        key = (derivatives or {}).get(size, {}).get(fmt)
+        if key is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Thumbnail not generated yet",
+            )
+
+    if is_url(key) and not (allow_urls and is_allowed_image_url(key)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
+        )
+    expires_in = settings.STORAGE_PRESIGN_EXPIRES_SECONDS
+    url = key if is_url(key) else storage.presign_get(key, expires_in)
+    return RedirectResponse(
+        url,
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": f"private, max-age={expires_in // 2}"},
+    )
+
+
+async def _one_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+class DerivativeWorker:
+    """Thread pool generating derivatives after uploads."""
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        workers: int,
+        enabled: bool = True,
+        session_factory=SessionLocal,
+    ):
+        self.storage = storage
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="derivatives"
+        )
+
+    def submit(self, kind: str, record_id) -> Optional[Future]:
+        """Generate derivatives for the image(s) of record ``record_id`` in the background."""
+        if not self.enabled:
+            return None
+        return self._pool.submit(self._run, kind, str(record_id))
+
+    def _run(self, kind: str, record_id: str) -> None:
+        try:
+            asyncio.run(self.process(kind, record_id))
+        except Exception:
+            logger.exception("Generating derivatives for %s %s failed", kind, record_id)
+
+    async def _fetch(self, url: str) -> bytes:
+        # Redirects are not followed: they could lead off the allowed hosts
+        async with httpx.AsyncClient(timeout=10.0, follow_redirects=False) as client:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                content = bytearray()
+                async for chunk in response.aiter_bytes():
+                    content += chunk
+                    if len(content) > MAX_FETCH_SIZE:
+                        raise ValueError(f"{url} is larger than {MAX_FETCH_SIZE} bytes")
+        return bytes(content)
+
+    async def _read(self, key: str) -> bytes:
+        return b"".join([chunk async for chunk in self.storage.get(key)])
+
+    async def generate(
+        self, source: str, fetch_urls: bool = False
+    ) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Derivative keys of ``source`` (a storage key or http(s) URL), creating missing ones.
+
+        URLs are fetched only with ``fetch_urls`` (catalog images) and from
+        allowed hosts. Returns ``None`` for stored originals that do not
+        exist, URLs that may not be fetched and content that cannot be
+        rendered. Rendering blocks the calling thread; call this from the
+        worker pool.
+        """
+        content = None
+        if is_url(source):
+            if not (fetch_urls and is_allowed_image_url(source)):
+                logger.warning(
+                    "Not fetching image from %s: host not in CATALOG_IMAGE_HOSTS",
+                    urlsplit(source).netloc,
+                )
+                return None
+            content = await self._fetch(source)
+            digest = hashlib.sha256(content).hexdigest()
+            keys = derivative_keys(
+                f"{CATALOG_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}"
+            )
+        elif await self.storage.stat(source) is None:
+            return None
+        else:
+            keys = derivatives_of(source)
+
+        missing = [
+            (size, fmt)
+            for size, formats in keys.items()
+            for fmt, key in formats.items()
+            if await self.storage.stat(key) is None
+        ]
+        if missing:
+            if content is None:
+                content = await self._read(source)
+            try:
+                rendered = render(content)
+            except (Image.DecompressionBombError, OSError) as e:
+                # Not an image, truncated, or too large; one line, no traceback
+                logger.warning("No derivatives for %s: %s", source, e)
+                return None
+            for size, fmt in missing:
+                await self.storage.put(
+                    keys[size][fmt],
+                    _one_chunk(rendered[(size, fmt)]),
+                    content_type=DERIVATIVE_FORMATS[fmt],
+                    cache_control=IMMUTABLE_CACHE_CONTROL,
+                )
+        return keys
+
+    async def process(self, kind: str, record_id: str) -> None:
+        """Generate the derivatives of one record's image(s) and record them on it."""
+        model, source_column, target_column = _TARGETS[kind]
+        with self.session_factory() as db:
+            record = db.get(model, uuid.UUID(record_id))
+            if record is None:
+                return
+            sources = getattr(record, source_column)
+        # No connection is held while images are fetched and rendered
+        if not sources:
+            derivatives = None
+        elif kind == "measurement":
+            derivatives = {}
+            for view, key in sources.items():
+                keys = await self.generate(key)
+                if keys is not None:
+                    derivatives[view] = keys
+        else:
+            derivatives = await self.generate(sources, fetch_urls=True)
+
+        with self.session_factory() as db:
+            record = db.get(model, uuid.UUID(record_id))
+            # A newer job handles images that were replaced meanwhile
+            if record is None or getattr(record, source_column) != sources:
+                return
+            setattr(record, target_column, derivatives)
+            db.commit()
+            namespace = (
+                measurements_namespace(record.user_id)
+                if kind == "measurement"
+                else f"{kind}s"
+            )
+        catalog_cache.invalidate(namespace)
+
+
+# Singleton instance
+derivative_worker = DerivativeWorker(
+    storage, settings.DERIVATIVE_WORKERS, enabled=settings.DERIVATIVES_ENABLED
+)
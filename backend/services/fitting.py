@@ -0,0 +1,83 @@
+"""
+Size-chart compilation for the fitting engine.
+
+Designers describe sizes under ``customization_rules["sizes"]``, mapping
+each size name to measurement ranges in cm, for example::
+
+    {"sizes": {"M": {"chest": [96, 102], "waist": {"min": 80, "max": 86}},
+               "L": {"chest": [102, 108], "hip": [null, 112]}}}
+
+A range is ``[min, max]`` or ``{"min": ..., "max": ...}``; either bound may
+be omitted or ``null`` for an open end. :func:`compile_size_ranges` turns
+this into one flat row per size (``<field>_min``/``<field>_max`` columns)
+for the ``design_size_ranges`` table, so that matching a measurement against
+every design is a single comparison over that table.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.measurement import MeasurementResult
+
+# Measurements a size can constrain (the typed measurement columns)
+FIT_FIELDS = list(MeasurementResult.__fields__)
+
+MAX_SIZE_NAME_LENGTH = 32
+
+
+def _bound(value: Any, size: str, field: str) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"size '{size}': {field} bounds must be numbers")
+    return float(value)
+
+
+def _bounds(
+    ranges: Any, size: str, field: str
+) -> Tuple[Optional[float], Optional[float]]:
+    if isinstance(ranges, (list, tuple)) and len(ranges) == 2:
+        low, high = ranges
+    elif isinstance(ranges, dict) and set(ranges) <= {"min", "max"}:
+        low, high = ranges.get("min"), ranges.get("max")
+    else:
+        raise ValueError(
+            f'size \'{size}\': {field} must be [min, max] or {{"min": ..., "max": ...}}'
+        )
+
+    low, high = _bound(low, size, field), _bound(high, size, field)
+    if low is not None and high is not None and low > high:
+        raise ValueError(f"size '{size}': {field} minimum is greater than its maximum")
+    return low, high
+
+
+def compile_size_ranges(rules: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compile ``rules["sizes"]`` into ``design_size_ranges`` rows (without ``design_id``).
+
+    Sizes keep their declared order in ``position``. Raises ``ValueError``
+    describing the first problem if the size chart is malformed.
+    """
+    sizes = (rules or {}).get("sizes")
+    if sizes is None:
+        return []
+    if not isinstance(sizes, dict):
+        raise ValueError("sizes must map size names to measurement ranges")
+
+    rows = []
+    for position, (size, ranges) in enumerate(sizes.items()):
+        if not size or len(size) > MAX_SIZE_NAME_LENGTH:
+            raise ValueError(f"size names must be 1-{MAX_SIZE_NAME_LENGTH} characters")
+        if not isinstance(ranges, dict) or not ranges:
+            raise ValueError(
+                f"size '{size}' must map at least one measurement to a range"
+            )
+
+        row: Dict[str, Any] = {"size": size, "position": position}
+        for field, bounds in ranges.items():
+            if field not in FIT_FIELDS:
+                raise ValueError(
+                    f"size '{size}': unknown measurement '{field}' (expected one of {', '.join(FIT_FIELDS)})"
+                )
+            row[f"{field}_min"], row[f"{field}_max"] = _bounds(bounds, size, field)
+        rows.append(row)
+    return rows
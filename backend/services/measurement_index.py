@@ -0,0 +1,282 @@
+"""
+In-memory nearest-neighbour index over customer body measurements.
+
+Each customer is represented by their latest complete measurement (the six
+typed columns on ``measurements``), standardized per dimension and stored in
+a KD-tree. Between full rebuilds, customers with rows inserted or updated
+since the previous refresh (``updated_at``) are re-read into a small delta
+set that is searched by brute force; a customer in the delta hides their
+older entry in the tree, or drops out if they no longer have a complete
+measurement.
+
+The index lives in each worker process and is refreshed lazily by the
+request that uses it. Deletions leave no trace to refresh from, so
+:meth:`MeasurementIndex.search` checks its candidates against the database
+before answering.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from scipy.spatial import cKDTree
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from crud.measurement import MEASUREMENT_FIELDS
+from models.measurement import Measurement
+
+# Rows committed slightly out of updated_at order are still picked up
+_REFRESH_OVERLAP = timedelta(seconds=5)
+
+# Extra candidates searched for each request, covering neighbours deleted since the last refresh
+_VERIFY_MARGIN = 5
+
+
+@dataclass
+class _Snapshot:
+    """Immutable state of a full build."""
+
+    tree: Optional[cKDTree]
+    user_ids: List[UUID]
+    vectors: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    built_at: float
+    # user_id -> raw vector of customers changed since the build (None: no complete measurement left)
+    delta: Dict[UUID, Optional[np.ndarray]] = field(default_factory=dict)
+
+
+@dataclass
+class Neighbour:
+    """One search result."""
+
+    user_id: UUID
+    distance: float
+    values: Dict[str, float]
+
+
+class MeasurementIndex:
+    """KD-tree over each customer's latest measurement vector."""
+
+    def __init__(
+        self,
+        refresh_interval: float,
+        rebuild_interval: float,
+        max_delta: int = 1024,
+    ):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_delta = max_delta
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        # Latest updated_at seen by a build or refresh
+        self._watermark: Optional[datetime] = None
+
+    @staticmethod
+    def _columns():
+        return [getattr(Measurement, name) for name in MEASUREMENT_FIELDS]
+
+    @classmethod
+    def _latest(cls, *criteria):
+        """Each matching customer's latest complete measurement, as ``(user_id, *values)``."""
+        return (
+            select(Measurement.user_id, *cls._columns())
+            .where(*[column.isnot(None) for column in cls._columns()], *criteria)
+            .distinct(Measurement.user_id)
+            .order_by(Measurement.user_id, Measurement.processed_at.desc())
+        )
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the tree from every customer's latest complete measurement."""
+        # Read before the rows, so changes made during the build are picked up by the next refresh
+        watermark = db.scalar(select(func.max(Measurement.updated_at)))
+        rows = db.execute(self._latest()).all()
+
+        user_ids = [row[0] for row in rows]
+        raw = np.array([row[1:] for row in rows], dtype=np.float64).reshape(
+            -1, len(MEASUREMENT_FIELDS)
+        )
+        if len(rows):
+            mean = raw.mean(axis=0)
+            std = raw.std(axis=0)
+            std[std == 0] = 1.0
+        else:
+            mean = np.zeros(len(MEASUREMENT_FIELDS))
+            std = np.ones(len(MEASUREMENT_FIELDS))
+
+        scaled = (raw - mean) / std
+        snapshot = _Snapshot(
+            tree=cKDTree(scaled) if len(rows) else None,
+            user_ids=user_ids,
+            vectors=raw,
+            mean=mean,
+            std=std,
+            built_at=time.monotonic(),
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = snapshot.built_at
+            self._watermark = watermark
+
+    def refresh(self, db: Session) -> None:
+        """
+        Bring the index up to date if ``refresh_interval`` has passed.
+
+        Re-reads the latest complete measurement of every customer with rows
+        inserted or updated since the previous refresh into the delta, and
+        rebuilds when the delta grows past ``max_delta`` or
+        ``rebuild_interval`` elapses.
+        """
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot
+            watermark = self._watermark
+            if snapshot is not None and now - self._checked_at < self.refresh_interval:
+                return
+            self._checked_at = now
+
+        if snapshot is None or now - snapshot.built_at >= self.rebuild_interval:
+            self.rebuild(db)
+            return
+
+        changes = select(Measurement.user_id, Measurement.updated_at)
+        if watermark is not None:
+            changes = changes.where(
+                Measurement.updated_at > watermark - _REFRESH_OVERLAP
+            )
+        changed = db.execute(changes).all()
+        if not changed:
+            return
+        user_ids = {row[0] for row in changed}
+        latest = {
+            row[0]: np.array(row[1:], dtype=np.float64)
+            for row in db.execute(self._latest(Measurement.user_id.in_(user_ids)))
+        }
+
+        with self._lock:
+            if self._snapshot is not snapshot:
+                # Rebuilt meanwhile; the new build has these rows
+                return
+            for user_id in user_ids:
+                snapshot.delta[user_id] = latest.get(user_id)
+            self._watermark = max(
+                [row[1] for row in changed]
+                + ([watermark] if watermark is not None else [])
+            )
+            too_large = len(snapshot.delta) > self.max_delta
+
+        if too_large:
+            self.rebuild(db)
+
+    def query(
+        self,
+        values: Sequence[float],
+        k: int,
+        exclude_user_id: Optional[UUID] = None,
+    ) -> List[Neighbour]:
+        """Return up to ``k`` customers whose latest measurement is closest to ``values``."""
+        with self._lock:
+            snapshot = self._snapshot
+            delta = dict(snapshot.delta) if snapshot is not None else {}
+        if snapshot is None:
+            return []
+
+        target = (np.asarray(values, dtype=np.float64) - snapshot.mean) / snapshot.std
+        candidates: List[Tuple[float, UUID, np.ndarray]] = []
+
+        if snapshot.tree is not None:
+            # Over-fetch to cover entries hidden by the delta or excluded
+            fetch = min(k + len(delta) + 1, len(snapshot.user_ids))
+            distances, positions = snapshot.tree.query(target, k=fetch)
+            for distance, position in zip(
+                np.atleast_1d(distances), np.atleast_1d(positions)
+            ):
+                user_id = snapshot.user_ids[position]
+                if user_id in delta or user_id == exclude_user_id:
+                    continue
+                candidates.append(
+                    (float(distance), user_id, snapshot.vectors[position])
+                )
+
+        if delta:
+            delta_users = [
+                user_id
+                for user_id, vector in delta.items()
+                if vector is not None and user_id != exclude_user_id
+            ]
+            if delta_users:
+                raw = np.stack([delta[user_id] for user_id in delta_users])
+                distances = np.linalg.norm(
+                    (raw - snapshot.mean) / snapshot.std - target, axis=1
+                )
+                candidates.extend(zip(distances.tolist(), delta_users, raw))
+
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [
+            Neighbour(
+                user_id=user_id,
+                distance=distance,
+                values=dict(zip(MEASUREMENT_FIELDS, vector.tolist())),
+            )
+            for distance, user_id, vector in candidates[:k]
+        ]
+
+    def search(
+        self,
+        db: Session,
+        values: Sequence[float],
+        k: int,
+        exclude_user_id: Optional[UUID] = None,
+    ) -> List[Neighbour]:
+        """
+        Like :meth:`query`, after a :meth:`refresh`, with the candidates checked against the database.
+
+        Customers whose measurements were deleted since the last refresh
+        (possibly through another worker) are dropped, and distances use the
+        current values.
+        """
+        self.refresh(db)
+        with self._lock:
+            snapshot = self._snapshot
+        neighbours = self.query(values, k + _VERIFY_MARGIN, exclude_user_id)
+        if not neighbours:
+            return []
+
+        current = {
+            row[0]: np.array(row[1:], dtype=np.float64)
+            for row in db.execute(
+                self._latest(Measurement.user_id.in_([n.user_id for n in neighbours]))
+            )
+        }
+        target = (np.asarray(values, dtype=np.float64) - snapshot.mean) / snapshot.std
+        results = []
+        for neighbour in neighbours:
+            vector = current.get(neighbour.user_id)
+            if vector is None:
+                continue
+            results.append(
+                Neighbour(
+                    user_id=neighbour.user_id,
+                    distance=float(
+                        np.linalg.norm((vector - snapshot.mean) / snapshot.std - target)
+                    ),
+                    values=dict(zip(MEASUREMENT_FIELDS, vector.tolist())),
+                )
+            )
+        results.sort(key=lambda neighbour: neighbour.distance)
+        return results[:k]
+
+
+# Singleton instance
+measurement_index = MeasurementIndex(
+    refresh_interval=settings.SIMILARITY_REFRESH_SECONDS,
+    rebuild_interval=settings.SIMILARITY_REBUILD_SECONDS,
+)
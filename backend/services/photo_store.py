@@ -0,0 +1,381 @@
+"""
+Content-addressed storage for uploaded photos.
+
+A photo is stored once, under the SHA-256 of its bytes, in a two-level
+sharded key space of the storage backend (see :mod:`services.storage`)::
+
+    ab/cd/abcd0123...ef.jpg
+
+so re-uploading the same photo reuses the existing object and no directory
+holds more than a few thousand entries. ``Measurement.image_paths`` stores
+these keys; a photo is live while any record references it, and
+:meth:`PhotoStore.collect_garbage` removes the rest once they are older than
+a grace period (uploads not yet attached to a measurement are young),
+together with their thumbnails (see :mod:`services.derivatives`).
+
+Clients can also upload straight to storage: :meth:`PhotoStore.presign_upload`
+hands out a URL bound to the photo's SHA-256, and :meth:`PhotoStore.load`
+later re-checks the object against the digest in its key before it is used.
+
+Keys from before content addressing (``<user_id>/<uuid>.<ext>``) are still
+read, and collected like blobs once nothing references them.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import AsyncIterable, AsyncIterator, List, Optional, Sequence, Set, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import cast, select
+from sqlalchemy.dialects.postgresql import JSONPATH
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.category import Category
+from models.design import Design
+from models.measurement import Measurement
+from services.derivatives import CATALOG_PREFIX, derivatives_of, is_derivative_key
+from services.storage import (
+    CHUNK_SIZE,
+    ObjectInfo,
+    PresignedUpload,
+    StorageBackend,
+    storage,
+)
+
+logger = logging.getLogger("qeyafa.photos")
+
+MAX_PHOTO_SIZE = 10 * 1024 * 1024  # 10MB
+
+_EXTENSION_ALIASES = {"jpeg": "jpg"}
+CONTENT_TYPE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png"}
+# Upload tokens outlive the URLs they were issued with by this much, so /finalize can follow a late upload
+UPLOAD_TOKEN_GRACE = timedelta(minutes=30)
+# Resumable uploads in progress (see services.resumable_uploads); not photos
+STAGING_PREFIX = "staging/"
+_BLOB_PATH = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$")
+# File name of a legacy upload, ``<user_id>/<name>.<ext>``
+_LEGACY_NAME = re.compile(r"^[\w-]+\.[a-z0-9]+$")
+
+
+class PhotoTooLarge(Exception):
+    """Raised when an upload exceeds the store's size limit."""
+
+    pass
+
+
+class PhotoMissing(Exception):
+    """Raised when a photo that should have been uploaded is not in storage."""
+
+    pass
+
+
+class PhotoChecksumMismatch(Exception):
+    """Raised when a stored photo's content does not match the SHA-256 in its key."""
+
+    pass
+
+
+def blob_path(digest: str, extension: str) -> str:
+    """Relative path of the blob with SHA-256 ``digest``."""
+    extension = extension.lower()
+    extension = _EXTENSION_ALIASES.get(extension, extension)
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def is_blob_path(path: str) -> bool:
+    """Whether ``path`` names a content-addressed blob (as opposed to a legacy upload)."""
+    return bool(_BLOB_PATH.match(path))
+
+
+def min_grace_seconds() -> float:
+    """
+    Shortest safe garbage-collection grace period: the longest an upload token stays valid.
+
+    A photo uploaded for a token is not referenced until ``/finalize``, which
+    may come this long after the upload started.
+    """
+    longest = max(
+        settings.STORAGE_PRESIGN_EXPIRES_SECONDS,
+        settings.UPLOAD_STAGING_EXPIRES_SECONDS,
+    )
+    return longest + UPLOAD_TOKEN_GRACE.total_seconds()
+
+
+def is_user_photo_path(path: str, user_id) -> bool:
+    """Whether a measurement of ``user_id`` may reference ``path``: a blob, or one of their legacy uploads."""
+    if is_blob_path(path):
+        return True
+    owner, _, name = path.partition("/")
+    return owner == str(user_id) and bool(_LEGACY_NAME.match(name))
+
+
+@dataclass
+class GarbageReport:
+    """Result of :meth:`PhotoStore.collect_garbage`."""
+
+    scanned: int = 0
+    referenced: int = 0
+    # Unreferenced but younger than the grace period
+    recent: int = 0
+    removed: List[str] = field(default_factory=list)
+    bytes_removed: int = 0
+    legacy_removed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+
+class PhotoStore:
+    """Deduplicating photo store on top of a storage backend."""
+
+    def __init__(self, storage: StorageBackend, max_size: int = MAX_PHOTO_SIZE):
+        self.storage = storage
+        self.max_size = max_size
+
+    async def _chunks(self, file: UploadFile) -> AsyncIterator[bytes]:
+        while chunk := await file.read(CHUNK_SIZE):
+            yield chunk
+
+    async def save(self, file: UploadFile) -> str:
+        """
+        Store an upload and return its key.
+
+        The upload is hashed in one streaming pass and written to the backend
+        in a second - or not at all, if the blob already exists. Raises
+        :class:`PhotoTooLarge` past ``max_size``. The upload is rewound
+        afterwards so it can be read again (e.g. forwarded to the AI service).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async for chunk in self._chunks(file):
+                size += len(chunk)
+                if size > self.max_size:
+                    raise PhotoTooLarge(
+                        f"{file.filename} is larger than {self.max_size / (1024 * 1024):g}MB"
+                    )
+                digest.update(chunk)
+
+            async def rewound():
+                await file.seek(0)
+                async for chunk in self._chunks(file):
+                    yield chunk
+
+            key = blob_path(digest.hexdigest(), file.filename.rsplit(".", 1)[1])
+            await self.save_verified(key, rewound(), file.content_type)
+        finally:
+            await file.seek(0)
+        return key
+
+    async def save_verified(
+        self, key: str, chunks: AsyncIterable[bytes], content_type: Optional[str]
+    ) -> None:
+        """
+        Store ``chunks`` under ``key``, whose digest the caller has already checked.
+
+        ``chunks`` is not consumed if the blob already exists.
+        """
+        if await self.storage.stat(key) is not None:
+            # Restart the garbage collector's grace period
+            await self.storage.touch(key)
+        else:
+            await self.storage.put(key, chunks, content_type=content_type)
+
+    async def presign_upload(
+        self, sha256: str, content_type: str, expires_in: int
+    ) -> Tuple[str, Optional[PresignedUpload]]:
+        """
+        Key for a photo the client will upload itself, and where to upload it.
+
+        The upload is bound to ``sha256`` and ``content_type``, so storage
+        rejects any other content. Returns ``None`` instead of an upload when
+        the blob already exists; there is nothing to send then.
+        """
+        key = blob_path(sha256, CONTENT_TYPE_EXTENSIONS[content_type])
+        if await self.storage.stat(key) is not None:
+            await self.storage.touch(key)
+            return key, None
+        return key, self.storage.presign_put(
+            key, expires_in, content_type=content_type, sha256=sha256
+        )
+
+    async def load(self, key: str) -> bytes:
+        """
+        Content of blob ``key``, verified against the digest in the key.
+
+        Raises :class:`PhotoMissing`, :class:`PhotoTooLarge` or
+        :class:`PhotoChecksumMismatch`; a blob that fails either check is
+        deleted, since nothing can legitimately reference it.
+        """
+        if not is_blob_path(key):
+            raise PhotoMissing(f"{key} is not a photo key")
+        info = await self.storage.stat(key)
+        if info is None:
+            raise PhotoMissing(f"{key} has not been uploaded")
+
+        expected = key.rsplit("/", 1)[1].split(".", 1)[0]
+        if info.size > self.max_size:
+            await self.storage.delete(key)
+            raise PhotoTooLarge(
+                f"{key} is larger than {self.max_size / (1024 * 1024):g}MB"
+            )
+        if info.sha256 is not None and info.sha256 != expected:
+            await self.storage.delete(key)
+            raise PhotoChecksumMismatch(f"{key} does not match its checksum")
+
+        digest = hashlib.sha256()
+        chunks = []
+        async for chunk in self.storage.get(key):
+            digest.update(chunk)
+            chunks.append(chunk)
+        if digest.hexdigest() != expected:
+            await self.storage.delete(key)
+            raise PhotoChecksumMismatch(f"{key} does not match its checksum")
+        return b"".join(chunks)
+
+    async def iter_originals(self) -> AsyncIterator[ObjectInfo]:
+        """Every stored original - blobs, legacy uploads and catalog images - without thumbnails or staged uploads."""
+        async for info in self.storage.list():
+            if (
+                not is_derivative_key(info.key)
+                and not info.key.startswith(CATALOG_PREFIX)
+                and not info.key.startswith(STAGING_PREFIX)
+            ):
+                yield info
+
+    @staticmethod
+    def referenced_keys(db: Session, keys: Sequence[str]) -> Set[str]:
+        """
+        The subset of ``keys`` some record points at.
+
+        Measurements are matched with one jsonpath predicate over
+        ``image_paths`` (``$.* == "k1" || $.* == "k2" ...``), which the GIN
+        index ``ix_measurements_image_paths`` answers without scanning the
+        table; design and category images are plain column lookups.
+        """
+        if not keys:
+            return set()
+        wanted = set(keys)
+        predicate = " || ".join(f"$.* == {json.dumps(key)}" for key in keys)
+        referenced = set()
+        for (image_paths,) in db.execute(
+            select(Measurement.image_paths).where(
+                Measurement.image_paths.op("@@")(cast(predicate, JSONPATH))
+            )
+        ):
+            referenced.update(wanted.intersection(image_paths.values()))
+        referenced.update(
+            db.scalars(
+                select(Design.base_image_url).where(Design.base_image_url.in_(keys))
+            )
+        )
+        referenced.update(
+            db.scalars(select(Category.image_url).where(Category.image_url.in_(keys)))
+        )
+        return referenced
+
+    async def _remove(self, key: str) -> None:
+        await self.storage.delete(key)
+        for formats in derivatives_of(key).values():
+            for derivative in formats.values():
+                await self.storage.delete(derivative)
+
+    async def collect_garbage(
+        self,
+        db: Session,
+        grace_seconds: float,
+        dry_run: bool = False,
+        batch_size: int = 500,
+        max_deletes_per_second: Optional[float] = None,
+    ) -> GarbageReport:
+        """
+        Remove stored photos no record references, with their thumbnails.
+
+        Covers content-addressed blobs and legacy uploads alike - photos from
+        ``/upload`` that were never attached to a measurement, or saved by a
+        ``/process`` call that then failed. Objects younger than
+        ``grace_seconds`` are kept; it should be at least
+        :func:`min_grace_seconds`, or photos waiting for ``/finalize`` are
+        lost. The store is scanned in batches of ``batch_size``, each checked
+        with one :meth:`referenced_keys` query; each candidate is stat'ed
+        again right before it is deleted, since a re-upload of the same photo
+        touches it meanwhile. ``max_deletes_per_second`` spaces out the
+        deletions so the storage backend is not flooded.
+        """
+        started = time.monotonic()
+        cutoff = time.time() - grace_seconds
+        report = GarbageReport()
+
+        async def sweep(batch: List[ObjectInfo]) -> None:
+            batch_started = time.monotonic()
+            referenced = self.referenced_keys(db, [info.key for info in batch])
+            deleted = 0
+            for info in batch:
+                if info.key in referenced:
+                    report.referenced += 1
+                    continue
+                if info.modified > cutoff:
+                    report.recent += 1
+                    continue
+                # The listing may be minutes old; a re-upload since then touched the photo
+                current = await self.storage.stat(info.key)
+                if current is None:
+                    continue
+                if current.modified > cutoff:
+                    report.recent += 1
+                    continue
+                if not dry_run:
+                    await self._remove(info.key)
+                    deleted += 1
+                report.removed.append(info.key)
+                report.bytes_removed += info.size
+                if not is_blob_path(info.key):
+                    report.legacy_removed += 1
+            report.batches += 1
+            logger.info(
+                "Garbage batch %d: %d scanned, %d removed, %.1f MB reclaimed so far",
+                report.batches,
+                len(batch),
+                deleted,
+                report.bytes_removed / (1024 * 1024),
+            )
+            if max_deletes_per_second and deleted:
+                pause = deleted / max_deletes_per_second - (
+                    time.monotonic() - batch_started
+                )
+                if pause > 0:
+                    await asyncio.sleep(pause)
+
+        batch: List[ObjectInfo] = []
+        async for info in self.iter_originals():
+            report.scanned += 1
+            batch.append(info)
+            if len(batch) >= batch_size:
+                await sweep(batch)
+                batch = []
+        if batch:
+            await sweep(batch)
+
+        if not dry_run:
+            # Leftovers from interrupted uploads
+            await self.storage.purge_incomplete(cutoff)
+        report.seconds = time.monotonic() - started
+        logger.info(
+            "Garbage collection %s %d of %d photos, %d bytes, in %.1fs",
+            "would remove" if dry_run else "removed",
+            len(report.removed),
+            report.scanned,
+            report.bytes_removed,
+            report.seconds,
+        )
+        return report
+
+
+# Singleton instance
+photo_store = PhotoStore(storage)
@@ -0,0 +1,314 @@
+"""
+Resumable photo uploads for clients on unreliable connections.
+
+A simple chunk/offset protocol modelled on tus: the client declares the
+photo's SHA-256, size and content type up front, then appends bytes with
+``PATCH`` requests carrying the offset they start at. Whatever arrives is
+kept, even when the connection drops mid-request, so after a failure the
+client asks for the current offset (``HEAD``) and sends only the rest.
+
+Partial uploads are staged in the storage backend itself, below
+``staging/<id>/``: a ``session.json`` plus one ``<offset>.part`` object per
+``PATCH``, named after the offset it starts at. Any API worker can therefore
+serve any request of an upload, with no shared disk or sticky routing. The
+current offset is the end of the chain of parts starting at 0; two requests
+racing at the same offset write the same part key, and the SHA-256 check at
+the end rejects anything inconsistent. Once the last byte arrives the parts
+are verified and copied into the photo store. Sessions expire after
+``UPLOAD_STAGING_EXPIRES_SECONDS``; :meth:`ResumableUploads.purge_expired`
+removes them.
+"""
+
+import dataclasses
+import hashlib
+import json
+import re
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional
+
+from core.config import settings
+from services.photo_store import (
+    CONTENT_TYPE_EXTENSIONS,
+    STAGING_PREFIX,
+    PhotoChecksumMismatch,
+    PhotoStore,
+    blob_path,
+    photo_store,
+)
+from services.storage import ObjectInfo
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_SESSION = "session.json"
+_PART = re.compile(r"^(\d{12})\.part$")
+
+
+async def _once(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+class UploadNotFound(Exception):
+    """Raised for unknown, expired or foreign upload sessions."""
+
+    pass
+
+
+class UploadOffsetMismatch(Exception):
+    """Raised when a chunk does not start where the upload currently ends."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadBusy(Exception):
+    """Raised when another request finished or cancelled the upload while this one was appending."""
+
+    pass
+
+
+class UploadLengthExceeded(Exception):
+    """Raised when a chunk runs past the declared upload size."""
+
+    pass
+
+
+@dataclass
+class UploadSession:
+    """State of one resumable upload."""
+
+    id: str
+    user_id: str
+    key: str
+    sha256: str
+    size: int
+    content_type: str
+    expires_at: float
+    offset: int = 0
+    complete: bool = False
+
+
+class ResumableUploads:
+    """Staging area for resumable uploads that end up in a :class:`PhotoStore`."""
+
+    def __init__(self, store: PhotoStore, expires_seconds: int):
+        self.store = store
+        self.expires_seconds = expires_seconds
+
+    @property
+    def storage(self):
+        return self.store.storage
+
+    @staticmethod
+    def _prefix(upload_id: str) -> str:
+        return f"{STAGING_PREFIX}{upload_id}/"
+
+    def _session_key(self, upload_id: str) -> str:
+        return f"{self._prefix(upload_id)}{_SESSION}"
+
+    def _part_key(self, upload_id: str, offset: int) -> str:
+        return f"{self._prefix(upload_id)}{offset:012d}.part"
+
+    async def _write_meta(self, session: UploadSession) -> None:
+        data = json.dumps(dataclasses.asdict(session)).encode()
+        await self.storage.put(
+            self._session_key(session.id), _once(data), content_type="application/json"
+        )
+
+    async def _read_meta(self, upload_id: str) -> Optional[UploadSession]:
+        try:
+            data = b"".join(
+                [
+                    chunk
+                    async for chunk in self.storage.get(self._session_key(upload_id))
+                ]
+            )
+        except FileNotFoundError:
+            return None
+        return UploadSession(**json.loads(data))
+
+    async def _parts(self, upload_id: str) -> List[ObjectInfo]:
+        """The parts that continue each other from offset 0, in order."""
+        by_offset: Dict[int, ObjectInfo] = {}
+        async for info in self.storage.list(self._prefix(upload_id)):
+            match = _PART.match(info.key.rsplit("/", 1)[1])
+            if match and info.size:
+                by_offset[int(match.group(1))] = info
+        chain = []
+        offset = 0
+        while offset in by_offset:
+            chain.append(by_offset[offset])
+            offset += by_offset[offset].size
+        return chain
+
+    @staticmethod
+    def _end(parts: List[ObjectInfo]) -> int:
+        return sum(info.size for info in parts)
+
+    async def _remove(self, upload_id: str) -> None:
+        keys = [info.key async for info in self.storage.list(self._prefix(upload_id))]
+        # The session goes last, so a half-removed upload is still found and purged
+        for key in sorted(keys, key=lambda key: key.endswith(_SESSION)):
+            await self.storage.delete(key)
+
+    async def create(
+        self, user_id: str, sha256: str, size: int, content_type: str
+    ) -> UploadSession:
+        """
+        Start an upload of ``size`` bytes.
+
+        If the photo is already stored nothing is staged and the returned
+        session is already complete.
+        """
+        key = blob_path(sha256, CONTENT_TYPE_EXTENSIONS[content_type])
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=str(user_id),
+            key=key,
+            sha256=sha256,
+            size=size,
+            content_type=content_type,
+            expires_at=time.time() + self.expires_seconds,
+        )
+        if await self.storage.stat(key) is not None:
+            await self.storage.touch(key)
+            session.offset = size
+            session.complete = True
+            return session
+
+        await self._write_meta(session)
+        return session
+
+    async def get(self, upload_id: str, user_id: str) -> UploadSession:
+        """The session ``upload_id`` of ``user_id``, with its current offset."""
+        if not _UPLOAD_ID.match(upload_id):
+            raise UploadNotFound(upload_id)
+        session = await self._read_meta(upload_id)
+        if (
+            session is None
+            or session.user_id != str(user_id)
+            or session.expires_at < time.time()
+        ):
+            raise UploadNotFound(upload_id)
+
+        if not session.complete:
+            session.offset = self._end(await self._parts(upload_id))
+        return session
+
+    async def append(
+        self, session: UploadSession, offset: int, chunks: AsyncIterable[bytes]
+    ) -> UploadSession:
+        """
+        Append ``chunks`` at ``offset``.
+
+        Everything received is kept even if ``chunks`` stops early. When the
+        upload is complete its content is verified and moved into the photo
+        store; on a checksum mismatch the session is discarded and
+        :class:`PhotoChecksumMismatch` raised.
+        """
+        if session.complete:
+            if offset != session.size:
+                raise UploadOffsetMismatch(session.size)
+            return session
+
+        session.offset = self._end(await self._parts(session.id))
+        if offset != session.offset:
+            raise UploadOffsetMismatch(session.offset)
+
+        overflow = False
+
+        async def limited() -> AsyncIterator[bytes]:
+            nonlocal overflow
+            remaining = session.size - offset
+            async for chunk in chunks:
+                if len(chunk) > remaining:
+                    chunk = chunk[:remaining]
+                    overflow = True
+                remaining -= len(chunk)
+                yield chunk
+                if overflow:
+                    break
+
+        part_key = self._part_key(session.id, offset)
+        received = await self.storage.put(
+            part_key, limited(), content_type="application/octet-stream"
+        )
+        if not received:
+            await self.storage.delete(part_key)
+        session.offset = offset + received
+
+        if session.offset == session.size:
+            await self._finish(session)
+        if overflow:
+            raise UploadLengthExceeded(session.id)
+        return session
+
+    async def _part_chunks(self, parts: List[ObjectInfo]) -> AsyncIterator[bytes]:
+        for info in parts:
+            async for chunk in self.storage.get(info.key):
+                yield chunk
+
+    async def _finish(self, session: UploadSession) -> None:
+        parts = await self._parts(session.id)
+        try:
+            digest = hashlib.sha256()
+            async for chunk in self._part_chunks(parts):
+                digest.update(chunk)
+            if self._end(parts) != session.size or digest.hexdigest() != session.sha256:
+                await self._remove(session.id)
+                raise PhotoChecksumMismatch(
+                    f"Upload {session.id} does not match its checksum"
+                )
+
+            await self.store.save_verified(
+                session.key, self._part_chunks(parts), session.content_type
+            )
+        except FileNotFoundError:
+            # A concurrent request finished or cancelled the upload and removed its parts
+            current = await self._read_meta(session.id)
+            if current is None or not current.complete:
+                raise UploadBusy(session.id)
+            session.complete = True
+            return
+
+        session.complete = True
+        # Keep the session so a client that missed the last response can still see it finished
+        await self._write_meta(session)
+        for info in parts:
+            await self.storage.delete(info.key)
+
+    async def cancel(self, session: UploadSession) -> None:
+        """Discard an upload and its staged parts."""
+        await self._remove(session.id)
+
+    async def purge_expired(self, now: Optional[float] = None) -> int:
+        """Remove expired sessions; returns how many were removed."""
+        now = time.time() if now is None else now
+        # upload id -> latest modification of any of its objects
+        uploads: Dict[str, float] = defaultdict(float)
+        async for info in self.storage.list(STAGING_PREFIX):
+            upload_id = info.key[len(STAGING_PREFIX) :].split("/", 1)[0]
+            uploads[upload_id] = max(uploads[upload_id], info.modified)
+
+        removed = 0
+        for upload_id, modified in uploads.items():
+            try:
+                session = await self._read_meta(upload_id)
+                expires_at = session.expires_at if session is not None else None
+            except (ValueError, TypeError):
+                expires_at = None
+            if expires_at is None:
+                # Missing or unreadable session files are judged by age instead
+                expires_at = modified + self.expires_seconds
+            if expires_at < now:
+                await self._remove(upload_id)
+                removed += 1
+        return removed
+
+
+# Singleton instance
+resumable_uploads = ResumableUploads(
+    photo_store, settings.UPLOAD_STAGING_EXPIRES_SECONDS
+)
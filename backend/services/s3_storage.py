@@ -0,0 +1,455 @@
+"""
+S3-compatible storage backend (AWS S3, MinIO) over ``httpx``.
+
+Requests are signed with AWS Signature Version 4; uploads stream through
+multipart upload in ``part_size`` parts, so memory use stays bounded by one
+part regardless of object size. Objects smaller than one part are sent with
+a single ``PutObject``.
+"""
+
+import base64
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+import httpx
+
+from services.storage import (
+    CHUNK_SIZE,
+    ObjectInfo,
+    PresignedUpload,
+    StorageBackend,
+    StorageError,
+    upload_headers,
+)
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_ALGORITHM = "AWS4-HMAC-SHA256"
+_XMLNS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _find(element: ElementTree.Element, name: str) -> Optional[str]:
+    found = element.find(f"{_XMLNS}{name}")
+    if found is None:
+        found = element.find(name)
+    return found.text if found is not None else None
+
+
+def _findall(element: ElementTree.Element, name: str) -> List[ElementTree.Element]:
+    return element.findall(f"{_XMLNS}{name}") or element.findall(name)
+
+
+class S3Storage(StorageBackend):
+    """Objects in one S3 bucket."""
+
+    def __init__(
+        self,
+        bucket: Optional[str],
+        region: str,
+        access_key: Optional[str],
+        secret_key: Optional[str],
+        endpoint_url: Optional[str] = None,
+        path_style: bool = True,
+        part_size: int = 8 * 1024 * 1024,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if not (bucket and access_key and secret_key):
+            raise ValueError(
+                "S3 storage needs S3_BUCKET, S3_ACCESS_KEY_ID and S3_SECRET_ACCESS_KEY"
+            )
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.part_size = part_size
+        self.timeout = timeout
+        self.transport = transport
+
+        endpoint = urlsplit(endpoint_url or f"https://s3.{region}.amazonaws.com")
+        self.scheme = endpoint.scheme
+        if path_style:
+            self.host = endpoint.netloc
+            self._bucket_path = f"/{bucket}"
+        else:
+            self.host = f"{bucket}.{endpoint.netloc}"
+            self._bucket_path = ""
+
+    # Signing
+
+    def _path(self, key: str = "") -> str:
+        if not key:
+            return self._bucket_path or "/"
+        return f"{self._bucket_path}/{_encode(key, safe='/-_.~')}"
+
+    @staticmethod
+    def _canonical_query(query: Dict[str, str]) -> str:
+        return "&".join(f"{_encode(k)}={_encode(v)}" for k, v in sorted(query.items()))
+
+    def _scope(self, now: datetime) -> str:
+        return f"{now:%Y%m%d}/{self.region}/s3/aws4_request"
+
+    def _signature(self, now: datetime, canonical_request: str) -> str:
+        string_to_sign = "\n".join(
+            [
+                _ALGORITHM,
+                f"{now:%Y%m%dT%H%M%SZ}",
+                self._scope(now),
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        key = _hmac(f"AWS4{self.secret_key}".encode(), f"{now:%Y%m%d}")
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _canonical_headers(headers: Dict[str, str]) -> Tuple[str, str]:
+        lowered = sorted(
+            (name.lower(), " ".join(value.split())) for name, value in headers.items()
+        )
+        canonical = "".join(f"{name}:{value}\n" for name, value in lowered)
+        return canonical, ";".join(name for name, _ in lowered)
+
+    def _signed_headers(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        headers: Dict[str, str],
+        payload_hash: str,
+    ) -> Dict[str, str]:
+        now = _utcnow()
+        headers = {
+            **headers,
+            "host": self.host,
+            "x-amz-date": f"{now:%Y%m%dT%H%M%SZ}",
+            "x-amz-content-sha256": payload_hash,
+        }
+        canonical_headers, signed = self._canonical_headers(headers)
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                self._canonical_query(query),
+                canonical_headers,
+                signed,
+                payload_hash,
+            ]
+        )
+        headers["Authorization"] = (
+            f"{_ALGORITHM} Credential={self.access_key}/{self._scope(now)}, "
+            f"SignedHeaders={signed}, Signature={self._signature(now, canonical_request)}"
+        )
+        del headers["host"]
+        return headers
+
+    def _presign(
+        self, method: str, key: str, expires_in: int, headers: Dict[str, str]
+    ) -> str:
+        now = _utcnow()
+        path = self._path(key)
+        canonical_headers, signed = self._canonical_headers(
+            {**headers, "host": self.host}
+        )
+        query = {
+            "X-Amz-Algorithm": _ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key}/{self._scope(now)}",
+            "X-Amz-Date": f"{now:%Y%m%dT%H%M%SZ}",
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": signed,
+        }
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                self._canonical_query(query),
+                canonical_headers,
+                signed,
+                UNSIGNED_PAYLOAD,
+            ]
+        )
+        query["X-Amz-Signature"] = self._signature(now, canonical_request)
+        return f"{self.scheme}://{self.host}{path}?{self._canonical_query(query)}"
+
+    # Requests
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=self.timeout, transport=self.transport)
+
+    def _build(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        key: str = "",
+        query: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: bytes = b"",
+    ) -> httpx.Request:
+        query = query or {}
+        path = self._path(key)
+        payload_hash = hashlib.sha256(content).hexdigest() if content else EMPTY_SHA256
+        url = f"{self.scheme}://{self.host}{path}"
+        if query:
+            url += "?" + self._canonical_query(query)
+        signed = self._signed_headers(method, path, query, headers or {}, payload_hash)
+        return client.build_request(method, url, headers=signed, content=content)
+
+    async def _send(
+        self, client: httpx.AsyncClient, method: str, key: str = "", **kwargs
+    ) -> httpx.Response:
+        try:
+            response = await client.send(self._build(client, method, key, **kwargs))
+        except httpx.HTTPError as e:
+            raise StorageError(f"S3 {method} {key or self.bucket} failed: {e}")
+        if response.status_code >= 300 and not (
+            method in ("HEAD", "DELETE") and response.status_code == 404
+        ):
+            raise StorageError(
+                f"S3 {method} {key or self.bucket} failed: {response.status_code} {response.text[:200]}"
+            )
+        return response
+
+    # StorageBackend
+
+    async def put(
+        self,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> int:
+        headers = upload_headers(content_type, None)
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+        buffer = bytearray()
+        size = 0
+        upload_id: Optional[str] = None
+        etags: List[str] = []
+
+        async with self._client() as client:
+            try:
+                async for chunk in chunks:
+                    buffer += chunk
+                    size += len(chunk)
+                    while len(buffer) >= self.part_size:
+                        if upload_id is None:
+                            response = await self._send(
+                                client,
+                                "POST",
+                                key,
+                                query={"uploads": ""},
+                                headers=headers,
+                            )
+                            upload_id = _find(
+                                ElementTree.fromstring(response.content), "UploadId"
+                            )
+                        part = bytes(buffer[: self.part_size])
+                        del buffer[: self.part_size]
+                        etags.append(
+                            await self._upload_part(
+                                client, key, upload_id, len(etags) + 1, part
+                            )
+                        )
+
+                if upload_id is None:
+                    await self._send(
+                        client, "PUT", key, headers=headers, content=bytes(buffer)
+                    )
+                    return size
+
+                if buffer:
+                    etags.append(
+                        await self._upload_part(
+                            client, key, upload_id, len(etags) + 1, bytes(buffer)
+                        )
+                    )
+                body = (
+                    "<CompleteMultipartUpload>"
+                    + "".join(
+                        f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                        for number, etag in enumerate(etags, start=1)
+                    )
+                    + "</CompleteMultipartUpload>"
+                )
+                response = await self._send(
+                    client,
+                    "POST",
+                    key,
+                    query={"uploadId": upload_id},
+                    content=body.encode(),
+                )
+                # CompleteMultipartUpload can fail with a 200 status
+                if b"<Error>" in response.content:
+                    raise StorageError(
+                        f"S3 multipart upload of {key} failed: {response.text[:200]}"
+                    )
+            except BaseException:
+                if upload_id is not None:
+                    try:
+                        await self._send(
+                            client, "DELETE", key, query={"uploadId": upload_id}
+                        )
+                    except StorageError:
+                        pass
+                raise
+        return size
+
+    async def _upload_part(
+        self,
+        client: httpx.AsyncClient,
+        key: str,
+        upload_id: str,
+        number: int,
+        content: bytes,
+    ) -> str:
+        response = await self._send(
+            client,
+            "PUT",
+            key,
+            query={"partNumber": str(number), "uploadId": upload_id},
+            content=content,
+        )
+        return response.headers["etag"]
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        async with self._client() as client:
+            try:
+                response = await client.send(
+                    self._build(client, "GET", key), stream=True
+                )
+            except httpx.HTTPError as e:
+                raise StorageError(f"S3 GET {key} failed: {e}")
+            try:
+                if response.status_code == 404:
+                    raise FileNotFoundError(key)
+                if response.status_code >= 300:
+                    await response.aread()
+                    raise StorageError(
+                        f"S3 GET {key} failed: {response.status_code} {response.text[:200]}"
+                    )
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        async with self._client() as client:
+            response = await self._send(
+                client, "HEAD", key, headers={"x-amz-checksum-mode": "ENABLED"}
+            )
+        if response.status_code == 404:
+            return None
+        checksum = response.headers.get("x-amz-checksum-sha256")
+        return ObjectInfo(
+            key=key,
+            size=int(response.headers.get("content-length", 0)),
+            modified=parsedate_to_datetime(
+                response.headers["last-modified"]
+            ).timestamp(),
+            # Multipart uploads report a checksum of checksums ("...-N"), not the content's
+            sha256=(
+                base64.b64decode(checksum).hex()
+                if checksum and "-" not in checksum
+                else None
+            ),
+        )
+
+    async def delete(self, key: str) -> None:
+        async with self._client() as client:
+            await self._send(client, "DELETE", key)
+
+    async def touch(self, key: str) -> None:
+        # S3 objects are immutable; copying one onto itself with replaced metadata resets LastModified
+        async with self._client() as client:
+            head = await self._send(client, "HEAD", key)
+            if head.status_code == 404:
+                raise FileNotFoundError(key)
+            headers = {
+                "x-amz-copy-source": f"/{self.bucket}/{_encode(key, safe='/-_.~')}",
+                "x-amz-metadata-directive": "REPLACE",
+            }
+            if "content-type" in head.headers:
+                headers["Content-Type"] = head.headers["content-type"]
+            await self._send(client, "PUT", key, headers=headers)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[ObjectInfo]:
+        query = {"list-type": "2", "prefix": prefix}
+        async with self._client() as client:
+            while True:
+                response = await self._send(client, "GET", query=query)
+                root = ElementTree.fromstring(response.content)
+                for item in _findall(root, "Contents"):
+                    yield ObjectInfo(
+                        key=_find(item, "Key"),
+                        size=int(_find(item, "Size") or 0),
+                        modified=datetime.fromisoformat(
+                            _find(item, "LastModified").replace("Z", "+00:00")
+                        ).timestamp(),
+                    )
+                token = _find(root, "NextContinuationToken")
+                if _find(root, "IsTruncated") != "true" or not token:
+                    break
+                query = {**query, "continuation-token": token}
+
+    def presign_put(
+        self,
+        key: str,
+        expires_in: int,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> PresignedUpload:
+        headers = upload_headers(content_type, sha256)
+        return PresignedUpload(
+            url=self._presign("PUT", key, expires_in, headers),
+            headers=headers,
+            expires_at=_utcnow().timestamp() + expires_in,
+        )
+
+    def presign_get(self, key: str, expires_in: int) -> str:
+        return self._presign("GET", key, expires_in, {})
+
+    async def purge_incomplete(self, older_than: float) -> int:
+        aborted = 0
+        query = {"uploads": ""}
+        async with self._client() as client:
+            while True:
+                response = await self._send(client, "GET", query=query)
+                root = ElementTree.fromstring(response.content)
+                for upload in _findall(root, "Upload"):
+                    initiated = datetime.fromisoformat(
+                        _find(upload, "Initiated").replace("Z", "+00:00")
+                    )
+                    if initiated.timestamp() < older_than:
+                        await self._send(
+                            client,
+                            "DELETE",
+                            _find(upload, "Key"),
+                            query={"uploadId": _find(upload, "UploadId")},
+                        )
+                        aborted += 1
+                if _find(root, "IsTruncated") != "true":
+                    break
+                query = {
+                    "uploads": "",
+                    "key-marker": _find(root, "NextKeyMarker") or "",
+                    "upload-id-marker": _find(root, "NextUploadIdMarker") or "",
+                }
+        return aborted
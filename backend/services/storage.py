@@ -0,0 +1,333 @@
+"""
+Pluggable object storage for uploads.
+
+:class:`StorageBackend` is the interface the photo store (and anything else
+that keeps files) talks to: streamed ``put``/``get``, ``stat``, ``delete``,
+``list`` and presigned URLs, all async. Two implementations exist:
+
+- :class:`LocalStorage` keeps objects under ``UPLOAD_DIR``. Its presigned
+  URLs point at ``/storage/{key}`` on this API and are authenticated with an
+  HMAC of the request, so clients use the same flow as with S3.
+- :class:`services.s3_storage.S3Storage` talks to any S3-compatible service
+  (AWS S3, MinIO) with SigV4-signed ``httpx`` requests.
+
+``STORAGE_BACKEND`` selects the implementation for the ``storage`` singleton.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Dict, Optional
+from urllib.parse import quote, urlencode
+
+import aiofiles
+import aiofiles.os
+
+from core.config import settings
+
+CHUNK_SIZE = 256 * 1024
+_TMP_DIR = ".tmp"
+
+
+class StorageError(Exception):
+    """Raised when the storage backend fails or rejects a request."""
+
+    pass
+
+
+@dataclass
+class ObjectInfo:
+    """Metadata of a stored object."""
+
+    key: str
+    size: int
+    modified: float
+    # Hex SHA-256 of the content, when the backend knows it
+    sha256: Optional[str] = None
+
+
+@dataclass
+class PresignedUpload:
+    """A URL the client can upload one object to directly."""
+
+    url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+
+def sha256_header(hex_digest: str) -> str:
+    """Hex SHA-256 as the base64 value of an ``x-amz-checksum-sha256`` header."""
+    return base64.b64encode(bytes.fromhex(hex_digest)).decode()
+
+
+def upload_headers(
+    content_type: Optional[str], sha256: Optional[str]
+) -> Dict[str, str]:
+    """Headers a presigned upload must be sent with."""
+    headers = {}
+    if content_type:
+        headers["Content-Type"] = content_type
+    if sha256:
+        headers["x-amz-checksum-sha256"] = sha256_header(sha256)
+    return headers
+
+
+class StorageBackend(ABC):
+    """Async object store addressed by ``/``-separated keys."""
+
+    @abstractmethod
+    async def put(
+        self,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> int:
+        """
+        Store the streamed ``chunks`` under ``key``, replacing any object; returns its size.
+
+        ``cache_control`` is sent with downloads of the object where the
+        backend supports it.
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> AsyncIterator[bytes]:
+        """Stream the object's content; raises ``FileNotFoundError`` if it does not exist."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        """Metadata of ``key``, or ``None`` if it does not exist."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete ``key``; deleting a missing object is not an error."""
+
+    @abstractmethod
+    async def touch(self, key: str) -> None:
+        """Reset the object's modification time to now."""
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> AsyncIterator[ObjectInfo]:
+        """Iterate over the objects whose key starts with ``prefix``."""
+
+    @abstractmethod
+    def presign_put(
+        self,
+        key: str,
+        expires_in: int,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> PresignedUpload:
+        """
+        URL for uploading ``key`` directly, valid for ``expires_in`` seconds.
+
+        With ``sha256`` (hex), the backend rejects content with another digest.
+        """
+
+    @abstractmethod
+    def presign_get(self, key: str, expires_in: int) -> str:
+        """URL for downloading ``key`` directly, valid for ``expires_in`` seconds."""
+
+    @abstractmethod
+    async def purge_incomplete(self, older_than: float) -> int:
+        """Discard partial uploads started before the ``older_than`` timestamp; returns how many."""
+
+
+# Local filesystem
+
+
+def _local_signature(
+    method: str, key: str, expires: int, content_type: str = "", sha256: str = ""
+) -> str:
+    message = "\n".join([method, key, str(expires), content_type, sha256]).encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_local_signature(
+    method: str,
+    key: str,
+    expires: int,
+    signature: str,
+    content_type: str = "",
+    sha256: str = "",
+) -> bool:
+    """Check a signed local storage URL (see :meth:`LocalStorage.presign_put`)."""
+    if expires < time.time():
+        return False
+    expected = _local_signature(method, key, expires, content_type, sha256)
+    return hmac.compare_digest(expected, signature)
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files below ``root``; writes land in ``root/.tmp`` and are moved into place."""
+
+    def __init__(self, root: str, public_url: str = ""):
+        self.root = root
+        self.public_url = public_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        """Filesystem path of ``key``; rejects keys escaping the root."""
+        path = os.path.normpath(os.path.join(self.root, key))
+        if (
+            not key
+            or os.path.isabs(key)
+            or not path.startswith(os.path.normpath(self.root) + os.sep)
+        ):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        if key.split("/", 1)[0] == _TMP_DIR:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    async def put(
+        self,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> int:
+        # Content-Type and Cache-Control are derived from the key when served (see api.v1.endpoints.storage)
+        target = self.path(key)
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await f.write(chunk)
+            await aiofiles.os.makedirs(os.path.dirname(target), exist_ok=True)
+            await aiofiles.os.replace(tmp_path, target)
+        except BaseException:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+            raise
+        return size
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path(key), "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat = await aiofiles.os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(key=key, size=stat.st_size, modified=stat.st_mtime)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await aiofiles.os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    async def touch(self, key: str) -> None:
+        await aiofiles.os.wrap(os.utime)(self.path(key))
+
+    async def list(self, prefix: str = "") -> AsyncIterator[ObjectInfo]:
+        # Only the directory holding the prefix is walked, one directory per thread hop,
+        # so large stores are streamed instead of listed up front
+        base = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        try:
+            top = self.path(base) if base else self.root
+        except ValueError:
+            return
+        walker = os.walk(top)
+
+        def next_directory():
+            for directory, subdirs, files in walker:
+                relative = os.path.relpath(directory, self.root)
+                if relative == ".":
+                    subdirs[:] = [d for d in subdirs if d != _TMP_DIR]
+                    relative = ""
+                entries = []
+                for name in files:
+                    key = f"{relative}/{name}" if relative else name
+                    key = key.replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        try:
+                            entries.append(
+                                (key, os.stat(os.path.join(directory, name)))
+                            )
+                        except FileNotFoundError:
+                            pass
+                return entries
+            return None
+
+        while (entries := await aiofiles.os.wrap(next_directory)()) is not None:
+            for key, stat in entries:
+                yield ObjectInfo(key=key, size=stat.st_size, modified=stat.st_mtime)
+
+    def _signed_url(self, key: str, query: Dict[str, str]) -> str:
+        return f"{self.public_url}{settings.API_V1_PREFIX}/storage/{quote(key)}?{urlencode(query)}"
+
+    def presign_put(
+        self,
+        key: str,
+        expires_in: int,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> PresignedUpload:
+        self.path(key)
+        expires = int(time.time()) + expires_in
+        signature = _local_signature(
+            "PUT", key, expires, content_type or "", sha256 or ""
+        )
+        return PresignedUpload(
+            url=self._signed_url(
+                key, {"expires": str(expires), "signature": signature}
+            ),
+            headers=upload_headers(content_type, sha256),
+            expires_at=expires,
+        )
+
+    def presign_get(self, key: str, expires_in: int) -> str:
+        self.path(key)
+        expires = int(time.time()) + expires_in
+        return self._signed_url(
+            key,
+            {
+                "expires": str(expires),
+                "signature": _local_signature("GET", key, expires),
+            },
+        )
+
+    async def purge_incomplete(self, older_than: float) -> int:
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        if not await aiofiles.os.path.isdir(tmp_dir):
+            return 0
+        removed = 0
+        for entry in await aiofiles.os.scandir(tmp_dir):
+            if entry.is_file() and entry.stat().st_mtime < older_than:
+                await aiofiles.os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+def create_storage() -> StorageBackend:
+    """Build the backend selected by ``STORAGE_BACKEND``."""
+    if settings.STORAGE_BACKEND == "s3":
+        from services.s3_storage import S3Storage
+
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            region=settings.S3_REGION,
+            access_key=settings.S3_ACCESS_KEY_ID,
+            secret_key=settings.S3_SECRET_ACCESS_KEY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            path_style=settings.S3_FORCE_PATH_STYLE,
+            part_size=settings.S3_MULTIPART_PART_SIZE,
+        )
+    return LocalStorage(settings.UPLOAD_DIR, public_url=settings.STORAGE_PUBLIC_URL)
+
+
+# Singleton instance
+storage = create_storage()
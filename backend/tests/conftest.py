@@ -75,6 +75,18 @@ def app():
         allow_headers=["*"],
     )
 
+    # Request metrics, as in main.py
+    from core.database import engine
+    from core.metrics import setup_metrics
+    from core.query_tracker import setup_query_tracking
+    setup_query_tracking(
+        test_app,
+        engine,
+        slow_query_ms=settings.SLOW_QUERY_MS,
+        n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+    )
+    setup_metrics(test_app, engine, token="test-metrics-token")
+
     # Include API router WITHOUT rate limiting
     test_app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -103,6 +115,26 @@ def client(app):
     return TestClient(app)
 
 
+@pytest.fixture
+def max_queries(app):
+    """
+    Assert an upper bound on the SQL statements run inside a block.
+
+        with max_queries(3):
+            client.get("/api/v1/designs/")
+    """
+    from contextlib import contextmanager
+    from core.query_tracker import capture_queries
+
+    @contextmanager
+    def _max_queries(limit):
+        with capture_queries() as tracker:
+            yield tracker
+        assert tracker.count <= limit, f"expected at most {limit} queries\n{tracker.report()}"
+
+    return _max_queries
+
+
 @pytest.fixture(scope="function", autouse=True)
 def setup_database():
     """
@@ -119,6 +151,10 @@ def setup_database():
     alembic_cfg = Config(alembic_ini_path)
     command.upgrade(alembic_cfg, "head")
 
+    # Cached catalog responses refer to rows from the previous test's schema
+    from core.cache import catalog_cache
+    catalog_cache.clear()
+
     # Create test admin user
     from core.security import hash_password
     from models.user import User
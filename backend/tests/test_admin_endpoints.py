@@ -132,3 +132,128 @@ def test_delete_user(client):
     headers = {"Authorization": f"Bearer {token}"}
     response = client.delete("/api/v1/admin/users/12345678-1234-5678-9012-123456789012", headers=headers)  # Non-existent user
     assert response.status_code in [400, 404, 403]
+
+
+def test_list_users_filters_and_pagination(client):
+    """Test filtering and paginating the admin user listing."""
+    token = get_admin_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    prefix = f"filter_test_{int(time.time())}"
+    for i in range(3):
+        response = client.post("/api/v1/admin/admin-create-user", json={
+            "email": f"{prefix}_{i}@example.com",
+            "password": "testpass123",
+            "first_name": "Filter",
+            "last_name": "User",
+            "role": "designer",
+        }, headers=headers)
+        assert response.status_code == 201
+
+    response = client.get(
+        "/api/v1/admin/users",
+        params={"email_prefix": prefix.upper(), "role": "designer"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+    response = client.get(
+        "/api/v1/admin/users",
+        params={"email_prefix": prefix, "skip": 1, "limit": 1},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+    response = client.get("/api/v1/admin/users", params={"limit": 0}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_export_users_csv(client):
+    """Test streaming a CSV export of users as admin."""
+    token = get_admin_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(
+        "/api/v1/admin/users/export",
+        params={"format": "csv", "email_prefix": "admin@"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("id,email,")
+    assert "hashed_password" not in lines[0]
+    assert any("admin@example.com" in line for line in lines[1:])
+
+
+def test_export_users_requires_admin(client):
+    """Test that exporting users requires authentication."""
+    response = client.get("/api/v1/admin/users/export")
+    assert response.status_code in [401, 403]
+
+
+def test_bulk_deactivate_users(client):
+    """Test bulk deactivation by filter, with a dry run first."""
+    token = get_admin_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    prefix = f"bulk_test_{int(time.time())}"
+    for i in range(3):
+        response = client.post("/api/v1/admin/admin-create-user", json={
+            "email": f"{prefix}_{i}@example.com",
+            "password": "testpass123",
+            "role": "designer",
+        }, headers=headers)
+        assert response.status_code == 201
+
+    payload = {"action": "deactivate", "filter": {"email_prefix": prefix}, "dry_run": True}
+    response = client.post("/api/v1/admin/users/bulk", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["matched"] == 3
+    assert response.json()["user_ids"] == []
+
+    payload["dry_run"] = False
+    response = client.post("/api/v1/admin/users/bulk", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["user_ids"]) == 3
+
+    response = client.get(
+        "/api/v1/admin/users", params={"email_prefix": prefix}, headers=headers
+    )
+    assert all(not user["is_active"] for user in response.json())
+
+
+def test_bulk_users_excludes_current_admin(client):
+    """Test that bulk operations never touch the calling admin."""
+    token = get_admin_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/api/v1/admin/users/bulk", json={
+        "action": "deactivate",
+        "filter": {"email_prefix": "admin@example.com"},
+    }, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["matched"] == 0
+
+
+def test_bulk_users_validation(client):
+    """Test that bulk requests need one target and a role for set_role."""
+    token = get_admin_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/api/v1/admin/users/bulk", json={"action": "delete", "filter": {}}, headers=headers)
+    assert response.status_code == 422
+
+    response = client.post("/api/v1/admin/users/bulk", json={
+        "action": "set_role",
+        "filter": {"role": "designer"},
+    }, headers=headers)
+    assert response.status_code == 422
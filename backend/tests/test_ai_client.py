@@ -0,0 +1,489 @@
+"""
+Tests for the AI client: load balancing, retries, circuit breaking, hedging
+adaptive concurrency limiting and the binary frame protocol.
+
+Replicas are simulated with ``httpx.MockTransport``, or served by
+``benchmarks.stub_ai`` where health probes need real sockets.
+"""
+
+import asyncio
+import io
+import time
+
+import httpx
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+from benchmarks.stub_ai import serve_in_thread
+from core.resilience import AdaptiveLimiter, CircuitBreaker
+from services.ai_client import (
+    AIClient,
+    AIRequestInvalid,
+    AIServiceError,
+    AIServiceOverloaded,
+    AIServiceUnavailable,
+)
+from services.ai_endpoints import EndpointPool
+from services.ai_frames import (
+    FRAME_CONTENT_TYPE,
+    FrameError,
+    decode_process_request,
+    decode_process_response,
+    encode_process_request,
+    encode_process_response,
+)
+
+FILES = {
+    view: (f"{view}.jpg", b"photo", "image/jpeg")
+    for view in ("front", "back", "left", "right")
+}
+
+
+def _client(handler, urls=("http://ai-1",), **overrides):
+    client = AIClient(list(urls), transport=httpx.MockTransport(handler))
+    client.retry_backoff = 0
+    for name, value in overrides.items():
+        setattr(client, name, value)
+    return client
+
+
+def _photo():
+    return UploadFile(
+        file=io.BytesIO(b"photo"),
+        filename="front.jpg",
+        headers=Headers({"content-type": "image/jpeg"}),
+    )
+
+
+def _reachable(url):
+    try:
+        httpx.get(f"{url}/health")
+        return True
+    except httpx.ConnectError:
+        return False
+
+
+def test_idempotent_calls_are_retried():
+    """Test that validation is retried on 5xx while processing is not."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"valid": True})
+
+    client = _client(handler)
+    assert asyncio.run(client.validate_photo(_photo())) == {"valid": True}
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(AIServiceError):
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert len(calls) == 1
+
+
+def test_connect_errors_are_retried_for_processing():
+    """Test that processing is retried when the request never reached a replica."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "ai-down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"status": "success", "data": {}})
+
+    client = _client(handler, urls=("http://ai-down", "http://ai-up"), retry_attempts=2)
+    for _ in range(5):
+        assert (
+            asyncio.run(client.process_measurement_files(FILES, 175, 70))["status"]
+            == "success"
+        )
+    assert calls.count("ai-up") == 5
+
+
+def test_circuit_opens_and_fails_fast():
+    """Test that a failing replica's circuit opens and calls then skip the network."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = _client(handler, retry_attempts=1)
+    breaker = client.breaker("http://ai-1")
+    breaker.min_calls = 3
+    for _ in range(3):
+        with pytest.raises(AIServiceError):
+            asyncio.run(client.process_measurement_files(FILES, 175, 70))
+
+    with pytest.raises(AIServiceUnavailable) as excinfo:
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert len(calls) == 3
+    assert 0 < excinfo.value.retry_after <= breaker.open_seconds
+
+
+def test_breaker_half_open_trial():
+    """Test that an open circuit admits a single trial call after its pause."""
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_ratio=0.5,
+        min_calls=2,
+        window_seconds=10,
+        open_seconds=5,
+        clock=lambda: now[0],
+    )
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    # Late failures of calls started before the circuit opened do not extend the pause
+    now[0] = 4.0
+    breaker.record_failure()
+    now[0] = 6.0
+    assert breaker.allow()
+    assert breaker.acquire()
+    assert not breaker.allow()
+    assert not breaker.acquire()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 12.0
+    assert breaker.acquire()
+    breaker.release()
+    assert breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_unexpected_errors_end_the_half_open_trial():
+    """Test that a half-open replica is not left waiting on a trial whose request failed oddly."""
+    now = [0.0]
+    errors = [httpx.DecodingError("bad gzip"), RuntimeError("bug")]
+
+    def handler(request):
+        if errors:
+            raise errors.pop(0)
+        return httpx.Response(200, json={"status": "healthy"})
+
+    client = _client(handler, retry_attempts=1)
+    breaker = client.breaker("http://ai-1")
+    breaker.clock = lambda: now[0]
+    breaker.min_calls = 1
+    breaker.record_failure()
+
+    now[0] = 100.0
+    with pytest.raises(AIServiceError):
+        asyncio.run(client.health_check())
+    assert breaker.state == "open"
+
+    now[0] = 200.0
+    with pytest.raises(RuntimeError):
+        asyncio.run(client.health_check())
+    assert breaker.allow()
+    assert asyncio.run(client.health_check()) == {"status": "healthy"}
+    assert breaker.state == "closed"
+
+
+def test_cancelled_call_cancels_its_request_before_the_hedge():
+    """Test that cancelling a caller during the hedge delay stops its request without counting a failure."""
+
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    client = _client(handler, urls=("http://ai-1", "http://ai-2"), hedge_delay=1.0)
+
+    async def cancel_early():
+        task = asyncio.ensure_future(client.health_check())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)
+        for endpoint in client.pool.endpoints.values():
+            assert endpoint.outstanding == 0
+            assert endpoint.ewma is None
+            assert endpoint.breaker._failures == 0
+
+    asyncio.run(cancel_early())
+
+
+def test_hedged_request_uses_the_faster_replica():
+    """Test that a slow call is duplicated to a second replica after the hedge delay."""
+
+    async def handler(request):
+        if request.url.host == "ai-slow":
+            await asyncio.sleep(1.0)
+        return httpx.Response(200, json={"host": request.url.host})
+
+    client = _client(
+        handler, urls=("http://ai-slow", "http://ai-fast"), hedge_delay=0.05
+    )
+    started = time.monotonic()
+    results = [asyncio.run(client.health_check()) for _ in range(4)]
+    assert all(result["host"] == "ai-fast" for result in results)
+    assert time.monotonic() - started < 1.0
+
+
+def test_processing_is_not_hedged():
+    """Test that non-idempotent calls go to one replica however long it takes."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"status": "success", "data": {}})
+
+    client = _client(handler, urls=("http://ai-1", "http://ai-2"), hedge_delay=0.05)
+    assert (
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))["status"]
+        == "success"
+    )
+    assert len(calls) == 1
+
+
+def test_p2c_prefers_the_faster_replica():
+    """Test that calls go to the replica with the lower latency average."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        await asyncio.sleep(0.1 if request.url.host == "ai-slow" else 0.005)
+        return httpx.Response(200, json={"status": "success", "data": {}})
+
+    client = _client(handler, urls=("http://ai-slow", "http://ai-fast"))
+    for _ in range(20):
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert calls.count("ai-slow") <= 2
+    assert (
+        client.pool.endpoints["http://ai-slow"].ewma
+        > client.pool.endpoints["http://ai-fast"].ewma
+    )
+
+
+def test_failures_count_as_slow_responses():
+    """Test that a replica failing fast is avoided, and tried again once its penalty fades."""
+    now = [0.0]
+    pool = EndpointPool(
+        ["http://ai-down", "http://ai-up"],
+        breaker_factory=lambda: CircuitBreaker(0.5, 100, 10, 5),
+        failure_penalty=30.0,
+        clock=lambda: now[0],
+    )
+    down, up = pool.endpoints["http://ai-down"], pool.endpoints["http://ai-up"]
+    pool.release(down, pool.acquire(down), ok=False)
+    up.observe(0.5)
+    assert down.ewma >= 30.0
+    assert pool.pick([down, up]) is up
+
+    # The healthy replica kept answering meanwhile
+    now[0] = 120.0
+    up.observe(0.5)
+    assert pool.pick([down, up]) is down
+
+
+def test_unhealthy_replica_is_ejected():
+    """Test that replicas failing their health probes stop receiving calls."""
+    up, up_server = serve_in_thread(latency_ms=1, jitter_ms=0)
+    down, down_server = serve_in_thread(latency_ms=1, jitter_ms=0)
+    try:
+        client = AIClient([up, down])
+        client.retry_attempts = 1
+        down_server.should_exit = True
+        while _reachable(down):
+            time.sleep(0.01)
+
+        for _ in range(client.pool.unhealthy_threshold):
+            asyncio.run(client.pool.probe(timeout=1.0))
+        assert [endpoint.url for endpoint in client.pool.candidates()] == [up]
+        for _ in range(10):
+            assert (
+                asyncio.run(client.process_measurement_files(FILES, 175, 70))["status"]
+                == "success"
+            )
+
+        # With every replica ejected, calls still go to those not failing fast
+        client.pool.record_probe(client.pool.endpoints[up], ok=False)
+        client.pool.record_probe(client.pool.endpoints[up], ok=False)
+        assert len(client.pool.candidates()) == 2
+    finally:
+        up_server.should_exit = True
+
+
+def test_limiter_grows_with_fast_calls_and_shrinks_with_slow_ones():
+    """Test additive increase under steady latency and multiplicative decrease when it climbs."""
+    now = [0.0]
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=8, clock=lambda: now[0])
+
+    async def fill():
+        for _ in range(4):
+            await limiter.acquire()
+
+    for _ in range(8):
+        asyncio.run(fill())
+        for _ in range(4):
+            limiter.release(0.1)
+    assert limiter.limit > 5
+
+    grown = limiter.limit
+    limiter.in_flight = 3
+    limiter.release(0.5)
+    limiter.release(0.5)
+    limiter.release(None, overloaded=True)
+    # Slow calls finishing together count as one decrease
+    assert limiter.limit == pytest.approx(grown * 0.9)
+
+
+def test_excess_calls_are_queued_then_shed():
+    """Test that calls beyond the limit wait for a slot, and are rejected when the wait is too long."""
+
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"status": "success", "data": {}})
+
+    async def burst(client, calls):
+        return await asyncio.gather(
+            *(client.process_measurement_files(FILES, 175, 70) for _ in range(calls)),
+            return_exceptions=True,
+        )
+
+    client = _client(handler)
+    client.limiter = AdaptiveLimiter(
+        initial=1, min_limit=1, max_limit=1, max_queue=1, queue_timeout=1.0
+    )
+    results = asyncio.run(burst(client, 2))
+    assert all(result["status"] == "success" for result in results)
+
+    client.limiter.queue_timeout = 0.05
+    results = asyncio.run(burst(client, 3))
+    assert results[0]["status"] == "success"
+    assert all(isinstance(result, AIServiceOverloaded) for result in results[1:])
+    assert results[1].retry_after >= 1
+    assert client.limiter.in_flight == 0
+
+
+def test_limiter_sees_per_request_latency(monkeypatch):
+    """Test that back-off between attempts is not counted as latency, and hedges need a free slot."""
+    from services import ai_client
+
+    monkeypatch.setattr(ai_client, "backoff_delay", lambda attempt, base, cap: 0.3)
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        await asyncio.sleep(0.2 if request.url.host == "ai-1" else 0.01)
+        return httpx.Response(200, json={"valid": True})
+
+    client = _client(handler, urls=("http://ai-1", "http://ai-2"))
+    client.limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+    assert asyncio.run(client.validate_photo(_photo())) == {"valid": True}
+    assert client.limiter.baseline < 0.25
+    assert client.limiter.in_flight == 0
+
+    calls[:] = ["warm"]
+    client.hedge_delay = 0.05
+    client.pool.endpoints["http://ai-1"].ewma = 0.0
+    asyncio.run(client.validate_photo(_photo()))
+    # The only slot is taken by the first request, so no hedge is sent
+    assert calls[1:] == ["ai-1"]
+    assert client.limiter.in_flight == 0
+
+
+def test_only_timeouts_and_server_errors_shrink_the_limit():
+    """Test that refused connections leave the concurrency limit alone while 5xx answers shrink it."""
+    status = [200]
+
+    def handler(request):
+        if request.url.host == "ai-down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(status[0], json={"status": "success", "data": {}})
+
+    client = _client(handler, urls=("http://ai-down", "http://ai-up"), retry_attempts=2)
+    # Mocked calls take microseconds; their jitter alone is no sign of load
+    client.limiter = AdaptiveLimiter(
+        initial=4, min_limit=1, max_limit=4, latency_tolerance=1000
+    )
+    for _ in range(5):
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert client.limiter.limit == 4
+
+    status[0] = 503
+    client.pool.endpoints["http://ai-down"].healthy = False
+    with pytest.raises(AIServiceError):
+        asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert client.limiter.limit < 4
+
+
+def test_frames_round_trip():
+    """Test that request and response frames decode to what was encoded, and reject damage."""
+    frame = encode_process_request(FILES, 175.5, 70.25)
+    images, height, weight = decode_process_request(frame)
+    assert (height, weight) == (175.5, 70.25)
+    assert images == {
+        view: (content, "image/jpeg") for view, (_, content, _) in FILES.items()
+    }
+    with pytest.raises(FrameError):
+        decode_process_request(frame[:-1])
+    with pytest.raises(FrameError):
+        decode_process_request(b"XX" + frame[2:])
+
+    result = {
+        "status": "success",
+        "data": {"measurements": {"chest": 98.6, "neck": 38.7}, "confidence": 0.92},
+    }
+    assert decode_process_response(encode_process_response(result)) == result
+
+
+def test_frame_image_types_without_a_declared_type():
+    """Test that photos sent as octet-stream or without a type are framed by content or extension."""
+    files = {
+        "front": ("front.jpg", b"\xff\xd8\xffjpeg", "application/octet-stream"),
+        "back": ("back", b"\x89PNG\r\n\x1a\npng", None),
+        "left": ("left.PNG", b"photo", None),
+        "right": ("right.jpg", b"photo", "image/jpg"),
+    }
+    images, _, _ = decode_process_request(encode_process_request(files, 175, 70))
+    assert {view: content_type for view, (_, content_type) in images.items()} == {
+        "front": "image/jpeg",
+        "back": "image/png",
+        "left": "image/png",
+        "right": "image/jpeg",
+    }
+
+    def handler(request):
+        raise AssertionError("Nothing should be sent")
+
+    client = _client(handler, wire_protocol="frame")
+    unknown = dict(FILES, front=("front.gif", b"GIF89a", "image/gif"))
+    with pytest.raises(AIRequestInvalid):
+        asyncio.run(client.process_measurement_files(unknown, 175, 70))
+
+
+def test_processing_over_frames():
+    """Test that AI_WIRE_PROTOCOL=frame sends one binary frame and reads a frame back."""
+
+    def handler(request):
+        assert request.url.path == "/api/measurements/process-frame"
+        assert request.headers["content-type"] == FRAME_CONTENT_TYPE
+        images, height, weight = decode_process_request(request.read())
+        assert set(images) == set(FILES)
+        measurements = {"chest": height / 2, "waist": weight}
+        body = encode_process_response(
+            {
+                "status": "success",
+                "data": {"measurements": measurements, "confidence": 0.9},
+            }
+        )
+        return httpx.Response(
+            200, content=body, headers={"content-type": FRAME_CONTENT_TYPE}
+        )
+
+    client = _client(handler, wire_protocol="frame")
+    result = asyncio.run(client.process_measurement_files(FILES, 175, 70))
+    assert result == {
+        "status": "success",
+        "data": {"measurements": {"chest": 87.5, "waist": 70.0}, "confidence": 0.9},
+    }
@@ -0,0 +1,81 @@
+"""
+Tests for the catalog cache and conditional responses without Redis.
+"""
+
+from fastapi.responses import Response
+from starlette.requests import Request
+
+from core.cache import CatalogCache
+from core.etag import conditional_response
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_cache_without_redis_keeps_local_versions_bounded():
+    """Test that without Redis there is no shared version, entries are reloaded after invalidation and local versions are bounded."""
+    cache = CatalogCache(redis_url=None, ttl=300, l1_ttl=60, l1_max_entries=2)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {"n": len(loads)}
+
+    assert cache.version("designs") is None
+    assert cache.get_or_set("designs", {}, load) == b'{"n":1}'
+    assert cache.get_or_set("designs", {}, load) == b'{"n":1}'
+    cache.invalidate("designs")
+    assert cache.get_or_set("designs", {}, load) == b'{"n":2}'
+
+    for user in range(10):
+        cache.get_or_set(f"measurements:{user}", {}, load)
+    assert len(cache._local_versions) == 2
+
+
+def test_conditional_response_hashes_body_without_version():
+    """Test that the ETag follows the content when no shared version is available."""
+    body = [b'{"a":1}']
+
+    def respond(request):
+        return conditional_response(
+            request,
+            "designs",
+            None,
+            {},
+            lambda: Response(content=body[0], media_type="application/json"),
+            "public",
+        )
+
+    first = respond(_request())
+    etag = first.headers["etag"]
+    assert respond(_request(etag)).status_code == 304
+
+    body[0] = b'{"a":2}'
+    changed = respond(_request(etag))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_fabric_and_color_changes_invalidate_designs(client, monkeypatch):
+    """Test that fabric and color changes refresh the design listings that filter by them."""
+    from sqlalchemy.orm import Session
+
+    from core.cache import catalog_cache
+    from core.database import engine
+    from crud.color import create_color, delete_color
+    from crud.fabric import create_fabric, update_fabric
+    from schemas.color import ColorCreate
+    from schemas.fabric import FabricCreate, FabricUpdate
+
+    invalidated = []
+    monkeypatch.setattr(
+        catalog_cache, "invalidate", lambda *namespaces: invalidated.extend(namespaces)
+    )
+    with Session(engine) as db:
+        fabric = create_fabric(db, FabricCreate(name="Cache linen", base_price=12.0))
+        update_fabric(db, fabric.id, FabricUpdate(base_price=14.0))
+        color = create_color(db, ColorCreate(name="Cache teal", hex_code="#008080"))
+        delete_color(db, color.id)
+    assert invalidated == ["designs"] * 4
@@ -165,3 +165,40 @@ def test_list_categories_with_pagination(client):
 
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+
+def test_category_list_reflects_writes(client):
+    """Test that cached category listings are invalidated by create and delete."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Prime the cache
+    before = client.get("/api/v1/categories/")
+    assert before.status_code == 200
+
+    import time
+
+    category_name = f"Cached Category {int(time.time() * 1000000)}"
+    create_response = client.post(
+        "/api/v1/categories/",
+        json={"name": category_name, "description": "Cache test"},
+        headers=headers,
+    )
+    assert create_response.status_code == 201
+    category_id = create_response.json()["id"]
+
+    names = [c["name"] for c in client.get("/api/v1/categories/").json()]
+    assert category_name in names
+
+    delete_response = client.delete(
+        f"/api/v1/categories/{category_id}", headers=headers
+    )
+    assert delete_response.status_code == 204
+
+    names = [c["name"] for c in client.get("/api/v1/categories/").json()]
+    assert category_name not in names
+    assert client.get(f"/api/v1/categories/{category_id}").status_code == 404
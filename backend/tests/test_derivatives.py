@@ -0,0 +1,177 @@
+"""
+Tests for thumbnail generation and serving.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+import api.v1.endpoints.storage as storage_endpoint
+import services.derivatives as derivatives
+from services.derivatives import DerivativeWorker, IMMUTABLE_CACHE_CONTROL, render
+from services.photo_store import blob_path
+from services.storage import LocalStorage
+from tests.test_measurements import get_auth_token
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+async def _chunks(data):
+    yield data
+
+
+def test_render_sizes_and_formats():
+    """Test that every size/format is produced, downscaled to its longest edge."""
+    rendered = render(_jpeg(1200, 800))
+    assert set(rendered) == {
+        (size, fmt) for size in ("sm", "md") for fmt in ("webp", "jpg")
+    }
+
+    with Image.open(io.BytesIO(rendered[("md", "jpg")])) as image:
+        assert image.format == "JPEG"
+        assert image.size == (480, 320)
+    with Image.open(io.BytesIO(rendered[("sm", "webp")])) as image:
+        assert image.format == "WEBP"
+        assert image.size == (160, 107)
+
+
+def test_measurement_thumbnails_are_recorded_and_served(client, tmp_path, monkeypatch):
+    """Test the worker records derivative keys and the image route redirects to them."""
+    local = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(derivatives, "storage", local)
+    monkeypatch.setattr(storage_endpoint, "storage", local)
+    worker = DerivativeWorker(local, workers=1)
+
+    content = _jpeg(1000, 1000)
+    key = blob_path(hashlib.sha256(content).hexdigest(), "jpg")
+    asyncio.run(local.put(key, _chunks(content), content_type="image/jpeg"))
+
+    headers = {"Authorization": f"Bearer {get_auth_token(client)}"}
+    response = client.post(
+        "/api/v1/measurements/",
+        json={
+            "measurements": {
+                "chest": 100,
+                "waist": 80,
+                "shoulders": 45,
+                "arm_length": 60,
+                "neck": 38,
+                "hip": 95,
+            },
+            "image_paths": {"front": key},
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    measurement_id = response.json()["id"]
+
+    image_url = f"/api/v1/measurements/{measurement_id}/images/front"
+    response = client.get(
+        image_url, params={"size": "sm"}, headers=headers, follow_redirects=False
+    )
+    assert response.status_code == 404
+
+    asyncio.run(worker.process("measurement", measurement_id))
+
+    recorded = client.get(
+        f"/api/v1/measurements/{measurement_id}", headers=headers
+    ).json()["image_derivatives"]
+    assert recorded["front"]["sm"]["webp"] == key[: -len(".jpg")] + ".sm.webp"
+
+    response = client.get(
+        image_url, params={"size": "sm"}, headers=headers, follow_redirects=False
+    )
+    assert response.status_code == 307
+
+    thumbnail = client.get(response.headers["location"])
+    assert thumbnail.status_code == 200
+    assert thumbnail.headers["content-type"] == "image/webp"
+    assert thumbnail.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    with Image.open(io.BytesIO(thumbnail.content)) as image:
+        assert image.size == (160, 160)
+
+
+def test_render_failures_are_logged_without_traceback(tmp_path, monkeypatch, caplog):
+    """Test that content that is not an image, or has too many pixels, gets no derivatives and one log line."""
+    local = LocalStorage(str(tmp_path))
+    worker = DerivativeWorker(local, workers=1)
+    monkeypatch.setattr(derivatives, "MAX_IMAGE_PIXELS", 1000 * 1000)
+
+    keys = []
+    for content in (b"not an image", _jpeg(1001, 1000)):
+        key = blob_path(hashlib.sha256(content).hexdigest(), "jpg")
+        asyncio.run(local.put(key, _chunks(content), content_type="image/jpeg"))
+        keys.append(key)
+
+    with caplog.at_level(logging.WARNING, logger="qeyafa.derivatives"):
+        assert [asyncio.run(worker.generate(key)) for key in keys] == [None, None]
+    assert len(caplog.records) == 2
+    assert all(record.exc_info is None for record in caplog.records)
+    assert "exceeds 1000000 pixels" in caplog.records[1].getMessage()
+
+
+def test_image_urls_are_restricted(client, tmp_path, monkeypatch):
+    """Test that measurements cannot reference URLs or foreign keys, and catalog URLs need an allowed host."""
+    from core.config import settings
+
+    headers = {"Authorization": f"Bearer {get_auth_token(client)}"}
+    full = {
+        "chest": 100,
+        "waist": 80,
+        "shoulders": 45,
+        "arm_length": 60,
+        "neck": 38,
+        "hip": 95,
+    }
+    for path in (
+        "http://169.254.169.254/latest/meta-data/",
+        "catalog/ab/cd/x.jpg",
+        "someone-else/photo.jpg",
+    ):
+        response = client.post(
+            "/api/v1/measurements/",
+            json={"measurements": full, "image_paths": {"front": path}},
+            headers=headers,
+        )
+        assert response.status_code == 422
+
+    # Never fetched for a measurement, and only from allowed hosts for catalog images
+    worker = DerivativeWorker(LocalStorage(str(tmp_path)), workers=1)
+
+    async def fetch(url):
+        raise AssertionError(f"fetched {url}")
+
+    monkeypatch.setattr(worker, "_fetch", fetch)
+    monkeypatch.setattr(settings, "CATALOG_IMAGE_HOSTS_STR", "images.example.com")
+    assert asyncio.run(worker.generate("https://images.example.com/a.jpg")) is None
+    assert (
+        asyncio.run(worker.generate("http://localhost:8080/admin", fetch_urls=True))
+        is None
+    )
+    assert derivatives.is_allowed_image_url("https://IMAGES.example.com/a.jpg")
+    assert not derivatives.is_allowed_image_url(
+        "https://images.example.com.evil.test/a.jpg"
+    )
+
+    response = derivatives.image_response(
+        "https://images.example.com/a.jpg", None, None, "webp", allow_urls=True
+    )
+    assert response.headers["location"] == "https://images.example.com/a.jpg"
+    for source, allow_urls in (
+        ("https://images.example.com/a.jpg", False),
+        ("http://10.0.0.1/", True),
+    ):
+        with pytest.raises(HTTPException) as raised:
+            derivatives.image_response(
+                source, None, None, "webp", allow_urls=allow_urls
+            )
+        assert raised.value.status_code == 404
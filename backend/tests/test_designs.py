@@ -240,3 +240,292 @@ def test_delete_design_requires_ownership(client):
     # and try to delete it with another user
     # Skip for now as it requires more complex setup
     pass
+
+
+def test_list_designs_conditional_get(client):
+    """Test that a matching If-None-Match header yields 304 Not Modified."""
+    response = client.get("/api/v1/designs/")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert "max-age" in response.headers["cache-control"]
+
+    cached = client.get("/api/v1/designs/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    # A different query is a different representation
+    other = client.get("/api/v1/designs/?limit=5", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_search_designs(client):
+    """Test ranked search over design names in Arabic and English."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for name, description in [
+        ("Royal Kaftan", "Embroidered silk kaftan"),
+        ("ثوب أبيض", "ثوب صيفي"),
+    ]:
+        response = client.post(
+            "/api/v1/designs/",
+            json={"name": name, "description": description, "base_price": 120.0},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = client.get("/api/v1/designs/search?q=kaftan")
+    assert response.status_code == 200
+    assert [d["name"] for d in response.json()][:1] == ["Royal Kaftan"]
+
+    # Surrounding and repeated whitespace is searched (and cached) as the trimmed query
+    padded = client.get("/api/v1/designs/search?q=%20royal%20%20kaftan%20")
+    assert padded.json() == client.get("/api/v1/designs/search?q=royal%20kaftan").json()
+    assert padded.headers["etag"] == client.get("/api/v1/designs/search?q=royal%20kaftan").headers["etag"]
+
+    # Hamza-less spelling still matches thanks to normalization
+    response = client.get("/api/v1/designs/search?q=ابيض")
+    assert response.status_code == 200
+    assert "ثوب أبيض" in [d["name"] for d in response.json()]
+
+    # Typos fall back to name similarity, but not for phrase or exclusion syntax
+    assert [d["name"] for d in client.get("/api/v1/designs/search?q=kaftn").json()] == ["Royal Kaftan"]
+    assert client.get('/api/v1/designs/search?q="kaftn"').json() == []
+
+
+def test_search_ranks_every_match(client):
+    """Test that the best match comes first even when many weaker matches were stored before it."""
+    from core.config import settings
+
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for i in range(40):
+        response = client.post(
+            "/api/v1/designs/",
+            json={"name": f"Ranking filler {i}", "description": "Edged with zardozi", "base_price": 50.0},
+            headers=headers,
+        )
+        assert response.status_code == 201
+    response = client.post(
+        "/api/v1/designs/",
+        json={"name": "Zardozi Bisht", "description": "Zardozi embroidered bisht", "base_price": 900.0},
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+    response = client.get("/api/v1/designs/search?q=zardozi&limit=5")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Zardozi Bisht"
+    assert len(client.get("/api/v1/designs/search?q=zardozi&skip=40").json()) == 1
+
+    response = client.get(f"/api/v1/designs/search?q=zardozi&skip={settings.DESIGN_SEARCH_MAX_OFFSET + 1}")
+    assert response.status_code == 422
+
+
+def test_search_designs_requires_query(client):
+    """Test that the search endpoint rejects an empty query."""
+    response = client.get("/api/v1/designs/search")
+    assert response.status_code == 422
+    response = client.get("/api/v1/designs/search?q=%20%20")
+    assert response.status_code == 422
+
+
+def test_design_facets(client):
+    """Test grouped facet counts for the design listing."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for style_type, price in [("modern", 40.0), ("modern", 80.0), ("classic", 600.0)]:
+        response = client.post(
+            "/api/v1/designs/",
+            json={"name": f"Facet {style_type} {price}", "style_type": style_type, "base_price": price},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = client.get("/api/v1/designs/facets")
+    assert response.status_code == 200
+    facets = response.json()
+    assert facets["total"] == 3
+    assert {"value": "modern", "count": 2} in facets["style_type"]
+    assert {"value": "classic", "count": 1} in facets["style_type"]
+    assert sum(f["count"] for f in facets["price_band"]) == 3
+
+    # Facet counts respect the active filters
+    filtered = client.get("/api/v1/designs/facets?style_type=modern").json()
+    assert filtered["total"] == 2
+    assert filtered["style_type"] == [{"value": "modern", "count": 2}]
+
+
+def test_list_designs_with_multi_value_and_price_filters(client):
+    """Test multi-valued style filters combined with a price range."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for name, style_type, price in [
+        ("Filter A", "modern", 30.0),
+        ("Filter B", "classic", 150.0),
+        ("Filter C", "traditional", 150.0),
+    ]:
+        response = client.post(
+            "/api/v1/designs/",
+            json={"name": name, "style_type": style_type, "base_price": price},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = client.get(
+        "/api/v1/designs/?style_type=modern&style_type=classic&min_price=100&max_price=200"
+    )
+    assert response.status_code == 200
+    assert [d["name"] for d in response.json()] == ["Filter B"]
+
+
+def test_list_designs_rejects_invalid_category_id(client):
+    """Test that malformed category IDs are rejected."""
+    response = client.get("/api/v1/designs/?category_id=not-a-uuid")
+    assert response.status_code == 422
+
+
+def test_fit_designs_for_measurement(client):
+    """Test matching a measurement against compiled design size charts."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    rules = {
+        "sizes": {
+            "M": {"chest": [96, 102], "waist": {"min": 80, "max": 86}},
+            "L": {"chest": [102, 108], "waist": [86, 92]},
+        }
+    }
+    response = client.post(
+        "/api/v1/designs/",
+        json={"name": "Fitted thobe", "base_price": 120.0, "customization_rules": rules},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    design_id = response.json()["id"]
+
+    response = client.post(
+        "/api/v1/measurements/",
+        json={"measurements": {"chest": 99.0, "waist": 83.0}},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    measurement_id = response.json()["id"]
+
+    response = client.get(f"/api/v1/designs/fit?measurement_id={measurement_id}", headers=headers)
+    assert response.status_code == 200
+    fits = {fit["design"]["id"]: fit["sizes"] for fit in response.json()}
+    assert fits[design_id] == ["M"]
+
+
+def test_create_design_rejects_invalid_size_chart(client):
+    """Test that malformed size charts are rejected when the design is written."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/api/v1/designs/",
+        json={
+            "name": "Broken chart",
+            "base_price": 50.0,
+            "customization_rules": {"sizes": {"M": {"chest": [102, 96]}}},
+        },
+        headers=headers,
+    )
+    assert response.status_code == 422
+
+
+def test_validate_design_options(client):
+    """Test checking selected options against a design's customization rules."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    rules = {
+        "options": {
+            "collar": {
+                "type": "choice",
+                "choices": ["classic", "mandarin"],
+                "default": "classic",
+                "choice_prices": {"mandarin": 10},
+            },
+            "sleeve_length": {"type": "number", "min": 50, "max": 70, "required": True},
+            "monogram": {"type": "text", "max_length": 5, "price": 15},
+        }
+    }
+    response = client.post(
+        "/api/v1/designs/",
+        json={"name": "Options thobe", "base_price": 100.0, "customization_rules": rules},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    design_id = response.json()["id"]
+
+    response = client.post(
+        f"/api/v1/designs/{design_id}/options/validate",
+        json={"options": {"collar": "mandarin", "sleeve_length": 60, "monogram": "AB"}},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["valid"] is True
+    assert result["price"] == 125.0
+
+    response = client.post(
+        f"/api/v1/designs/{design_id}/options/validate",
+        json={"options": {"collar": "wing", "pockets": True}},
+    )
+    result = response.json()
+    assert result["valid"] is False
+    assert len(result["errors"]) == 3  # bad choice, unknown option, missing required
+
+
+def test_create_design_rejects_invalid_options(client):
+    """Test that option rules are validated when the design is written."""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@example.com", "password": "password123"},
+    )
+    token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/api/v1/designs/",
+        json={
+            "name": "Broken options",
+            "base_price": 50.0,
+            "customization_rules": {"options": {"collar": {"type": "choice"}}},
+        },
+        headers=headers,
+    )
+    assert response.status_code == 422
@@ -6,6 +6,9 @@ Run with: pytest tests/test_measurements.py
 """
 
 import io
+import uuid
+
+import pytest
 
 
 
@@ -197,3 +200,237 @@ def test_process_measurements_missing_data(client):
 
     # Should fail with 422 (validation error)
     assert response.status_code == 422
+
+
+def test_measurement_history_columnar(client):
+    """Test the per-user history is returned as chronological columns with deltas."""
+    token = get_auth_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for chest in (96.0, 99.5):
+        response = client.post(
+            "/api/v1/measurements/",
+            json={"measurements": {"chest": chest, "waist": 80.0}},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = client.get(
+        "/api/v1/measurements/analytics/history",
+        params={"field": ["chest", "waist"]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["chest"][-2:] == [96.0, 99.5]
+    assert data["chest_delta"][-1] == 3.5
+    assert len(data["processed_at"]) == len(data["chest"])
+
+
+def test_measurement_analytics_validation(client):
+    """Test unknown fields are rejected and the summary is limited to tailors and admins."""
+    token = get_auth_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(
+        "/api/v1/measurements/analytics/history",
+        params={"field": "inseam"},
+        headers=headers,
+    )
+    assert response.status_code == 422
+
+    response = client.get("/api/v1/measurements/analytics/summary", headers=headers)
+    assert response.status_code == 403
+
+
+def test_similar_measurements(client):
+    """Test nearest-neighbour lookup is limited to tailors and admins and requires a complete measurement."""
+    from tests.test_admin_endpoints import get_admin_token
+
+    token = get_auth_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+    admin_headers = {"Authorization": f"Bearer {get_admin_token(client)}"}
+
+    full = {"chest": 100.0, "waist": 86.0, "shoulders": 46.0, "arm_length": 61.0, "neck": 39.0, "hip": 101.0}
+    response = client.post("/api/v1/measurements/", json={"measurements": full}, headers=headers)
+    assert response.status_code == 201
+    measurement_id = response.json()["id"]
+
+    # Neighbours are other customers' body measurements
+    response = client.get(f"/api/v1/measurements/{measurement_id}/similar", headers=headers)
+    assert response.status_code == 403
+
+    response = client.get(f"/api/v1/measurements/{measurement_id}/similar", params={"k": 5}, headers=admin_headers)
+    assert response.status_code == 200
+    neighbours = response.json()
+    assert len(neighbours) <= 5
+    assert all(set(n["measurements"]) == set(full) for n in neighbours)
+
+    response = client.post("/api/v1/measurements/", json={"measurements": {"chest": 100.0}}, headers=headers)
+    assert response.status_code == 201
+    response = client.get(f"/api/v1/measurements/{response.json()['id']}/similar", headers=admin_headers)
+    assert response.status_code == 422
+
+
+def test_measurement_index_orders_neighbours(client):
+    """Test neighbour order and standardized distances, and that refreshes pick up updates and deletes."""
+    import numpy as np
+    from sqlalchemy.orm import Session
+
+    from core.database import engine
+    from core.security import hash_password
+    from crud.measurement import MEASUREMENT_FIELDS, typed_measurement_values
+    from models.measurement import Measurement
+    from models.user import User
+    from services.measurement_index import MeasurementIndex
+
+    vectors = {
+        "near": [100.0, 85.0, 46.0, 61.0, 39.0, 100.0],
+        "middle": [104.0, 90.0, 48.0, 62.0, 40.0, 104.0],
+        "far": [120.0, 105.0, 52.0, 66.0, 44.0, 118.0],
+    }
+    with Session(engine) as db:
+        users = {}
+        rows = {}
+        for name, vector in vectors.items():
+            user = User(email=f"index_{name}_{uuid.uuid4().hex[:8]}@example.com", hashed_password=hash_password("x"))
+            db.add(user)
+            db.flush()
+            values = dict(zip(MEASUREMENT_FIELDS, vector))
+            rows[name] = Measurement(
+                user_id=user.id,
+                measurements=values,
+                image_paths={},
+                confidence_score=1.0,
+                **typed_measurement_values(values),
+            )
+            db.add(rows[name])
+            users[name] = user.id
+        db.commit()
+
+        index = MeasurementIndex(refresh_interval=0, rebuild_interval=3600)
+        index.rebuild(db)
+        target = [100.0, 85.0, 46.0, 61.0, 39.0, 101.0]
+        neighbours = index.search(db, target, k=3)
+        assert [n.user_id for n in neighbours] == [users["near"], users["middle"], users["far"]]
+
+        raw = np.array(list(vectors.values()))
+        std = raw.std(axis=0)
+        expected = np.linalg.norm((raw - np.array(target)) / std, axis=1)
+        assert [n.distance for n in neighbours] == pytest.approx(expected.tolist())
+        assert neighbours[0].values == dict(zip(MEASUREMENT_FIELDS, vectors["near"]))
+
+        # An update moves "far" next to the target; a delete removes "near"
+        moved = dict(zip(MEASUREMENT_FIELDS, target))
+        rows["far"].measurements = moved
+        for field, value in typed_measurement_values(moved).items():
+            setattr(rows["far"], field, value)
+        db.delete(rows["near"])
+        db.commit()
+
+        neighbours = index.search(db, target, k=3)
+        assert [n.user_id for n in neighbours] == [users["far"], users["middle"]]
+        assert neighbours[0].distance == pytest.approx(0.0)
+        assert index.search(db, target, k=3, exclude_user_id=users["far"])[0].user_id == users["middle"]
+
+
+def _typed_columns(measurement_id):
+    """Typed column values of a stored measurement, by field."""
+    from sqlalchemy.orm import Session
+
+    from core.database import engine
+    from crud.measurement import MEASUREMENT_FIELDS
+    from models.measurement import Measurement
+
+    with Session(engine) as db:
+        measurement = db.get(Measurement, uuid.UUID(str(measurement_id)))
+        return {field: getattr(measurement, field) for field in MEASUREMENT_FIELDS}
+
+
+def test_typed_columns_follow_measurement_writes(client, monkeypatch):
+    """Test that create, update, /process and /finalize all fill the typed measurement columns."""
+    import hashlib
+
+    from services.ai_client import ai_client
+
+    token = get_auth_token(client)
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+    empty = {field: None for field in ("chest", "waist", "shoulders", "arm_length", "neck", "hip")}
+
+    response = client.post(
+        "/api/v1/measurements/", json={"measurements": {"chest": 100, "inseam": 80.0}}, headers=headers
+    )
+    assert response.status_code == 201
+    measurement_id = response.json()["id"]
+    assert _typed_columns(measurement_id) == {**empty, "chest": 100.0}
+
+    response = client.put(
+        f"/api/v1/measurements/{measurement_id}", json={"measurements": {"waist": 82.5}}, headers=headers
+    )
+    assert response.status_code == 200
+    assert _typed_columns(measurement_id) == {**empty, "waist": 82.5}
+
+    result = {"chest": 101.0, "waist": 84.0, "shoulders": 45.0, "arm_length": 60.0, "neck": 38.0, "hip": 97.0}
+
+    async def process_measurement_files(files, height, weight):
+        return {"status": "success", "data": {"measurements": result, "confidence": 0.9}}
+
+    monkeypatch.setattr(ai_client, "process_measurement_files", process_measurement_files)
+    photos = {view: f"{view} {uuid.uuid4()}".encode() for view in ("front", "back", "left", "right")}
+
+    response = client.post(
+        "/api/v1/measurements/process",
+        files={f"photo_{view}": (f"{view}.jpg", io.BytesIO(content), "image/jpeg") for view, content in photos.items()},
+        data={"height": "175", "weight": "70"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert _typed_columns(response.json()["id"]) == result
+
+    spec = {
+        view: {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content), "content_type": "image/jpeg"}
+        for view, content in photos.items()
+    }
+    ticket = client.post("/api/v1/measurements/uploads", json=spec, headers=headers).json()
+    response = client.post(
+        "/api/v1/measurements/finalize",
+        json={"upload_token": ticket["upload_token"], "height": 175, "weight": 70},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert _typed_columns(response.json()["id"]) == result
+
+
+def test_backfill_fills_typed_columns(client):
+    """Test that the backfill fills typed columns of rows that only have the JSON document."""
+    from sqlalchemy.orm import Session
+
+    from backfill_measurement_columns import backfill
+    from core.database import engine
+    from models.measurement import Measurement
+    from models.user import User
+
+    with Session(engine) as db:
+        user_id = db.query(User.id).filter(User.email == "admin@example.com").scalar()
+        rows = [
+            Measurement(
+                user_id=user_id,
+                measurements={"chest": 99, "waist": 81.5, "neck": "n/a"},
+                image_paths={},
+                confidence_score=0.5,
+            )
+            for _ in range(3)
+        ]
+        db.add_all(rows)
+        db.commit()
+        ids = [row.id for row in rows]
+
+    assert all(_typed_columns(measurement_id)["chest"] is None for measurement_id in ids)
+    assert backfill(batch_size=2, start_after=uuid.UUID(int=0), pause=0) >= 3
+    for measurement_id in ids:
+        typed = _typed_columns(measurement_id)
+        assert (typed["chest"], typed["waist"], typed["neck"], typed["hip"]) == (99.0, 81.5, None, None)
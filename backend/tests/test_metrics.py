@@ -0,0 +1,43 @@
+"""
+Tests for request metrics and Server-Timing headers.
+"""
+
+
+def test_server_timing_header(client):
+    """Test that responses carry app and db timings."""
+    response = client.get("/api/v1/categories/")
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert "app;dur=" in timing
+    assert "db;dur=" in timing
+
+
+def test_metrics_endpoint(client):
+    """Test the Prometheus endpoint reports per-route metrics."""
+    client.get("/api/v1/categories/")
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+    response = client.get(
+        "/metrics", headers={"Authorization": "Bearer test-metrics-token"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/api/v1/categories/"' in body
+    assert "http_requests_in_flight" in body
+    assert "server-timing" not in response.headers
+
+
+def test_unknown_methods_share_one_label(client):
+    """Test that request methods outside the standard set are labelled OTHER."""
+    client.request("BREW", "/api/v1/categories/")
+
+    body = client.get(
+        "/metrics", headers={"Authorization": "Bearer test-metrics-token"}
+    ).text
+    assert 'method="OTHER"' in body
+    assert 'method="BREW"' not in body
@@ -0,0 +1,314 @@
+"""
+Tests for the content-addressed photo store.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import uuid
+
+from services.photo_store import PhotoStore, blob_path, is_blob_path
+from services.storage import LocalStorage
+from tests.test_measurements import get_auth_token
+
+
+async def _chunks(content):
+    yield content
+
+
+async def _keys(storage, prefix):
+    return [info.key async for info in storage.list(prefix)]
+
+
+def _photos(content):
+    return {
+        f"photo_{side}": (f"{side}.jpg", io.BytesIO(content), "image/jpeg")
+        for side in ("front", "back", "left", "right")
+    }
+
+
+def test_identical_uploads_share_one_blob(client):
+    """Test that re-uploading the same photo returns the same sharded path."""
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    content = b"identical photo bytes"
+
+    first = client.post(
+        "/api/v1/measurements/upload", files=_photos(content), headers=headers
+    )
+    second = client.post(
+        "/api/v1/measurements/upload", files=_photos(content), headers=headers
+    )
+    assert first.status_code == 200
+    assert second.status_code == 200
+
+    paths = set(first.json()["image_paths"].values()) | set(
+        second.json()["image_paths"].values()
+    )
+    expected = blob_path(hashlib.sha256(content).hexdigest(), "jpg")
+    assert paths == {expected}
+    assert is_blob_path(expected)
+
+
+def test_collect_garbage_keeps_referenced_photos(client, tmp_path):
+    """Test that only unreferenced photos past the grace period are removed, batch by batch."""
+    from core.database import engine
+    from sqlalchemy.orm import Session
+
+    token = get_auth_token(client)
+    storage = LocalStorage(str(tmp_path))
+    store = PhotoStore(storage)
+    kept = blob_path(hashlib.sha256(b"kept").hexdigest(), "jpg")
+    orphan = blob_path(hashlib.sha256(b"orphan").hexdigest(), "jpg")
+    legacy = "3f2a/abandoned.jpg"
+    thumbnail = orphan[: -len(".jpg")] + ".sm.webp"
+    for path in (kept, orphan, legacy, thumbnail):
+        os.makedirs(os.path.dirname(storage.path(path)), exist_ok=True)
+        with open(storage.path(path), "wb") as f:
+            f.write(b"x" * 10)
+
+    response = client.post(
+        "/api/v1/measurements/",
+        json={
+            "measurements": {
+                "chest": 100,
+                "waist": 80,
+                "shoulders": 45,
+                "arm_length": 60,
+                "neck": 38,
+                "hip": 95,
+            },
+            "image_paths": {"front": kept},
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201
+
+    with Session(engine) as db:
+        report = asyncio.run(store.collect_garbage(db, grace_seconds=0, batch_size=2))
+
+    assert sorted(report.removed) == sorted([orphan, legacy])
+    assert report.bytes_removed == 20
+    assert report.legacy_removed == 1
+    assert report.scanned == 3
+    assert report.batches == 2
+    assert os.path.exists(storage.path(kept))
+    assert not os.path.exists(storage.path(orphan))
+    assert not os.path.exists(storage.path(thumbnail))
+
+
+def test_direct_upload_flow(client, monkeypatch):
+    """Test presigned uploads straight to storage followed by finalize."""
+    from services.ai_client import ai_client
+
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    # Fresh content, so no view is already stored from an earlier run
+    photos = {
+        view: f"{view} photo {uuid.uuid4()}".encode()
+        for view in ("front", "back", "left", "right")
+    }
+    spec = {
+        view: {
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size": len(content),
+            "content_type": "image/jpeg",
+        }
+        for view, content in photos.items()
+    }
+
+    response = client.post("/api/v1/measurements/uploads", json=spec, headers=headers)
+    assert response.status_code == 200
+    ticket = response.json()
+    finalize = {"upload_token": ticket["upload_token"], "height": 175, "weight": 70}
+
+    response = client.post(
+        "/api/v1/measurements/finalize", json=finalize, headers=headers
+    )
+    assert response.status_code == 409
+
+    for view, target in ticket["uploads"].items():
+        response = client.put(
+            target["url"], content=photos[view], headers=target["headers"]
+        )
+        assert response.status_code == 200
+
+    async def process_measurement_files(files, height, weight):
+        assert {view: content for view, (_, content, _) in files.items()} == photos
+        measurements = {
+            "chest": 100,
+            "waist": 80,
+            "shoulders": 45,
+            "arm_length": 60,
+            "neck": 38,
+            "hip": 95,
+        }
+        return {
+            "status": "success",
+            "data": {"measurements": measurements, "confidence": 0.9},
+        }
+
+    monkeypatch.setattr(
+        ai_client, "process_measurement_files", process_measurement_files
+    )
+    response = client.post(
+        "/api/v1/measurements/finalize", json=finalize, headers=headers
+    )
+    assert response.status_code == 200
+
+    measurement = client.get(
+        f"/api/v1/measurements/{response.json()['id']}", headers=headers
+    ).json()
+    assert measurement["image_paths"] == {
+        view: target["key"] for view, target in ticket["uploads"].items()
+    }
+
+    # An upload token is used once
+    response = client.post(
+        "/api/v1/measurements/finalize", json=finalize, headers=headers
+    )
+    assert response.status_code == 409
+
+    # Already stored photos need no upload
+    response = client.post("/api/v1/measurements/uploads", json=spec, headers=headers)
+    assert all(target["url"] is None for target in response.json()["uploads"].values())
+
+    response = client.post(
+        "/api/v1/measurements/finalize",
+        json={**finalize, "upload_token": token},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+def test_resumable_upload_flow(client):
+    """Test resuming an interrupted upload from the server's offset."""
+    from services.photo_store import STAGING_PREFIX
+    from services.storage import storage
+
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    content = f"resumable photo {uuid.uuid4()} ".encode() * 32
+    spec = {
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "size": len(content),
+        "content_type": "image/png",
+    }
+    photos = {view: spec for view in ("front", "back", "left", "right")}
+
+    response = client.post(
+        "/api/v1/measurements/uploads",
+        json={**photos, "resumable": True},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    target = response.json()["uploads"]["front"]
+    assert target["method"] == "PATCH"
+    patch_headers = {**headers, "Content-Type": "application/offset+octet-stream"}
+
+    # The first part arrives, then the connection drops
+    response = client.patch(
+        target["url"],
+        content=content[:300],
+        headers={**patch_headers, "Upload-Offset": "0"},
+    )
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == "300"
+
+    response = client.head(target["url"], headers=headers)
+    assert response.headers["upload-offset"] == "300"
+    assert response.headers["upload-length"] == str(len(content))
+
+    response = client.patch(
+        target["url"],
+        content=content[100:],
+        headers={**patch_headers, "Upload-Offset": "100"},
+    )
+    assert response.status_code == 409
+    assert response.headers["upload-offset"] == "300"
+
+    response = client.patch(
+        target["url"],
+        content=content[300:],
+        headers={**patch_headers, "Upload-Offset": "300"},
+    )
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == str(len(content))
+
+    store_response = client.post(
+        "/api/v1/measurements/uploads", json=photos, headers=headers
+    )
+    assert store_response.json()["uploads"]["front"]["url"] is None
+    assert target["key"] == blob_path(spec["sha256"], "png")
+
+    # The staged parts are gone; only the finished session is kept
+    upload_id = target["url"].rsplit("/", 1)[1]
+    staged = asyncio.run(_keys(storage, f"{STAGING_PREFIX}{upload_id}/"))
+    assert staged == [f"{STAGING_PREFIX}{upload_id}/session.json"]
+    assert (
+        client.head(
+            target["url"], headers={"Authorization": "Bearer invalid"}
+        ).status_code
+        == 401
+    )
+
+
+def test_purge_expired_resumable_uploads(tmp_path):
+    """Test that expired staged uploads are removed from the storage backend, and live ones kept."""
+    import time
+
+    from services.resumable_uploads import ResumableUploads
+
+    storage = LocalStorage(str(tmp_path))
+    uploads = ResumableUploads(PhotoStore(storage), expires_seconds=60)
+
+    async def scenario():
+        content = b"staged photo bytes"
+        session = await uploads.create(
+            "user", hashlib.sha256(content).hexdigest(), len(content), "image/jpeg"
+        )
+        await uploads.append(session, 0, _chunks(content[:5]))
+        assert (await uploads.get(session.id, "user")).offset == 5
+        assert await uploads.purge_expired() == 0
+        assert await uploads.purge_expired(now=time.time() + 120) == 1
+        return await _keys(storage, "")
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_collect_garbage_rechecks_before_deleting(client, tmp_path):
+    """Test that a photo touched after it was listed (e.g. uploaded again) survives the sweep."""
+    from core.database import engine
+    from sqlalchemy.orm import Session
+
+    class StaleListing(LocalStorage):
+        async def list(self, prefix=""):
+            async for info in super().list(prefix):
+                info.modified = 0
+                yield info
+
+    storage = StaleListing(str(tmp_path))
+    store = PhotoStore(storage)
+    touched = blob_path(hashlib.sha256(b"touched").hexdigest(), "jpg")
+    stale = blob_path(hashlib.sha256(b"stale").hexdigest(), "jpg")
+    for path in (touched, stale):
+        asyncio.run(storage.put(path, _chunks(b"x")))
+    os.utime(storage.path(stale), (0, 0))
+
+    with Session(engine) as db:
+        report = asyncio.run(store.collect_garbage(db, grace_seconds=3600))
+
+    assert report.removed == [stale]
+    assert report.recent == 1
+    assert os.path.exists(storage.path(touched))
+
+
+def test_min_grace_covers_upload_tokens(monkeypatch):
+    """Test that the minimum grace period is the longest upload token lifetime."""
+    from core.config import settings
+    from services.photo_store import min_grace_seconds
+
+    monkeypatch.setattr(settings, "UPLOAD_STAGING_EXPIRES_SECONDS", 86400)
+    monkeypatch.setattr(settings, "STORAGE_PRESIGN_EXPIRES_SECONDS", 900)
+    assert min_grace_seconds() == 86400 + 1800
@@ -0,0 +1,107 @@
+"""
+Tests for the slow-query and N+1 detector.
+"""
+
+import logging
+
+from core.query_tracker import QueryTracker, normalize_sql
+from tests.test_admin_endpoints import get_admin_token
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    """Test that executions differing only in values share one shape."""
+    first = normalize_sql(
+        "SELECT * FROM designs\n WHERE price > 10 AND name = 'a' AND id IN (%(id_1_1)s, %(id_1_2)s)"
+    )
+    second = normalize_sql(
+        "SELECT * FROM designs WHERE price > 25.5 AND name = 'it''s' AND id IN (%(id_1_1)s)"
+    )
+    assert (
+        first
+        == second
+        == "SELECT * FROM designs WHERE price > ? AND name = ? AND id IN (...)"
+    )
+
+
+def test_tracker_flags_repeated_statements():
+    """Test that a statement repeated past the threshold is reported."""
+    tracker = QueryTracker()
+    for user_id in range(12):
+        tracker.record(f"SELECT * FROM users WHERE id = {user_id}", 0.001)
+    tracker.record("SELECT count(*) FROM designs", 0.001)
+
+    assert tracker.count == 13
+    assert tracker.repeated(10) == [("SELECT * FROM users WHERE id = ?", 12)]
+    assert "12x SELECT * FROM users WHERE id = ?" in tracker.report()
+
+
+def test_no_n_plus_one_warning_for_simple_request(client, caplog):
+    """Test that the middleware logs nothing for a request without repeated statements."""
+    with caplog.at_level(logging.WARNING, logger="qeyafa.sql"):
+        response = client.get("/api/v1/categories/")
+    assert response.status_code == 200
+    assert not [
+        record for record in caplog.records if "Probable N+1" in record.getMessage()
+    ]
+
+
+def test_list_designs_query_count_does_not_grow(client, max_queries):
+    """Test that listing designs runs a bounded number of queries regardless of page size."""
+    token = get_admin_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(5):
+        response = client.post(
+            "/api/v1/designs/",
+            json={
+                "name": f"Query budget {i}",
+                "style_type": "modern",
+                "base_price": 10 + i,
+            },
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    with max_queries(5) as tracker:
+        response = client.get("/api/v1/designs/?limit=100")
+    assert response.status_code == 200
+    assert len(response.json()) >= 5
+    assert not tracker.repeated(5)
+
+
+def test_slow_query_log_omits_parameters(client, caplog, monkeypatch):
+    """Test that slow statements are logged in normalized form, without their bind parameters."""
+    from sqlalchemy import text
+
+    from core import query_tracker
+    from core.database import engine
+
+    monkeypatch.setattr(query_tracker, "_slow_query_seconds", 0.0)
+    with caplog.at_level(logging.WARNING, logger="qeyafa.sql"):
+        with engine.connect() as connection:
+            connection.execute(
+                text("SELECT :email, 'secret@example.com'"),
+                {"email": "private@example.com"},
+            )
+
+    messages = [
+        record.getMessage()
+        for record in caplog.records
+        if "Slow query" in record.getMessage()
+    ]
+    assert messages
+    assert not [message for message in messages if "example.com" in message]
+
+
+def test_engine_has_one_pair_of_timing_listeners(client):
+    """Test that metrics and query tracking share the engine listeners."""
+    from sqlalchemy import event
+
+    from core import metrics, query_tracker
+    from core.database import engine
+
+    query_tracker.instrument_engine(engine, slow_query_ms=200)
+    metrics.instrument_engine(engine)
+    assert event.contains(
+        engine, "before_cursor_execute", metrics._before_cursor_execute
+    )
+    assert metrics._statement_observers.count(query_tracker._observe) == 1
@@ -1,3 +1,4 @@
+import hashlib
 import io
 import os
 import json
@@ -5,6 +6,8 @@ import tempfile
 import pytest
 from fastapi.testclient import TestClient
 
+from services.photo_store import blob_path
+
 
 def test_measurements_smoke_flow(client: TestClient):
     """End-to-end smoke test for measurements flow:
@@ -42,7 +45,7 @@ def test_measurements_smoke_flow(client: TestClient):
     # 3) Create manual measurement
     create_payload = {
         "measurements": {"chest": 92.0, "waist": 78.0, "hip": 96.0},
-        "image_paths": {"image": "uploads/manual.jpg"},
+        "image_paths": {"image": blob_path(hashlib.sha256(b"manual").hexdigest(), "jpg")},
         "confidence_score": 0.0,
     }
     rc = client.post("/api/v1/measurements", json=create_payload, headers={**headers, **base_headers})